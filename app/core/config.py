@@ -1,10 +1,89 @@
-from decouple import config
+from decouple import config, undefined
+
+
+class lazy_config:
+    # A setting read from the environment / .env on first access rather than at import,
+    # so importing the app (or a script) never fails or does I/O over settings it does not use
+    def __init__(self, option, default=undefined, cast=undefined):
+        self.option = option
+        self.default = default
+        self.cast = cast
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = config(self.option, default=self.default, cast=self.cast)
+        instance.__dict__[self.name] = value  # Cached: later reads are plain attribute lookups
+        return value
 
 
 class Settings:
-    DATABASE_URL = config('DATABASE_URL')
-    SECRET_KEY = config('SECRET_KEY', default='your_default_secret_key')
-    DEBUG = config('DEBUG', default=False, cast=bool)
+    DATABASE_URL = lazy_config('DATABASE_URL')
+    SECRET_KEY = lazy_config('SECRET_KEY', default='your_default_secret_key')
+    DEBUG = lazy_config('DEBUG', default=False, cast=bool)
+
+    # Logging: queue-backed handlers keep file/console I/O off the request path
+    LOG_LEVEL = lazy_config('LOG_LEVEL', default='INFO')  # Level of the app.* module loggers
+    LOG_USE_QUEUE = lazy_config('LOG_USE_QUEUE', default=True, cast=bool)
+    LOG_JSON = lazy_config('LOG_JSON', default=False, cast=bool)
+    LOG_MAX_MESSAGE_LENGTH = lazy_config('LOG_MAX_MESSAGE_LENGTH', default=2000, cast=int)
+    LOG_PAYLOAD_SAMPLE_RATE = lazy_config('LOG_PAYLOAD_SAMPLE_RATE', default=0.01, cast=float)
+
+    # Connection pool, applied per engine (so per uvicorn worker)
+    DB_POOL_SIZE = lazy_config('DB_POOL_SIZE', default=5, cast=int)
+    DB_MAX_OVERFLOW = lazy_config('DB_MAX_OVERFLOW', default=10, cast=int)
+    DB_POOL_TIMEOUT = lazy_config('DB_POOL_TIMEOUT', default=30, cast=float)
+    DB_POOL_RECYCLE = lazy_config('DB_POOL_RECYCLE', default=1800, cast=int)
+    DB_POOL_PRE_PING = lazy_config('DB_POOL_PRE_PING', default=True, cast=bool)
+
+    # Startup only checks the schema version (in the background); python -m app.schema_upgrade applies it
+    SCHEMA_CHECK_ON_STARTUP = lazy_config('SCHEMA_CHECK_ON_STARTUP', default=True, cast=bool)
+    SCHEMA_VERSION_CACHE_PATH = lazy_config('SCHEMA_VERSION_CACHE_PATH', default='data/schema_version.json')
+
+    # Queue webhooks durably and ingest them with background workers instead of inline
+    WEBHOOK_ASYNC_INGEST = lazy_config('WEBHOOK_ASYNC_INGEST', default=False, cast=bool)
+    INGEST_QUEUE_PATH = lazy_config('INGEST_QUEUE_PATH', default='data/ingest_queue.sqlite3')
+    INGEST_WORKERS = lazy_config('INGEST_WORKERS', default=2, cast=int)
+    INGEST_BATCH_SIZE = lazy_config('INGEST_BATCH_SIZE', default=50, cast=int)
+    INGEST_MAX_ATTEMPTS = lazy_config('INGEST_MAX_ATTEMPTS', default=5, cast=int)
+    INGEST_VISIBILITY_TIMEOUT = lazy_config('INGEST_VISIBILITY_TIMEOUT', default=60, cast=int)
+    INGEST_RETRY_MAX_BACKOFF = lazy_config('INGEST_RETRY_MAX_BACKOFF', default=300, cast=int)  # Seconds
+
+    # Per-process cache of candidate/job payload hashes used to skip unchanged writes (0 disables it)
+    INGEST_CACHE_SIZE = lazy_config('INGEST_CACHE_SIZE', default=10000, cast=int)
+    INGEST_CACHE_TTL = lazy_config('INGEST_CACHE_TTL', default=300, cast=int)
+
+    # Applications kept per job in the job_top_scores leaderboard
+    SCORE_TOP_K = lazy_config('SCORE_TOP_K', default=50, cast=int)
+
+    # Background download of candidate attachments (resumes) to local, content-addressed storage
+    ATTACHMENT_FETCH_ENABLED = lazy_config('ATTACHMENT_FETCH_ENABLED', default=False, cast=bool)
+    ATTACHMENT_STORAGE_DIR = lazy_config('ATTACHMENT_STORAGE_DIR', default='data/attachments')
+    ATTACHMENT_FETCH_CONCURRENCY = lazy_config('ATTACHMENT_FETCH_CONCURRENCY', default=8, cast=int)
+    ATTACHMENT_FETCH_BATCH_SIZE = lazy_config('ATTACHMENT_FETCH_BATCH_SIZE', default=50, cast=int)
+    ATTACHMENT_FETCH_MAX_ATTEMPTS = lazy_config('ATTACHMENT_FETCH_MAX_ATTEMPTS', default=3, cast=int)
+    ATTACHMENT_FETCH_TIMEOUT = lazy_config('ATTACHMENT_FETCH_TIMEOUT', default=60, cast=int)
+    ATTACHMENT_MAX_BYTES = lazy_config('ATTACHMENT_MAX_BYTES', default=25 * 1024 * 1024, cast=int)
+
+    # Full-text index of fetched resumes, searched by the bot's "Fetch Resumes" option
+    RESUME_INDEX_ENABLED = lazy_config('RESUME_INDEX_ENABLED', default=False, cast=bool)
+    RESUME_INDEX_PATH = lazy_config('RESUME_INDEX_PATH', default='data/resume_index.sqlite3')
+    CV_SCORING_CACHE_PATH = lazy_config('CV_SCORING_CACHE_PATH', default='data/cv_corpus.npz')
+
+    # Country calling code assumed for candidate phone numbers written without one
+    CONTACT_DEFAULT_COUNTRY_CODE = lazy_config('CONTACT_DEFAULT_COUNTRY_CODE', default='44')
+
+    # Monthly range partitions of applications by applied_at (PostgreSQL only). Convert the table once with
+    # python -m app.greenhouse_applications.partitions --convert before enabling
+    APPLICATIONS_PARTITIONED = lazy_config('APPLICATIONS_PARTITIONED', default=False, cast=bool)
+    APPLICATIONS_PARTITION_MONTHS_AHEAD = lazy_config('APPLICATIONS_PARTITION_MONTHS_AHEAD', default=3, cast=int)
+
+    # Retention: applications of jobs closed longer than this are exported to compressed JSONL and deleted
+    ARCHIVE_DIR = lazy_config('ARCHIVE_DIR', default='data/archive')
+    ARCHIVE_CLOSED_JOBS_AFTER_DAYS = lazy_config('ARCHIVE_CLOSED_JOBS_AFTER_DAYS', default=365, cast=int)
 
 
 settings = Settings()
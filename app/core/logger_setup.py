@@ -1,13 +1,63 @@
+import atexit
+import json
 import logging
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from datetime import datetime
 
-def setup_logger(log_folder="logs", backup_count=7):
-    os.makedirs(log_folder, exist_ok=True)
+# Loggers fed by setup_logger: the app-wide one plus every module logger under the app package
+LOGGER_NAMES = ("hr_automation", "app")
+
+_listener = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    # One JSON object per line, for log shippers
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class PayloadLogFilter(logging.Filter):
+    # Keeps only a sample of records logged with extra={"payload": True} and caps message size,
+    # so a large payload is never formatted into a multi-megabyte log line
+    def __init__(self, sample_rate, max_message_length):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.max_message_length = max_message_length
+
+    def filter(self, record):
+        if getattr(record, "payload", False) and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return False
+
+        if self.max_message_length:
+            message = record.getMessage()
+            if len(message) > self.max_message_length:
+                dropped = len(message) - self.max_message_length
+                record.msg = f"{message[:self.max_message_length]}... [truncated {dropped} chars]"
+                record.args = None
+        return True
 
+
+def setup_logger(log_folder="logs", backup_count=7, use_queue=True, json_lines=False,
+                 max_message_length=2000, payload_sample_rate=1.0, level="INFO"):
+    global _listener
     logger = logging.getLogger("hr_automation")
-    logger.setLevel(logging.DEBUG)
+
+    # Calling this again must not stack a second set of handlers
+    if getattr(logger, "_hr_automation_configured", False):
+        return logger
+
+    os.makedirs(log_folder, exist_ok=True)
 
     # Create a log file path with the current date
     current_date = datetime.now().strftime('%Y_%m_%d')
@@ -30,14 +80,41 @@ def setup_logger(log_folder="logs", backup_count=7):
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
 
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonLineFormatter() if json_lines else formatter)
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if use_queue:
+        # Request handlers only enqueue records; a background thread does the blocking writes
+        log_queue = queue.SimpleQueue()
+        handlers = [QueueHandler(log_queue)]
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logger)
+    else:
+        handlers = [file_handler, console_handler]
 
+    payload_filter = PayloadLogFilter(payload_sample_rate, max_message_length)
+    for handler in handlers:
+        handler.addFilter(payload_filter)
+
+    for name in LOGGER_NAMES:
+        named_logger = logging.getLogger(name)
+        # Module loggers under app (and the libraries' loggers below them) log at the configured level
+        named_logger.setLevel(logging.DEBUG if name == "hr_automation" else level)
+        for handler in handlers:
+            named_logger.addHandler(handler)
+
+    logger._hr_automation_configured = True
     return logger
 
+
+def shutdown_logger():
+    # Flush whatever is still queued and stop the listener thread
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 # Example usage
 if __name__ == "__main__":
     logger = setup_logger()
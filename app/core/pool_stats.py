@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the checkout wait time histogram buckets; the last bucket is open-ended
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolStats:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.pool = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.connections_opened = 0
+            self.overflow_events = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds, timed_out=False):
+        elapsed_ms = seconds * 1000
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if elapsed_ms <= bound), len(WAIT_BUCKETS_MS))
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_buckets[bucket] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_opened += 1
+            # A connection opened while the pool is past pool_size is an overflow connection
+            if self.pool is not None and hasattr(self.pool, "overflow") and self.pool.overflow() > 0:
+                self.overflow_events += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in WAIT_BUCKETS_MS] + [f">{WAIT_BUCKETS_MS[-1]}ms"]
+            stats = {
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "connections_opened": self.connections_opened,
+                "overflow_events": self.overflow_events,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "mean": round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                    "histogram": dict(zip(labels, self.wait_buckets)),
+                },
+            }
+        if self.pool is not None:
+            stats["status"] = self.pool.status()
+        return stats
+
+
+# One PoolStats per engine, keyed by the engine's pool logging name ("sync", "async")
+pool_stats = {}
+
+
+def stats_for(name):
+    if name not in pool_stats:
+        pool_stats[name] = PoolStats(name)
+    return pool_stats[name]
+
+
+class TimedCheckoutMixin:
+    # Pool events fire only once a connection is handed out, so the time spent waiting for
+    # one (including pool_timeout errors) is measured around the pool's own _do_get. That is
+    # a private QueuePool method: check it still exists before moving off the pinned SQLAlchemy
+    # version in pyproject.toml.
+    def _do_get(self):
+        stats = stats_for(self._orig_logging_name)
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        stats.record_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# SQLAlchemy logs pool activity under the pool class's module, which puts these pools below the
+# "app" logger. Keep them at WARNING like sqlalchemy.pool; echo_pool still turns their logging on.
+for pool_class in (InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool):
+    logging.getLogger(f"{pool_class.__module__}.{pool_class.__name__}").setLevel(logging.WARNING)
+
+
+def instrument_engine(engine, name):
+    # Attach the pool event listeners for an Engine (or the sync_engine of an AsyncEngine)
+    stats = stats_for(name)
+    stats.pool = engine.pool
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    event.listen(engine, "engine_disposed", lambda disposed: setattr(stats, "pool", disposed.pool))
+    return stats
@@ -1,18 +1,116 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.pool_stats import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_engine
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+# Async drivers used in place of the sync ones for the AsyncEngine
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def engine_options(database_url, poolclass):
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single shared connection, there is no pool to size
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+class LazySessionMaker(sessionmaker):
+    # Creates the engine (and binds to it) when the first session is made, not at import
+    def __call__(self, **local_kw):
+        get_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = LazySessionMaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+_engine = None
+_async_engine = None
+_async_session_factory = None
+
+
+def get_engine():
+    # Created on first use, so importing the app neither reads DATABASE_URL nor loads the driver
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            settings.DATABASE_URL,
+            pool_logging_name="sync",
+            **engine_options(settings.DATABASE_URL, InstrumentedQueuePool),
+        )
+        instrument_engine(_engine, "sync")
+        SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def __getattr__(name):
+    # "from app.database import engine" keeps working, creating the engine at that point
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def async_database_url(database_url):
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_async_engine():
+    # Created on first use so sync-only scripts never need the async driver installed
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            async_database_url(settings.DATABASE_URL),
+            pool_logging_name="async",
+            **engine_options(settings.DATABASE_URL, InstrumentedAsyncAdaptedQueuePool),
+        )
+        instrument_engine(_async_engine.sync_engine, "async")
+        _async_session_factory = async_sessionmaker(_async_engine, class_=AsyncSession,
+                                                    autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def get_async_session_factory():
+    get_async_engine()
+    return _async_session_factory
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_session_factory = None
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta
+import aiohttp
+from app.greenhouse_applications.dao import DAO
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# HTTP statuses that will not change on retry (expired or revoked Greenhouse URLs)
+PERMANENT_STATUSES = {400, 401, 403, 404, 410}
+LEASE_MARGIN_SECONDS = 60  # Claiming, hashing, moving files and recording the outcomes
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+class FetchCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetched = 0
+        self.deduplicated = 0
+        self.retried = 0
+        self.failed = 0
+        self.bytes_downloaded = 0
+
+    def add(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "fetched": self.fetched,
+                "deduplicated": self.deduplicated,
+                "retried": self.retried,
+                "failed": self.failed,
+                "bytes_downloaded": self.bytes_downloaded,
+            }
+
+
+# Background task that downloads new CandidateAttachment files while their Greenhouse URLs are still valid.
+# Files are streamed to disk in chunks and stored content-addressed (<storage_dir>/ab/abcdef...), so the
+# same resume attached to several candidates or applications is kept once.
+class AttachmentFetcher:
+    def __init__(self, session_factory, storage_dir, concurrency=8, batch_size=50, max_attempts=3,
+                 timeout=60, max_bytes=25 * 1024 * 1024, chunk_size=256 * 1024, retry_backoff=60,
+                 poll_interval=5.0):
+        self.session_factory = session_factory
+        self.storage_dir = storage_dir
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.counters = FetchCounters()
+        self._http = None
+        self._task = None
+        self._stopping = None
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Attachment fetcher started, storing files in %s", self.storage_dir)
+
+    async def stop(self):
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await self.close()
+        logger.info("Attachment fetcher stopped.")
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def _session(self):
+        # One client session for the fetcher's lifetime: connections to the same host are kept alive
+        # and reused, and the connector caps how many are open at once
+        if self._http is None:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30)
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._http
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if await self.fetch_pending():
+                    continue
+            except Exception as e:
+                logger.error("Attachment fetcher error: %s", str(e))
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def lease_seconds(self):
+        # A batch is downloaded concurrency files at a time, each taking up to timeout: the lease
+        # must outlast every wave, or another fetcher claims the tail of the batch again
+        return math.ceil(self.batch_size / self.concurrency) * self.timeout + LEASE_MARGIN_SECONDS
+
+    async def fetch_pending(self):
+        # Claim one batch, download it concurrently and record every outcome in one transaction.
+        # Returns the number of attachments processed.
+        claimed = await asyncio.to_thread(self._with_dao, lambda dao: dao.claim_attachments_to_fetch(
+            self.batch_size, self.lease_seconds()))
+        if not claimed:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(attachment):
+            async with semaphore:
+                return await self._fetch_one(attachment)
+
+        results = await asyncio.gather(*(bounded(attachment) for attachment in claimed))
+        await asyncio.to_thread(self._with_dao, lambda dao: dao.record_attachment_fetches(results))
+        return len(results)
+
+    def _with_dao(self, operation):
+        db = self.session_factory()
+        try:
+            return operation(DAO(db))
+        finally:
+            db.close()
+
+    async def _fetch_one(self, attachment):
+        try:
+            stored = await self.download(attachment.url)
+        except Exception as e:
+            permanent = (
+                isinstance(e, AttachmentTooLarge)
+                or (isinstance(e, aiohttp.ClientResponseError) and e.status in PERMANENT_STATUSES)
+                or attachment.fetch_attempts >= self.max_attempts
+            )
+            error = f"{type(e).__name__}: {e}"[:500]
+            if permanent:
+                self.counters.add(failed=1)
+                logger.error("Giving up on attachment %d (%s): %s", attachment.id, attachment.filename, error)
+            else:
+                self.counters.add(retried=1)
+                logger.warning("Attachment %d fetch failed, will retry: %s", attachment.id, error)
+            return self._result(
+                attachment,
+                fetch_status='failed' if permanent else 'retry',
+                fetch_claimed_until=(None if permanent else
+                                     datetime.utcnow() + timedelta(seconds=self.retry_backoff * attachment.fetch_attempts)),
+                fetch_error=error,
+            )
+
+        self.counters.add(fetched=1, deduplicated=int(stored["deduplicated"]), bytes_downloaded=stored["size_bytes"])
+        return self._result(
+            attachment,
+            fetch_status='fetched',
+            fetched_at=datetime.utcnow(),
+            content_sha256=stored["sha256"],
+            content_type=stored["content_type"],
+            size_bytes=stored["size_bytes"],
+            storage_path=stored["path"],
+        )
+
+    def _result(self, attachment, **values):
+        # Every result row carries the same keys, as one executemany UPDATE needs
+        result = dict(attachment_id=attachment.id, leased_until=attachment.fetch_claimed_until, fetch_status=None,
+                      fetch_claimed_until=None, fetch_error=None, fetched_at=None, content_sha256=None,
+                      content_type=None, size_bytes=None, storage_path=None)
+        result.update(values)
+        return result
+
+    async def download(self, url):
+        # Stream the body to a temporary file while hashing it, then move it to its content address
+        tmp_dir = os.path.join(self.storage_dir, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with self._session().get(url, raise_for_status=True) as response:
+                content_type = (response.headers.get("Content-Type") or "")[:100] or None
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise AttachmentTooLarge(f"larger than {self.max_bytes} bytes")
+                        digest.update(chunk)
+                        await asyncio.to_thread(f.write, chunk)
+
+            sha256 = digest.hexdigest()
+            path = os.path.join(self.storage_dir, sha256[:2], sha256)
+            deduplicated = os.path.exists(path)
+            if deduplicated:
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return {"sha256": sha256, "path": path, "size_bytes": size, "content_type": content_type,
+                "deduplicated": deduplicated}
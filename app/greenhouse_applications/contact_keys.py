@@ -0,0 +1,117 @@
+# Normalized, hashed contact keys (emails and phone numbers) used to spot the same person arriving
+# under several Greenhouse candidate ids, and the union-find job that groups those candidates.
+#
+#   python -m app.greenhouse_applications.contact_keys --backfill --cluster
+import argparse
+import hashlib
+import logging
+import re
+from app.core.config import settings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PHONE_EXTENSION = re.compile(r"(?:ext\.?|x|#)\s*\d+\s*$", re.IGNORECASE)
+
+
+def normalize_email(value):
+    value = (value or "").strip().lower()
+    return value if "@" in value else None
+
+
+def normalize_phone(value, default_country_code=None):
+    # Best-effort E.164: +<country code><national number>, trunk prefix dropped, extension ignored.
+    # Numbers without a country code are assumed to be in default_country_code.
+    default_country_code = default_country_code or settings.CONTACT_DEFAULT_COUNTRY_CODE
+    value = PHONE_EXTENSION.sub("", (value or "").strip()).replace("(0)", "")  # +44 (0)20 ... style trunk
+    digits = re.sub(r"\D", "", value)
+    if value.startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]
+    elif digits.startswith("0"):
+        number = default_country_code + digits[1:]
+    elif len(digits) > 10:
+        number = digits
+    else:
+        number = default_country_code + digits
+    return f"+{number}" if 8 <= len(number) <= 15 else None
+
+
+def contact_key_hash(key_type, normalized):
+    return hashlib.sha256(f"{key_type}:{normalized}".encode()).hexdigest()
+
+
+def contact_key_rows(candidate_id, email_addresses, phone_numbers):
+    # One row per distinct normalized email / phone of a candidate
+    keys = {("email", email) for email in map(normalize_email, email_addresses or []) if email}
+    keys |= {("phone", phone) for phone in map(normalize_phone, phone_numbers or []) if phone}
+    return [dict(candidate_id=candidate_id, key_type=key_type, key_hash=contact_key_hash(key_type, normalized))
+            for key_type, normalized in sorted(keys)]
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        while self.parent[item] != item:
+            # Path halving keeps the trees flat without recursion
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, first, second):
+        first_root, second_root = self.find(first), self.find(second)
+        if first_root != second_root:
+            # The smaller candidate id becomes the root, so cluster ids are stable across runs
+            if second_root < first_root:
+                first_root, second_root = second_root, first_root
+            self.parent[second_root] = first_root
+
+    def clusters(self):
+        # {root: [members]} for every group with more than one member
+        groups = {}
+        for item in self.parent:
+            groups.setdefault(self.find(item), []).append(item)
+        return {root: sorted(members) for root, members in groups.items() if len(members) > 1}
+
+
+def cluster_candidates(dao):
+    # Union every pair of candidates that share a contact key, then store the resulting clusters.
+    # Keys arrive sorted by hash, so each key's candidates are consecutive and one pass suffices.
+    union_find = UnionFind()
+    previous_hash, previous_candidate = None, None
+    for key_hash, candidate_id in dao.contact_key_pairs():
+        if key_hash == previous_hash and candidate_id != previous_candidate:
+            union_find.union(previous_candidate, candidate_id)
+        previous_hash, previous_candidate = key_hash, candidate_id
+
+    clusters = union_find.clusters()
+    dao.replace_candidate_clusters(clusters)
+    logger.info("Clustered %d candidates into %d groups of likely duplicates",
+                sum(len(members) for members in clusters.values()), len(clusters))
+    return clusters
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.greenhouse_applications.dao import DAO
+
+    parser = argparse.ArgumentParser(description="Candidate contact keys and duplicate clusters")
+    parser.add_argument("--backfill", action="store_true", help="rebuild the contact keys of every stored candidate")
+    parser.add_argument("--cluster", action="store_true", help="recompute the duplicate candidate clusters")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        dao = DAO(db)
+        if args.backfill:
+            print(f"Contact keys rebuilt for {dao.backfill_contact_keys()} candidates")
+        if args.cluster:
+            clusters = cluster_candidates(dao)
+            print(f"{len(clusters)} clusters of likely duplicate candidates")
+    finally:
+        db.close()
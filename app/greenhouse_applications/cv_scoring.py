@@ -0,0 +1,209 @@
+import logging
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+from app.greenhouse_applications.dao import DAO
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Words of two or more characters, keeping the symbols that matter in skills (c++, c#, node.js)
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOP_WORDS = frozenset("""
+    a about above after all also an and any are as at be been being both but by can could did do does
+    during each for from had has have having he her here hers him his how i if in into is it its just
+    me more most my no nor not of off on once only or other our ours out over own same she should so
+    some such than that the their them then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class GrowableArray:
+    # NumPy array with amortized O(1) appends, so adding a document never copies the whole corpus
+    def __init__(self, dtype, values=None, capacity=1024):
+        values = np.asarray([] if values is None else values, dtype=dtype)
+        self._data = np.empty(max(capacity, len(values)), dtype=dtype)
+        self._data[:len(values)] = values
+        self.size = len(values)
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=self._data.dtype)
+        needed = self.size + len(values)
+        if needed > len(self._data):
+            grown = np.empty(max(needed, len(self._data) * 2), dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = values
+        self.size = needed
+
+    @property
+    def view(self):
+        return self._data[:self.size]
+
+
+# Sparse document-term matrix of every indexed resume, stored as parallel COO arrays
+# (document, term, term frequency) plus per-document lengths and per-term document frequencies.
+# Documents are only ever appended; BM25 weights are derived at query time, so corpus statistics
+# never need a rebuild when a resume is added.
+class ResumeCorpus:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.entry_docs = GrowableArray(np.int32)
+        self.entry_terms = GrowableArray(np.int32)
+        self.entry_tfs = GrowableArray(np.float32)
+        self.doc_lengths = GrowableArray(np.float32)
+        self.doc_candidates = GrowableArray(np.int64)
+        self.document_frequency = GrowableArray(np.int32)
+        self.last_rowid = 0  # Highest resume index document already in the matrix
+
+    @property
+    def documents(self):
+        return self.doc_lengths.size
+
+    def add_document(self, candidate_id, text):
+        counts = Counter(tokenize(text))
+        doc = self.documents
+        term_ids = []
+        for term in counts:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = self.vocabulary[term] = len(self.vocabulary)
+                self.document_frequency.extend([0])
+            term_ids.append(term_id)
+
+        self.entry_docs.extend(np.full(len(term_ids), doc))
+        self.entry_terms.extend(term_ids)
+        self.entry_tfs.extend(list(counts.values()))
+        self.doc_lengths.extend([sum(counts.values())])
+        self.doc_candidates.extend([candidate_id])
+        self.document_frequency.view[term_ids] += 1
+
+    def query_weights(self, text):
+        # idf * log-scaled query term frequency for every vocabulary term the text uses
+        counts = Counter(tokenize(text))
+        known = [(self.vocabulary[term], count) for term, count in counts.items() if term in self.vocabulary]
+        weights = np.zeros(len(self.vocabulary), dtype=np.float32)
+        if not known:
+            return weights
+        term_ids = np.array([term_id for term_id, _ in known])
+        query_tfs = np.array([count for _, count in known], dtype=np.float32)
+        df = self.document_frequency.view[term_ids]
+        idf = np.log1p((self.documents - df + 0.5) / (df + 0.5))
+        weights[term_ids] = idf * (1 + np.log(query_tfs))
+        return weights
+
+    def score(self, text, candidate_ids=None):
+        # BM25 of every document against the text, reduced to each candidate's best document.
+        # Returns (candidate_ids, scores) arrays, restricted to candidate_ids when given.
+        if not self.documents:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        weights = self.query_weights(text)
+        entry_weights = weights[self.entry_terms.view]
+        hits = np.flatnonzero(entry_weights)
+        docs = self.entry_docs.view[hits]
+        tfs = self.entry_tfs.view[hits]
+        lengths = self.doc_lengths.view
+        length_norm = 1 - self.b + self.b * lengths[docs] / lengths.mean()
+        contributions = entry_weights[hits] * tfs * (self.k1 + 1) / (tfs + self.k1 * length_norm)
+        doc_scores = np.bincount(docs, weights=contributions, minlength=self.documents)
+
+        doc_candidates = self.doc_candidates.view
+        if candidate_ids is not None:
+            keep = np.isin(doc_candidates, np.fromiter(candidate_ids, dtype=np.int64))
+            doc_candidates, doc_scores = doc_candidates[keep], doc_scores[keep]
+        candidates, inverse = np.unique(doc_candidates, return_inverse=True)
+        best = np.zeros(len(candidates))
+        np.maximum.at(best, inverse, doc_scores)
+        return candidates, best
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vocabulary=np.array(list(self.vocabulary), dtype=str),
+            entry_docs=self.entry_docs.view,
+            entry_terms=self.entry_terms.view,
+            entry_tfs=self.entry_tfs.view,
+            doc_lengths=self.doc_lengths.view,
+            doc_candidates=self.doc_candidates.view,
+            document_frequency=self.document_frequency.view,
+            last_rowid=np.array([self.last_rowid]),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, **options):
+        corpus = cls(**options)
+        with np.load(path) as saved:
+            corpus.vocabulary = {term: term_id for term_id, term in enumerate(saved["vocabulary"].tolist())}
+            for name in ("entry_docs", "entry_terms", "entry_tfs", "doc_lengths", "doc_candidates",
+                         "document_frequency"):
+                current = getattr(corpus, name)
+                setattr(corpus, name, GrowableArray(current.view.dtype, saved[name]))
+            corpus.last_rowid = int(saved["last_rowid"][0])
+        return corpus
+
+
+# Scores a job's applicants against a job description using the resume corpus, which is loaded
+# from its on-disk cache, topped up from the resume index, and saved again when it grew
+class CVScorer:
+    def __init__(self, resume_index, cache_path, sync_batch_size=1000):
+        self.resume_index = resume_index
+        self.cache_path = cache_path
+        self.sync_batch_size = sync_batch_size
+        self._lock = threading.Lock()
+        self.corpus = None
+
+    def refresh(self):
+        # Append resume index documents added since the last refresh; returns how many were added
+        with self._lock:
+            if self.corpus is None:
+                self.corpus = ResumeCorpus.load(self.cache_path) if os.path.exists(self.cache_path) else ResumeCorpus()
+            added = 0
+            while True:
+                documents = self.resume_index.documents_after(self.corpus.last_rowid, self.sync_batch_size)
+                if not documents:
+                    break
+                for rowid, candidate_id, text in documents:
+                    self.corpus.add_document(candidate_id, text)
+                    self.corpus.last_rowid = rowid
+                added += len(documents)
+            if added:
+                self.corpus.save(self.cache_path)
+                logger.info("Added %d resumes to the scoring corpus (%d total)", added, self.corpus.documents)
+            return added
+
+    def score_job(self, db, job_id, job_description):
+        # Score every application of the job that has an indexed resume and bulk-write the scores.
+        # Returns (application_id, candidate_id, score) tuples, best first.
+        self.refresh()
+        dao = DAO(db)
+        applications = dao.job_candidate_applications(job_id)
+        applications_by_candidate = {}
+        for application_id, candidate_id in applications:
+            applications_by_candidate.setdefault(candidate_id, []).append(application_id)
+
+        with self._lock:
+            candidates, scores = self.corpus.score(job_description, applications_by_candidate)
+
+        results = [
+            (application_id, int(candidate_id), round(float(score), 4))
+            for candidate_id, score in zip(candidates.tolist(), scores.tolist())
+            for application_id in applications_by_candidate[candidate_id]
+        ]
+        dao.add_scores([(application_id, score) for application_id, _, score in results])
+        results.sort(key=lambda result: (-result[2], result[0]))
+        logger.info("Scored %d applications for job %s", len(results), job_id)
+        return results
@@ -1,85 +1,318 @@
 import logging
-from sqlalchemy.orm import Session
-from datetime import datetime
-from app.greenhouse_applications.models import Application, Candidate, Job, Score, CandidateAttachment
+import threading
+from contextlib import contextmanager
+from sqlalchemy import (
+    TIMESTAMP, Boolean, and_, bindparam, case, cast, delete, func, insert, literal, literal_column, or_, select
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only, selectinload
+from sqlalchemy.types import JSON
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.greenhouse_applications.models import (
+    Application, Candidate, CandidateCluster, CandidateContactKey, Job, JobTopScore, Score, CandidateAttachment
+)
+from app.greenhouse_applications.contact_keys import contact_key_rows
+from app.greenhouse_applications.ingest_cache import candidate_cache, job_cache, row_digest
+from app.greenhouse_applications.schema import (
+    GreenhouseApplication, GreenhouseAttachment, GreenhouseCandidate, GreenhouseJob, GreenhouseWebhook
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+LOOKUP_CHUNK_SIZE = 5000  # Ids per IN (...) list, well under the bind parameter limits
+
+
+class UpsertCounters:
+    OUTCOMES = ("inserted", "updated", "unchanged")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, table_name, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(table_name, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {table_name: dict(counts) for table_name, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+# Process-wide upsert outcome counters, keyed by table name
+upsert_counters = UpsertCounters()
+
+
+def candidate_row(candidate: GreenhouseCandidate):
+    return dict(
+        candidate_id=candidate.id,
+        first_name=candidate.first_name,
+        last_name=candidate.last_name,
+        title=candidate.title,
+        company=candidate.company,
+        url=candidate.url,
+        phone_numbers=[phone.value for phone in candidate.phone_numbers or []],
+        email_addresses=[email.value for email in candidate.email_addresses or []],
+        education=candidate.educations,
+        addresses=candidate.addresses,
+        tags=candidate.tags,
+        custom_fields=candidate.custom_fields
+    )
+
+
+def job_row(job: GreenhouseJob):
+    return dict(
+        job_id=job.id,
+        name=job.name,
+        requisition_id=job.requisition_id,
+        status=job.status,
+        url=job.url,
+        departments=job.departments,
+        offices=job.offices,
+        created_by_id=job.created_by_id,
+        created_at=job.created_at,
+        opened_at=job.opened_at,
+        closed_at=job.closed_at
+    )
+
+
+def application_row(application: GreenhouseApplication, candidate_id, job_id):
+    return dict(
+        application_id=application.id,
+        candidate_id=candidate_id,
+        job_id=job_id,
+        status=application.status,
+        applied_at=application.applied_at,  # Filled in by DAO._resolve_partition_keys when partitioned
+        last_activity_at=application.last_activity_at,
+        url=application.url,
+        source=application.source,
+        current_stage=application.current_stage,
+    )
+
+
+def application_key():
+    # Unique keys of a partitioned table must include the partition key (applied_at)
+    return ('application_id', 'applied_at') if settings.APPLICATIONS_PARTITIONED else 'application_id'
+
+
+def key_columns(key):
+    return (key,) if isinstance(key, str) else tuple(key)
+
+
+def attachment_row(candidate_id, attachment: GreenhouseAttachment):
+    return dict(
+        candidate_id=candidate_id,
+        filename=attachment.filename,
+        url=attachment.url,
+        type=attachment.type,
+        created_at=datetime.utcnow()
+    )
+
+
+def webhook_rows(webhook: GreenhouseWebhook):
+    # Flatten one Greenhouse webhook into its candidate, job, application and attachment rows
+    application = webhook.payload.application
+    candidate = candidate_row(application.candidate)
+    job = job_row(application.jobs[0])  # Assuming the first job in the array
+    application_record = application_row(application, candidate['candidate_id'], job['job_id'])
+    attachments = [attachment_row(candidate['candidate_id'], attachment)
+                   for attachment in application.candidate.attachments or []]
+    return candidate, job, application_record, attachments
+
+
+# Columns loaded for the read API; related rows come in one extra SELECT ... IN per relationship
+# (scores, candidate, attachments) for every 500 rows, SQLAlchemy's IN batch size. A page of up to
+# 499 applications (500 rows with the next-page probe) costs 4 queries, a full MAX_PAGE_SIZE page 7.
+APPLICATION_LIST_OPTIONS = (
+    load_only(Application.id, Application.application_id, Application.candidate_id, Application.job_id,
+              Application.status, Application.applied_at, Application.last_activity_at, Application.current_stage),
+    selectinload(Application.scores).load_only(Score.score, Score.created_at),
+    selectinload(Application.candidate).load_only(
+        Candidate.candidate_id, Candidate.first_name, Candidate.last_name, Candidate.title, Candidate.company
+    ).selectinload(Candidate.attachments).load_only(
+        CandidateAttachment.filename, CandidateAttachment.url, CandidateAttachment.type
+    ),
+)
+
+CANDIDATE_DETAIL_OPTIONS = (
+    selectinload(Candidate.attachments).load_only(
+        CandidateAttachment.filename, CandidateAttachment.url, CandidateAttachment.type
+    ),
+    selectinload(Candidate.applications).load_only(
+        Application.id, Application.application_id, Application.job_id, Application.status,
+        Application.applied_at, Application.last_activity_at, Application.current_stage,
+    ).selectinload(Application.scores).load_only(Score.score, Score.created_at),
+)
+
+
+def column_changed(table, name, incoming, dialect_name):
+    # "Payload column differs from the stored row" predicate used to skip no-op upserts
+    column = table.c[name]
+    if dialect_name == 'postgresql' and isinstance(column.type, JSON):
+        # json has no equality operator in Postgres, compare as jsonb
+        column, incoming = cast(column, postgresql.JSONB), cast(incoming, postgresql.JSONB)
+    return column.is_distinct_from(incoming)
+
+
 class DAO:
     def __init__(self, db: Session):
         self.db = db
+        self.in_unit_of_work = False
+        self._pending_callbacks = []
 
-    def add_candidate(self, candidate_data):
-        candidate = Candidate(
-            candidate_id=candidate_data['id'],
-            first_name=candidate_data['first_name'],
-            last_name=candidate_data['last_name'],
-            title=candidate_data.get('title'),
-            company=candidate_data.get('company'),
-            url=candidate_data.get('url'),
-            phone_numbers=[phone['value'] for phone in candidate_data.get('phone_numbers', [])],
-            email_addresses=[email['value'] for email in candidate_data.get('email_addresses', [])],
-            education=candidate_data.get('educations', {}),
-            addresses=candidate_data.get('addresses', {}),
-            tags=candidate_data.get('tags', []),
-            custom_fields=candidate_data.get('custom_fields', {})
-        )
+    @contextmanager
+    def unit_of_work(self):
+        # Stage every row added inside the block and write them in one transaction
+        # with a single commit. Any failure rolls the whole batch back.
+        if self.in_unit_of_work:
+            yield self
+            return
+
+        self.in_unit_of_work = True
         try:
-            self.db.add(candidate)
+            yield self
+            self.db.commit()
+            for callback in self._pending_callbacks:
+                callback()
+            logger.info("Unit of work committed successfully.")
+        except Exception as e:
+            self.db.rollback()
+            logger.error("Error committing unit of work, rolled back: %s", str(e))
+            raise e
+        finally:
+            self.in_unit_of_work = False
+            self._pending_callbacks = []
+
+    def _after_commit(self, callback):
+        # Run now if the write is already committed, otherwise only once the unit of work commits
+        if self.in_unit_of_work:
+            self._pending_callbacks.append(callback)
+        else:
+            callback()
+
+    def _save(self, instance, refresh=True):
+        # Inside a unit of work rows are only staged; the commit happens once at the end.
+        self.db.add(instance)
+        if self.in_unit_of_work:
+            return False
+        self.db.commit()
+        if refresh:
+            self.db.refresh(instance)
+        return True
+
+    def _upsert(self, instance, key):
+        # Write a transient model instance with INSERT ... ON CONFLICT DO UPDATE on its unique key
+        # (a column name or a tuple of them). The row (and its updated_at) is only touched when one
+        # of the payload columns changed.
+        table = instance.__table__
+        values = {name: value for name, value in vars(instance).items() if name in table.c}
+        compare_columns = [name for name in values if name not in key_columns(key)]
+        values['updated_at'] = datetime.utcnow()
+
+        if self.db.get_bind().dialect.name == 'postgresql':
+            outcome, row_id = self._upsert_postgresql(table, values, key, compare_columns)
+        else:
+            outcome, row_id = self._upsert_sqlite(table, values, key, compare_columns)
+
+        instance.id = row_id
+        if not self.in_unit_of_work:
             self.db.commit()
-            self.db.refresh(candidate)
-            logger.info("Candidate added successfully: %s", candidate.first_name + " " + candidate.last_name)
+        self._after_commit(lambda: upsert_counters.record(table.name, outcome))
+        return outcome
+
+    def _upsert_postgresql(self, table, values, key, compare_columns):
+        stmt = postgresql.insert(table).values(**values)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns(key)],
+            set_={name: excluded[name] for name in compare_columns + ['updated_at']},
+            where=or_(*[column_changed(table, name, excluded[name], 'postgresql') for name in compare_columns]),
+        ).returning(table.c.id, literal_column("xmax = 0", Boolean).label("inserted"))
+
+        row = self.db.execute(stmt).first()
+        if row is None:
+            return "unchanged", None
+        return ("inserted" if row.inserted else "updated"), row.id
+
+    def _upsert_sqlite(self, table, values, key, compare_columns):
+        # SQLite cannot tell an inserted row from an updated one in RETURNING, so insert with
+        # DO NOTHING and follow up with an UPDATE guarded by the same "payload changed" check.
+        stmt = sqlite.insert(table).values(**values).on_conflict_do_nothing(
+            index_elements=[table.c[name] for name in key_columns(key)]
+        ).returning(table.c.id)
+        row = self.db.execute(stmt).first()
+        if row is not None:
+            return "inserted", row.id
+
+        stmt = (
+            table.update()
+            .where(*[table.c[name] == values[name] for name in key_columns(key)])
+            .where(or_(*[column_changed(table, name, values[name], 'sqlite') for name in compare_columns]))
+            .values({name: values[name] for name in compare_columns + ['updated_at']})
+            .returning(table.c.id)
+        )
+        row = self.db.execute(stmt).first()
+        if row is None:
+            return "unchanged", None
+        return "updated", row.id
+
+    def add_candidate(self, candidate_data: GreenhouseCandidate):
+        row = candidate_row(candidate_data)
+        candidate = Candidate(**row)
+        digest = row_digest(row)
+        if candidate_cache().is_unchanged(candidate.candidate_id, digest):
+            logger.debug("Candidate unchanged, skipping write: %s", candidate.candidate_id)
+            return candidate
+
+        try:
+            with self.unit_of_work():
+                outcome = self._upsert(candidate, 'candidate_id')
+                if outcome != "unchanged":
+                    self._replace_contact_keys([row])
+            self._after_commit(lambda: candidate_cache().remember(candidate.candidate_id, digest))
+            logger.info("Candidate %s: %s %s", outcome, candidate.first_name, candidate.last_name)
         except Exception as e:
+            candidate_cache().invalidate(candidate.candidate_id)
             self.db.rollback()
             logger.error("Error adding candidate: %s", str(e))
             raise e
 
         return candidate
 
-    def add_job(self, job_data):
-        job = Job(
-            job_id=job_data['id'],
-            name=job_data['name'],
-            requisition_id=job_data.get('requisition_id'),
-            status=job_data.get('status'),
-            url=job_data.get('url'),
-            departments=job_data.get('departments', {}),
-            offices=job_data.get('offices', {}),
-            created_by_id=job_data.get('created_by_id'),
-            created_at=job_data.get('created_at'),
-            opened_at=job_data.get('opened_at'),
-            closed_at=job_data.get('closed_at')
-        )
+    def add_job(self, job_data: GreenhouseJob):
+        row = job_row(job_data)
+        job = Job(**row)
+        digest = row_digest(row)
+        if job_cache().is_unchanged(job.job_id, digest):
+            logger.debug("Job unchanged, skipping write: %s", job.job_id)
+            return job
+
         try:
-            self.db.add(job)
-            self.db.commit()
-            self.db.refresh(job)
-            logger.info("Job added successfully: %s", job.name)
+            outcome = self._upsert(job, 'job_id')
+            self._after_commit(lambda: job_cache().remember(job.job_id, digest))
+            logger.info("Job %s: %s", outcome, job.name)
         except Exception as e:
+            job_cache().invalidate(job.job_id)
             self.db.rollback()
             logger.error("Error adding job: %s", str(e))
             raise e
 
         return job
 
-    def add_application(self, application_data, candidate_id, job_id):
-        application = Application(
-            application_id=application_data['id'],
-            candidate_id=candidate_id,
-            job_id=job_id,
-            status=application_data.get('status'),
-            applied_at=application_data.get('applied_at'),
-            last_activity_at=application_data.get('last_activity_at'),
-            url=application_data['url'],
-            source=application_data.get('source', {}),
-            current_stage=application_data.get('current_stage'),
-        )
+    def add_application(self, application_data: GreenhouseApplication, candidate_id, job_id):
+        row = application_row(application_data, candidate_id, job_id)
         try:
-            self.db.add(application)
-            self.db.commit()
-            self.db.refresh(application)
-            logger.info("Application added successfully: %s", application.application_id)
+            self._resolve_partition_keys([row])
+            application = Application(**row)
+            outcome = self._upsert(application, application_key())
+            logger.info("Application %s: %s", outcome, application.application_id)
         except Exception as e:
             self.db.rollback()
             logger.error("Error adding application: %s", str(e))
@@ -87,37 +320,535 @@ class DAO:
 
         return application
 
-    def add_candidate_attachment(self, candidate_id: int, attachment_data):
-        attachment = CandidateAttachment(
-            candidate_id=candidate_id,
-            filename=attachment_data['filename'],
-            url=attachment_data['url'],
-            type=attachment_data['type'],
-            created_at=datetime.utcnow()
-        )
+    def _resolve_partition_keys(self, rows):
+        # Partitioned applications are upserted on (application_id, applied_at), so every delivery
+        # of an application must carry the same applied_at. A payload without one reuses the stored
+        # value (last_activity_at for a new application); one that brings the real date first moves
+        # the stored row to it.
+        if not settings.APPLICATIONS_PARTITIONED or not rows:
+            return
+        stored = {}
+        application_ids = [row['application_id'] for row in rows]
+        for i in range(0, len(application_ids), LOOKUP_CHUNK_SIZE):
+            stmt = select(Application.application_id, Application.applied_at).where(
+                Application.application_id.in_(application_ids[i:i + LOOKUP_CHUNK_SIZE])
+            )
+            stored.update(self.db.execute(stmt).all())
+
+        moved = []
+        for row in rows:
+            current = stored.get(row['application_id'])
+            if row['applied_at'] is None:
+                row['applied_at'] = current or row['last_activity_at'] or datetime.utcnow()
+            elif current is not None and current != row['applied_at']:
+                moved.append({'key': row['application_id'], 'applied_at': row['applied_at']})
+        if moved:
+            table = Application.__table__
+            self.db.execute(
+                table.update().where(table.c.application_id == bindparam('key')).values(applied_at=bindparam('applied_at')),
+                moved,
+            )
+
+    def add_candidate_attachment(self, candidate_id: int, attachment_data: GreenhouseAttachment):
         try:
-            self.db.add(attachment)
-            self.db.commit()
-            logger.info("Candidate attachment added successfully for candidate_id: %d", candidate_id)
+            self._upsert_attachments([attachment_row(candidate_id, attachment_data)])
+            if not self.in_unit_of_work:
+                self.db.commit()
+                logger.info("Candidate attachment stored for candidate_id: %d", candidate_id)
         except Exception as e:
             self.db.rollback()
             logger.error("Error adding candidate attachment: %s", str(e))
             raise e
 
+    def _upsert_attachments(self, rows):
+        # Insert attachments or, for a file the candidate already has, refresh its url. Greenhouse
+        # urls are signed and expire, so a fetch that failed is retried with the new one, with its
+        # attempts counted afresh.
+        rows = list({(row['candidate_id'], row['filename'], row['type']): row for row in rows}.values())
+        if not rows:
+            return
+        table = CandidateAttachment.__table__
+        dialect_name = self.db.get_bind().dialect.name
+        stmt = (postgresql.insert if dialect_name == 'postgresql' else sqlite.insert)(table)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.candidate_id, table.c.filename, table.c.type],
+            set_={
+                'url': excluded.url,
+                'fetch_status': case((table.c.fetch_status == 'failed', None), else_=table.c.fetch_status),
+                # or_ rather than in_: expanding IN parameters cannot go through executemany
+                'fetch_attempts': case((or_(table.c.fetch_status == 'failed', table.c.fetch_status == 'retry'), 0),
+                                       else_=table.c.fetch_attempts),
+            },
+            where=table.c.url.is_distinct_from(excluded.url),
+        )
+        self.db.execute(stmt, rows)
+
     def add_score(self, application_id, score_value):
         score = Score(
             application_id=application_id,
             score=score_value,
             created_at=datetime.utcnow()
         )
+        committed_here = not self.in_unit_of_work
         try:
-            self.db.add(score)
-            self.db.commit()
-            self.db.refresh(score)
-            logger.info("Score added successfully for application_id: %s", application_id)
+            with self.unit_of_work():
+                self._save(score)
+                self.db.flush()  # A leaderboard recompute reads the scores table
+                self._update_top_scores([{'application_id': application_id, 'score': score_value}])
+            if committed_here:
+                logger.info("Score added successfully for application_id: %s", application_id)
         except Exception as e:
-            self.db.rollback()
             logger.error("Error adding score: %s", str(e))
             raise e
 
         return score
+
+    def add_scores(self, scores):
+        # Insert many (application_id, score) pairs with one executemany INSERT and fold them
+        # into the per-job leaderboard in the same transaction
+        now = datetime.utcnow()
+        rows = [{'application_id': application_id, 'score': score_value, 'created_at': now}
+                for application_id, score_value in scores]
+        if not rows:
+            return 0
+
+        with self.unit_of_work():
+            self.db.execute(insert(Score.__table__), rows)
+            self._update_top_scores(rows)
+
+        logger.info("Bulk added %d scores", len(rows))
+        return len(rows)
+
+    def _update_top_scores(self, rows):
+        # Put each application's latest new score on its job's leaderboard, then trim the touched
+        # jobs back to SCORE_TOP_K. A score can go down, which may let an application trimmed
+        # earlier back in, so jobs where an entry dropped are recomputed from the scores table.
+        latest = {}
+        for row in rows:
+            if row['score'] is not None:
+                latest[row['application_id']] = row['score']
+        if not latest:
+            return
+
+        table = JobTopScore.__table__
+        now = datetime.utcnow()
+        entries = []
+        lowered_jobs = set()
+        application_ids = list(latest)
+        for i in range(0, len(application_ids), LOOKUP_CHUNK_SIZE):
+            chunk = application_ids[i:i + LOOKUP_CHUNK_SIZE]
+            stmt = select(Application.application_id, Application.job_id, Application.candidate_id).where(
+                Application.application_id.in_(chunk),
+                Application.job_id.is_not(None),
+            )
+            entries.extend(
+                {'job_id': job_id, 'application_id': application_id, 'candidate_id': candidate_id,
+                 'score': latest[application_id], 'updated_at': now}
+                for application_id, job_id, candidate_id in self.db.execute(stmt)
+            )
+            stored = select(table.c.job_id, table.c.application_id, table.c.score).where(
+                table.c.application_id.in_(chunk)
+            )
+            lowered_jobs.update(job_id for job_id, application_id, score in self.db.execute(stored)
+                                if score > latest[application_id])
+        if not entries:
+            return
+
+        dialect_name = self.db.get_bind().dialect.name
+        stmt = (postgresql.insert if dialect_name == 'postgresql' else sqlite.insert)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.job_id, table.c.application_id],
+            set_={'score': stmt.excluded.score, 'updated_at': stmt.excluded.updated_at},
+            where=table.c.score.is_distinct_from(stmt.excluded.score),
+        )
+        self.db.execute(stmt, entries)
+        self._trim_top_scores({entry['job_id'] for entry in entries} - lowered_jobs)
+        self._recompute_top_scores(lowered_jobs)
+
+    def _trim_top_scores(self, job_ids):
+        table = JobTopScore.__table__
+        job_ids = list(job_ids)
+        for i in range(0, len(job_ids), LOOKUP_CHUNK_SIZE):
+            ranked = select(
+                table.c.id,
+                func.row_number().over(
+                    partition_by=table.c.job_id, order_by=(table.c.score.desc(), table.c.application_id)
+                ).label('rank'),
+            ).where(table.c.job_id.in_(job_ids[i:i + LOOKUP_CHUNK_SIZE])).subquery()
+            self.db.execute(
+                delete(table).where(table.c.id.in_(select(ranked.c.id).where(ranked.c.rank > settings.SCORE_TOP_K)))
+            )
+
+    def _recompute_top_scores(self, job_ids):
+        # Rebuild the leaderboards of these jobs from each application's latest score
+        table = JobTopScore.__table__
+        job_ids = list(job_ids)
+        now = datetime.utcnow()
+        for i in range(0, len(job_ids), LOOKUP_CHUNK_SIZE):
+            chunk = job_ids[i:i + LOOKUP_CHUNK_SIZE]
+            latest_ids = (
+                select(func.max(Score.id))
+                .join(Application, Application.application_id == Score.application_id)
+                .where(Application.job_id.in_(chunk), Score.score.is_not(None))
+                .group_by(Score.application_id)
+            )
+            ranked = (
+                select(
+                    Application.job_id, Application.application_id, Application.candidate_id, Score.score,
+                    func.row_number().over(
+                        partition_by=Application.job_id, order_by=(Score.score.desc(), Application.application_id)
+                    ).label('rank'),
+                )
+                .join(Score, Score.application_id == Application.application_id)
+                .where(Score.id.in_(latest_ids))
+                .subquery()
+            )
+            self.db.execute(delete(table).where(table.c.job_id.in_(chunk)))
+            self.db.execute(table.insert().from_select(
+                ['job_id', 'application_id', 'candidate_id', 'score', 'updated_at'],
+                select(ranked.c.job_id, ranked.c.application_id, ranked.c.candidate_id, ranked.c.score,
+                       literal(now, TIMESTAMP)).where(ranked.c.rank <= settings.SCORE_TOP_K),
+            ))
+
+    def rebuild_top_scores(self):
+        # Recompute every leaderboard from the scores table, e.g. after SCORE_TOP_K changed
+        with self.unit_of_work():
+            self.db.execute(delete(JobTopScore.__table__))
+            scored_jobs = (
+                select(Application.job_id).distinct()
+                .join(Score, Score.application_id == Application.application_id)
+                .where(Application.job_id.is_not(None))
+            )
+            self._recompute_top_scores(self.db.scalars(scored_jobs).all())
+
+    def top_scores(self, job_id, limit):
+        # Best-scored applications of a job, straight from the leaderboard index
+        stmt = (
+            select(JobTopScore.application_id, JobTopScore.candidate_id, JobTopScore.score)
+            .where(JobTopScore.job_id == job_id)
+            .order_by(JobTopScore.score.desc(), JobTopScore.application_id)
+            .limit(limit)
+        )
+        return self.db.execute(stmt).all()
+
+    def closed_job_applications(self, closed_before, after_id=0, limit=1000):
+        # Applications of jobs closed before the cutoff, in id order, with their scores loaded.
+        # Jobs marked closed without a closed_at date count from their last update.
+        closed_jobs = select(Job.job_id).where(
+            Job.status == 'closed',
+            func.coalesce(Job.closed_at, Job.updated_at) < closed_before,
+        )
+        stmt = (
+            select(Application)
+            .options(selectinload(Application.scores))
+            .where(Application.job_id.in_(closed_jobs), Application.id > after_id)
+            .order_by(Application.id)
+            .limit(limit)
+        )
+        return self.db.scalars(stmt).all()
+
+    def delete_applications(self, application_ids):
+        # Remove applications together with their scores and leaderboard entries
+        with self.unit_of_work():
+            for i in range(0, len(application_ids), LOOKUP_CHUNK_SIZE):
+                chunk = application_ids[i:i + LOOKUP_CHUNK_SIZE]
+                self.db.execute(delete(Score.__table__).where(Score.application_id.in_(chunk)))
+                self.db.execute(delete(JobTopScore.__table__).where(JobTopScore.application_id.in_(chunk)))
+                self.db.execute(delete(Application.__table__).where(Application.application_id.in_(chunk)))
+        return len(application_ids)
+
+    def ingest_application(self, webhook: GreenhouseWebhook):
+        # Store the candidate, job, application and attachments of one Greenhouse webhook together
+        application_data = webhook.payload.application
+        candidate_data = application_data.candidate
+        job_data = application_data.jobs[0]  # Assuming the first job in the array
+
+        with self.unit_of_work():
+            candidate = self.add_candidate(candidate_data)
+            job = self.add_job(job_data)
+            application = self.add_application(application_data, candidate.candidate_id, job.job_id)
+
+            # Process attachments
+            for attachment in candidate_data.attachments or []:
+                self.add_candidate_attachment(candidate.candidate_id, attachment)
+
+        return application
+
+    def bulk_ingest_rows(self, row_sets):
+        # Write many webhooks (as produced by webhook_rows) with one multi-row statement per table
+        candidates, jobs, applications, attachments = {}, {}, {}, []
+        for candidate, job, application, application_attachments in row_sets:
+            # Later payloads win when the same key shows up twice in one batch
+            candidates[candidate['candidate_id']] = candidate
+            jobs[job['job_id']] = job
+            applications[application['application_id']] = application
+            attachments.extend(application_attachments)
+
+        # Rows whose payload this process already stored unchanged need no write at all
+        candidate_digests = {key: row_digest(row) for key, row in candidates.items()}
+        job_digests = {key: row_digest(row) for key, row in jobs.items()}
+        candidates = {key: row for key, row in candidates.items()
+                      if not candidate_cache().is_unchanged(key, candidate_digests[key])}
+        jobs = {key: row for key, row in jobs.items() if not job_cache().is_unchanged(key, job_digests[key])}
+
+        with self.unit_of_work():
+            self._bulk_upsert(Candidate.__table__, list(candidates.values()), 'candidate_id')
+            self._replace_contact_keys(list(candidates.values()))
+            self._bulk_upsert(Job.__table__, list(jobs.values()), 'job_id')
+            self._resolve_partition_keys(list(applications.values()))
+            self._bulk_upsert(Application.__table__, list(applications.values()), application_key())
+            self._upsert_attachments(attachments)
+
+            for key in candidates:
+                self._after_commit(lambda key=key: candidate_cache().remember(key, candidate_digests[key]))
+            for key in jobs:
+                self._after_commit(lambda key=key: job_cache().remember(key, job_digests[key]))
+
+        logger.info("Bulk ingested %d applications, %d candidates, %d jobs, %d attachments",
+                    len(applications), len(candidates), len(jobs), len(attachments))
+        return list(applications)
+
+    def _bulk_upsert(self, table, rows, key):
+        if not rows:
+            return
+        dialect_name = self.db.get_bind().dialect.name
+        stmt = (postgresql.insert if dialect_name == 'postgresql' else sqlite.insert)(table)
+        excluded = stmt.excluded
+        compare_columns = [name for name in rows[0] if name not in key_columns(key)]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in key_columns(key)],
+            set_={name: excluded[name] for name in compare_columns + ['updated_at']},
+            where=or_(*[column_changed(table, name, excluded[name], dialect_name) for name in compare_columns]),
+        )
+        now = datetime.utcnow()
+        self.db.execute(stmt, [{**row, 'updated_at': now} for row in rows])
+
+    def claim_attachments_to_fetch(self, limit, lease_seconds):
+        # Lease a batch of attachments nobody is working on: never tried, lease expired or retry due.
+        # The lease keeps a second fetcher (another worker process) off the same rows.
+        table = CandidateAttachment.__table__
+        now = datetime.utcnow()
+        due = (
+            select(table.c.id)
+            .where(or_(
+                table.c.fetch_status.is_(None),
+                and_(table.c.fetch_status.in_(('fetching', 'retry')), table.c.fetch_claimed_until < now),
+            ))
+            .order_by(table.c.id)
+            .limit(limit)
+        )
+        if self.db.get_bind().dialect.name == 'postgresql':
+            due = due.with_for_update(skip_locked=True)
+
+        stmt = (
+            table.update()
+            .where(table.c.id.in_(due))
+            .values(
+                fetch_status='fetching',
+                fetch_claimed_until=now + timedelta(seconds=lease_seconds),
+                fetch_attempts=func.coalesce(table.c.fetch_attempts, 0) + 1,
+            )
+            .returning(table.c.id, table.c.candidate_id, table.c.url, table.c.filename, table.c.fetch_attempts,
+                       table.c.fetch_claimed_until)
+        )
+        with self.unit_of_work():
+            return self.db.execute(stmt).all()
+
+    def record_attachment_fetches(self, results):
+        # Write back a batch of fetch outcomes (dicts keyed by attachment_id, with the leased_until the
+        # row was claimed with) in one executemany UPDATE. A row whose lease ran out and was claimed
+        # again by another fetcher is left to that fetcher.
+        if not results:
+            return
+        table = CandidateAttachment.__table__
+        stmt = table.update().where(
+            table.c.id == bindparam('attachment_id'),
+            table.c.fetch_status == 'fetching',
+            table.c.fetch_claimed_until == bindparam('leased_until'),
+        )
+        with self.unit_of_work():
+            self.db.execute(stmt, results)
+
+    def _fetched_attachments_query(self):
+        # Downloaded attachments with their candidate's name
+        return (
+            select(CandidateAttachment.id, CandidateAttachment.candidate_id, CandidateAttachment.filename,
+                   CandidateAttachment.content_type, CandidateAttachment.content_sha256,
+                   CandidateAttachment.storage_path, CandidateAttachment.fetched_at,
+                   Candidate.first_name, Candidate.last_name, Candidate.title)
+            .join(Candidate, Candidate.candidate_id == CandidateAttachment.candidate_id)
+            .where(CandidateAttachment.fetch_status == 'fetched')
+        )
+
+    def fetched_attachments(self, after, limit):
+        # Downloaded attachments in (fetched_at, id) order after the given key
+        stmt = self._fetched_attachments_query()
+        if after is not None:
+            fetched_at, last_id = after
+            stmt = stmt.where(or_(
+                CandidateAttachment.fetched_at > fetched_at,
+                and_(CandidateAttachment.fetched_at == fetched_at, CandidateAttachment.id > last_id),
+            ))
+        stmt = stmt.order_by(CandidateAttachment.fetched_at, CandidateAttachment.id).limit(limit)
+        return self.db.execute(stmt).all()
+
+    def fetched_attachments_by_id(self, attachment_ids):
+        stmt = self._fetched_attachments_query().where(CandidateAttachment.id.in_(attachment_ids))
+        return self.db.execute(stmt.order_by(CandidateAttachment.id)).all()
+
+    def job_candidate_applications(self, job_id):
+        # (application_id, candidate_id) of every application to a job
+        stmt = select(Application.application_id, Application.candidate_id).where(
+            Application.job_id == job_id, Application.candidate_id.is_not(None)
+        )
+        return self.db.execute(stmt).all()
+
+    def _replace_contact_keys(self, candidate_rows):
+        # Rewrite the contact keys of the given candidates (rows as built by candidate_row)
+        table = CandidateContactKey.__table__
+        candidate_ids = [row['candidate_id'] for row in candidate_rows]
+        for i in range(0, len(candidate_ids), LOOKUP_CHUNK_SIZE):
+            self.db.execute(delete(table).where(table.c.candidate_id.in_(candidate_ids[i:i + LOOKUP_CHUNK_SIZE])))
+        keys = [key for row in candidate_rows
+                for key in contact_key_rows(row['candidate_id'], row['email_addresses'], row['phone_numbers'])]
+        if keys:
+            self.db.execute(insert(table), keys)
+
+    def backfill_contact_keys(self, batch_size=1000):
+        # Rebuild the contact keys of every stored candidate, one transaction per batch
+        last_id, total = 0, 0
+        while True:
+            rows = self.db.execute(
+                select(Candidate.id, Candidate.candidate_id, Candidate.email_addresses, Candidate.phone_numbers)
+                .where(Candidate.id > last_id).order_by(Candidate.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return total
+            with self.unit_of_work():
+                self._replace_contact_keys([row._asdict() for row in rows])
+            last_id, total = rows[-1].id, total + len(rows)
+
+    def candidates_by_contact_hashes(self, key_hashes):
+        # Candidate ids holding any of the key hashes, through the key_hash index
+        stmt = select(CandidateContactKey.candidate_id).where(CandidateContactKey.key_hash.in_(list(key_hashes))).distinct()
+        return self.db.scalars(stmt).all()
+
+    def duplicate_candidates(self, candidate_id):
+        # Other candidates sharing at least one contact key with this one, and the key types they share
+        own = CandidateContactKey.__table__.alias("own")
+        other = CandidateContactKey.__table__.alias("other")
+        stmt = (
+            select(other.c.candidate_id, other.c.key_type)
+            .join(own, own.c.key_hash == other.c.key_hash)
+            .where(own.c.candidate_id == candidate_id, other.c.candidate_id != candidate_id)
+            .distinct()
+        )
+        duplicates = {}
+        for other_id, key_type in self.db.execute(stmt):
+            duplicates.setdefault(other_id, []).append(key_type)
+        return duplicates
+
+    def contact_key_pairs(self, yield_per=10000):
+        # Every (key_hash, candidate_id), grouped by key hash, streamed for the clustering job
+        stmt = (
+            select(CandidateContactKey.key_hash, CandidateContactKey.candidate_id)
+            .order_by(CandidateContactKey.key_hash, CandidateContactKey.candidate_id)
+            .execution_options(yield_per=yield_per)
+        )
+        return self.db.execute(stmt)
+
+    def replace_candidate_clusters(self, clusters):
+        # clusters: {cluster_id: [candidate_id, ...]}, swapped in as a whole in one transaction
+        now = datetime.utcnow()
+        rows = [dict(candidate_id=candidate_id, cluster_id=cluster_id, updated_at=now)
+                for cluster_id, members in clusters.items() for candidate_id in members]
+        with self.unit_of_work():
+            self.db.execute(delete(CandidateCluster.__table__))
+            if rows:
+                self.db.execute(insert(CandidateCluster.__table__), rows)
+
+    def candidate_cluster(self, candidate_id):
+        # Candidate ids in the same duplicate cluster (as of the last clustering run), itself included
+        cluster_id = select(CandidateCluster.cluster_id).where(CandidateCluster.candidate_id == candidate_id)
+        stmt = select(CandidateCluster.candidate_id).where(CandidateCluster.cluster_id == cluster_id.scalar_subquery())
+        return sorted(self.db.scalars(stmt).all())
+
+    def job_exists(self, job_id):
+        return self.db.scalar(select(Job.id).where(Job.job_id == job_id)) is not None
+
+    def job_applications(self, job_id, limit, after=None):
+        # A job's applications newest first, keyset paginated on (applied_at, id). The page is loaded
+        # whole: with yield_per the selectinloads would run again for every chunk.
+        # after is the (applied_at, id) of the last row of the previous page; NULL applied_at sorts first.
+        stmt = select(Application).where(Application.job_id == job_id)
+        if after is not None:
+            applied_at, last_id = after
+            if applied_at is None:
+                stmt = stmt.where(or_(
+                    Application.applied_at.is_not(None),
+                    and_(Application.applied_at.is_(None), Application.id < last_id),
+                ))
+            else:
+                stmt = stmt.where(or_(
+                    Application.applied_at < applied_at,
+                    and_(Application.applied_at == applied_at, Application.id < last_id),
+                ))
+        stmt = (
+            stmt.options(*APPLICATION_LIST_OPTIONS)
+            .order_by(Application.applied_at.desc().nulls_first(), Application.id.desc())
+            .limit(limit)
+        )
+        return self.db.scalars(stmt).all()
+
+    def get_candidate_detail(self, candidate_id):
+        # Candidate with attachments, applications and their scores, in four queries
+        stmt = select(Candidate).where(Candidate.candidate_id == candidate_id).options(*CANDIDATE_DETAIL_OPTIONS)
+        return self.db.scalars(stmt).one_or_none()
+
+
+# Async counterpart of DAO for an AsyncSession. The DAO code itself runs on the async connection
+# through run_sync, so callers await database I/O instead of blocking the event loop.
+class AsyncDAO:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._dao = DAO(db.sync_session)
+
+    async def _run(self, method, *args):
+        return await self.db.run_sync(lambda _: method(*args))
+
+    async def add_candidate(self, candidate_data: GreenhouseCandidate):
+        return await self._run(self._dao.add_candidate, candidate_data)
+
+    async def add_job(self, job_data: GreenhouseJob):
+        return await self._run(self._dao.add_job, job_data)
+
+    async def add_application(self, application_data: GreenhouseApplication, candidate_id, job_id):
+        return await self._run(self._dao.add_application, application_data, candidate_id, job_id)
+
+    async def add_candidate_attachment(self, candidate_id: int, attachment_data: GreenhouseAttachment):
+        return await self._run(self._dao.add_candidate_attachment, candidate_id, attachment_data)
+
+    async def add_score(self, application_id, score_value):
+        return await self._run(self._dao.add_score, application_id, score_value)
+
+    async def add_scores(self, scores):
+        return await self._run(self._dao.add_scores, scores)
+
+    async def top_scores(self, job_id, limit):
+        return await self._run(self._dao.top_scores, job_id, limit)
+
+    async def ingest_application(self, webhook: GreenhouseWebhook):
+        return await self._run(self._dao.ingest_application, webhook)
+
+    async def bulk_ingest_rows(self, row_sets):
+        return await self._run(self._dao.bulk_ingest_rows, row_sets)
+
+    async def get_candidate_detail(self, candidate_id):
+        return await self._run(self._dao.get_candidate_detail, candidate_id)
+
+    async def duplicate_candidates(self, candidate_id):
+        return await self._run(self._dao.duplicate_candidates, candidate_id)
+
+    async def candidate_cluster(self, candidate_id):
+        return await self._run(self._dao.candidate_cluster, candidate_id)
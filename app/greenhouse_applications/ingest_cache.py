@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+from app.core.config import settings
+
+
+def row_digest(row):
+    # Stable hash of the column values we would write for a payload
+    encoded = json.dumps(row, sort_keys=True, default=str, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+# Bounded LRU + TTL map of Greenhouse id -> digest of the payload this process last stored for it.
+# A hit means the row is already in the database with exactly this content, so the write can be skipped.
+class PayloadCache:
+    def __init__(self, name, max_size=10000, ttl=300):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def is_unchanged(self, key, digest):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def remember(self, key, digest):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (digest, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Built on first use, so importing the module reads no settings
+@cache
+def candidate_cache():
+    return PayloadCache("candidates", settings.INGEST_CACHE_SIZE, settings.INGEST_CACHE_TTL)
+
+
+@cache
+def job_cache():
+    return PayloadCache("jobs", settings.INGEST_CACHE_SIZE, settings.INGEST_CACHE_TTL)
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from pydantic import ValidationError
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from app.greenhouse_applications.dao import DAO
+from app.greenhouse_applications.webhook_pipeline import parse_webhook
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+QueuedWebhook = namedtuple("QueuedWebhook", ["id", "body", "enqueued_at", "attempts", "retries"])
+# Failures of the database rather than of the payload (outage, failover, exhausted pool)
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError, ConnectionError)
+
+
+def is_transient(error):
+    return isinstance(error, TRANSIENT_ERRORS) or getattr(error, "connection_invalidated", False)
+
+
+# Durable, SQLite-backed queue of raw webhook bodies waiting to be written through the DAO.
+# Claimed rows stay in the queue until they are acknowledged, so a worker that dies mid-batch
+# only delays them until the visibility timeout expires (at-least-once delivery).
+class IngestQueue:
+    def __init__(self, path, max_attempts=5, visibility_timeout=60, retry_backoff=5, max_backoff=300):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS webhook_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                body BLOB NOT NULL,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                claimed_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                retries INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_webhook_queue_available_at ON webhook_queue (available_at);
+            CREATE TABLE IF NOT EXISTS webhook_dead_letter (
+                id INTEGER PRIMARY KEY,
+                body BLOB NOT NULL,
+                enqueued_at REAL NOT NULL,
+                failed_at REAL NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT
+            );
+        """)
+        # Queue files created before retries existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(webhook_queue)")}
+        if "retries" not in columns:
+            self._conn.execute("ALTER TABLE webhook_queue ADD COLUMN retries INTEGER NOT NULL DEFAULT 0")
+
+    def enqueue(self, body: bytes):
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO webhook_queue (body, enqueued_at, available_at) VALUES (?, ?, ?)",
+                (body, now, now),
+            )
+        return cursor.lastrowid
+
+    def claim(self, batch_size):
+        # Hide the claimed rows from other workers until the visibility timeout runs out
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body, enqueued_at, attempts, retries FROM webhook_queue "
+                    "WHERE available_at <= ? AND (claimed_until IS NULL OR claimed_until <= ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, now, batch_size),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE webhook_queue SET claimed_until = ? WHERE id = ?",
+                    [(now + self.visibility_timeout, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [QueuedWebhook(*row) for row in rows]
+
+    def ack(self, ids):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany("DELETE FROM webhook_queue WHERE id = ?", [(queue_id,) for queue_id in ids])
+            self._conn.execute("COMMIT")
+
+    def fail(self, item: QueuedWebhook, error: str, permanent=False, transient=False):
+        # Retry with a capped exponential backoff, or move the payload to the dead-letter table once
+        # it keeps failing (or straight away for permanent errors such as an invalid payload).
+        # Transient failures are retried without using up attempts, however long the outage lasts.
+        now = time.time()
+        attempts = item.attempts if transient else item.attempts + 1
+        retries = item.retries + 1
+        dead = not transient and (permanent or attempts >= self.max_attempts)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if dead:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO webhook_dead_letter "
+                        "(id, body, enqueued_at, failed_at, attempts, last_error) VALUES (?, ?, ?, ?, ?, ?)",
+                        (item.id, item.body, item.enqueued_at, now, attempts, error),
+                    )
+                    self._conn.execute("DELETE FROM webhook_queue WHERE id = ?", (item.id,))
+                else:
+                    self._conn.execute(
+                        "UPDATE webhook_queue SET attempts = ?, retries = ?, last_error = ?, available_at = ?, "
+                        "claimed_until = NULL WHERE id = ?",
+                        (attempts, retries, error, now + self.backoff(retries), item.id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dead
+
+    def backoff(self, retries):
+        return min(self.retry_backoff * 2 ** (retries - 1), self.max_backoff)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            depth, in_flight, oldest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(claimed_until > ?), 0), MIN(enqueued_at) "
+                "FROM webhook_queue",
+                (now,),
+            ).fetchone()
+            dead_letters = self._conn.execute("SELECT COUNT(*) FROM webhook_dead_letter").fetchone()[0]
+        return {
+            "depth": depth,
+            "in_flight": in_flight,
+            "lag_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "dead_letters": dead_letters,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Background asyncio workers that drain an IngestQueue in micro-batches through the DAO
+class IngestWorkerPool:
+    def __init__(self, queue: IngestQueue, session_factory, workers=2, batch_size=50, poll_interval=0.5):
+        self.queue = queue
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._tasks = []
+        self._stopping = None
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(worker_id)) for worker_id in range(self.workers)]
+        logger.info("Started %d ingest workers.", self.workers)
+
+    async def stop(self):
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Ingest workers stopped.")
+
+    async def _run(self, worker_id):
+        while not self._stopping.is_set():
+            try:
+                batch = await asyncio.to_thread(self.queue.claim, self.batch_size)
+                if batch:
+                    await asyncio.to_thread(self.process_batch, batch)
+                    continue
+            except Exception as e:
+                logger.error("Ingest worker %d error: %s", worker_id, str(e))
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def process_batch(self, batch):
+        db = self.session_factory()
+        try:
+            dao = DAO(db)
+            try:
+                # Happy path: the whole micro-batch in one transaction
+                with dao.unit_of_work():
+                    for item in batch:
+                        dao.ingest_application(parse_webhook(item.body))
+                self.queue.ack([item.id for item in batch])
+                return
+            except Exception as e:
+                if is_transient(e):
+                    # The database is failing, not the payloads: put the whole batch back
+                    for item in batch:
+                        self._fail(item, e, transient=True)
+                    return
+                if len(batch) == 1:
+                    self._fail(batch[0], e, permanent=isinstance(e, ValidationError))
+                    return
+                logger.warning("Batch of %d webhooks failed, retrying one by one: %s", len(batch), str(e))
+
+            # Isolate the failing payloads so the rest of the batch still goes through
+            for item in batch:
+                try:
+                    dao.ingest_application(parse_webhook(item.body))
+                    self.queue.ack([item.id])
+                except Exception as e:
+                    self._fail(item, e, permanent=isinstance(e, ValidationError), transient=is_transient(e))
+        finally:
+            db.close()
+
+    def _fail(self, item, error, permanent=False, transient=False):
+        if self.queue.fail(item, str(error), permanent=permanent, transient=transient):
+            logger.error("Webhook %d moved to dead letters: %s", item.id, str(error))
+        else:
+            logger.warning("Webhook %d failed, will retry: %s", item.id, str(error))
@@ -1,14 +1,25 @@
-from sqlalchemy import Column, Integer, Float, String, JSON, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, JSON, TIMESTAMP, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
 
+# JSONB on PostgreSQL (indexable, containment operators), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class TimestampMixin:
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Candidate(Base, TimestampMixin):
     __tablename__ = "candidates"
+    __table_args__ = (
+        # GIN indexes for tag / email containment lookups (tags @> '["Python"]')
+        Index("ix_candidates_tags", "tags", postgresql_using="gin",
+              postgresql_ops={"tags": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_candidates_email_addresses", "email_addresses", postgresql_using="gin",
+              postgresql_ops={"email_addresses": "jsonb_path_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     candidate_id = Column(Integer, unique=True, nullable=False)
@@ -17,12 +28,12 @@ class Candidate(Base, TimestampMixin):
     title = Column(String(100))
     company = Column(String(255))
     url = Column(String(255))
-    phone_numbers = Column(JSON)  # Store multiple phone numbers as JSONB if using PostgreSQL
-    email_addresses = Column(JSON)  # Store multiple email addresses as JSONB
-    education = Column(JSON)  # Store education information as JSONB
-    addresses = Column(JSON)
-    tags = Column(JSON)  # Store tags as JSONB
-    custom_fields = Column(JSON)  # Add this line
+    phone_numbers = Column(JSONType)  # Store multiple phone numbers as JSONB if using PostgreSQL
+    email_addresses = Column(JSONType)  # Store multiple email addresses as JSONB
+    education = Column(JSONType)  # Store education information as JSONB
+    addresses = Column(JSONType)
+    tags = Column(JSONType)  # Store tags as JSONB
+    custom_fields = Column(JSONType)  # Add this line
     applied_at = Column(TIMESTAMP)
 
     applications = relationship("Application", back_populates="candidate")
@@ -37,8 +48,8 @@ class Job(Base, TimestampMixin):
     requisition_id = Column(String(100))
     status = Column(String(50))
     url = Column(String(255))
-    departments = Column(JSON)  # Store departments as JSONB
-    offices = Column(JSON)  # Store offices as JSONB
+    departments = Column(JSONType)  # Store departments as JSONB
+    offices = Column(JSONType)  # Store offices as JSONB
     created_by_id = Column(Integer)
     opened_at = Column(TIMESTAMP)
     closed_at = Column(TIMESTAMP)
@@ -47,17 +58,21 @@ class Job(Base, TimestampMixin):
 
 class Application(Base, TimestampMixin):
     __tablename__ = "applications"
+    __table_args__ = (
+        # Serves lookups by job as well as a job's applications ordered by (applied_at, id)
+        Index("ix_applications_job_id_applied_at", "job_id", "applied_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     application_id = Column(Integer, unique=True, nullable=False)
-    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"))
+    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"), index=True)
     job_id = Column(Integer, ForeignKey("jobs.job_id"))
     status = Column(String(50))
-    applied_at = Column(TIMESTAMP)
+    applied_at = Column(TIMESTAMP, index=True)
     last_activity_at = Column(TIMESTAMP)
     url = Column(String(255))
-    source = Column(JSON)  # Store source as JSONB
-    current_stage = Column(JSON)  # Store current stage as JSONB
+    source = Column(JSONType)  # Store source as JSONB
+    current_stage = Column(JSONType)  # Store current stage as JSONB
 
     candidate = relationship("Candidate", back_populates="applications")
     job = relationship("Job", back_populates="applications")
@@ -67,20 +82,75 @@ class Score(Base):
     __tablename__ = "scores"
 
     id = Column(Integer, primary_key=True, index=True)
-    application_id = Column(Integer, ForeignKey("applications.application_id"))
+    application_id = Column(Integer, ForeignKey("applications.application_id"), index=True)
     score = Column(Float)  # Change to Column(Float) if needed
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
 
     application = relationship("Application", back_populates="scores")
 
+class JobTopScore(Base):
+    # Best score of each of a job's top SCORE_TOP_K applications, kept up to date by DAO.add_scores
+    # so ranking a job is an index lookup instead of an aggregate over every score
+    __tablename__ = "job_top_scores"
+    __table_args__ = (
+        UniqueConstraint("job_id", "application_id", name="uq_job_top_scores_job_id_application_id"),
+        Index("ix_job_top_scores_job_id_score", "job_id", "score"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.job_id"), nullable=False)
+    application_id = Column(Integer, ForeignKey("applications.application_id"), nullable=False)
+    candidate_id = Column(Integer)
+    score = Column(Float, nullable=False)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow)
+
+class CandidateContactKey(Base):
+    # SHA-256 of a normalized email (lowercased) or phone number (E.164) of a candidate.
+    # Candidates sharing a key hash are likely the same person under different Greenhouse ids.
+    __tablename__ = "candidate_contact_keys"
+    __table_args__ = (
+        UniqueConstraint("key_hash", "candidate_id", name="uq_candidate_contact_keys_key_hash_candidate_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"), nullable=False, index=True)
+    key_type = Column(String(10), nullable=False)  # 'email' or 'phone'
+    key_hash = Column(String(64), nullable=False)
+
+class CandidateCluster(Base):
+    # Output of the contact key clustering job: candidates grouped as likely duplicates,
+    # cluster_id being the smallest candidate_id of the group
+    __tablename__ = "candidate_clusters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"), unique=True, nullable=False)
+    cluster_id = Column(Integer, nullable=False, index=True)
+    updated_at = Column(TIMESTAMP, default=datetime.utcnow)
+
 class CandidateAttachment(Base):
     __tablename__ = "candidate_attachments"
+    __table_args__ = (
+        # One row per file of a candidate; redelivered webhooks upsert onto it (the signed url changes)
+        Index("uq_candidate_attachments_candidate_id_filename_type", "candidate_id", "filename", "type", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"), nullable=False)
+    candidate_id = Column(Integer, ForeignKey("candidates.candidate_id"), nullable=False, index=True)
     filename = Column(String(255))
     url = Column(String(255))
     type = Column(String(50))  # e.g., 'resume', 'cover_letter'
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
 
+    # Filled in by the attachment fetcher. fetch_status is NULL until the first attempt, then
+    # 'fetching' (leased until fetch_claimed_until), 'retry', 'fetched' or 'failed'
+    fetch_status = Column(String(20), index=True)
+    fetch_attempts = Column(Integer, default=0)
+    fetch_claimed_until = Column(TIMESTAMP)
+    fetch_error = Column(String(500))
+    fetched_at = Column(TIMESTAMP, index=True)
+    content_sha256 = Column(String(64), index=True)  # Identical files share one stored copy
+    content_type = Column(String(100))
+    size_bytes = Column(Integer)
+    storage_path = Column(String(512))
+
     candidate = relationship("Candidate", back_populates="attachments")
@@ -0,0 +1,249 @@
+# Monthly range partitioning of applications by applied_at (PostgreSQL), and the retention job that
+# exports the applications of long-closed jobs to compressed JSONL before deleting them.
+#
+#   python -m app.greenhouse_applications.partitions --convert    # one-off, then set APPLICATIONS_PARTITIONED
+#   python -m app.greenhouse_applications.partitions --ensure     # create the upcoming monthly partitions
+#   python -m app.greenhouse_applications.partitions --archive    # archive applications of closed jobs
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.core.config import settings
+from app.database import get_engine
+from app.greenhouse_applications.dao import DAO
+from app.greenhouse_applications.models import Application
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r"^applications_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "applications_default"
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"applications_{month:%Y_%m}"
+
+
+def is_partitioned(connection):
+    if connection.dialect.name != "postgresql":
+        return False
+    relkind = connection.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('applications')")).scalar()
+    return relkind == "p"
+
+
+def monthly_partitions(connection):
+    # {month: partition name} of the monthly partitions attached to applications
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'applications'::regclass"
+    ))
+    partitions = {}
+    for (name,) in rows:
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def ensure_partitions(connection, months_ahead, first_month=None):
+    # Create the monthly partitions from first_month (default: this month) to months_ahead months out.
+    # Returns the names of the partitions created.
+    last_month = add_months(month_start(datetime.utcnow()), months_ahead)
+    months = [month_start(first_month or datetime.utcnow())]
+    while months[-1] < last_month:
+        months.append(add_months(months[-1], 1))
+
+    existing = monthly_partitions(connection)
+    created = []
+    for month in months:
+        if month in existing:
+            continue
+        name = partition_name(month)
+        try:
+            # A savepoint, so a month the default partition already holds rows for does not abort the rest
+            with connection.begin_nested():
+                connection.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF applications "
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+                ))
+            created.append(name)
+            logger.info("Created partition %s", name)
+        except Exception as e:
+            logger.error("Error creating partition %s: %s", name, str(e))
+    return created
+
+
+def ensure_upcoming_partitions(bind=None, months_ahead=None):
+    # Called at startup and from cron; a no-op unless applications is partitioned
+    months_ahead = settings.APPLICATIONS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    with (bind or get_engine()).begin() as connection:
+        if not is_partitioned(connection):
+            logger.warning("APPLICATIONS_PARTITIONED is set but applications is not a partitioned table")
+            return []
+        return ensure_partitions(connection, months_ahead)
+
+
+def convert_to_partitioned(bind=None, months_ahead=None):
+    # Rebuild applications as a table partitioned by month of applied_at, in one transaction.
+    # PostgreSQL only allows unique constraints that include the partition key, so:
+    #  - the primary key becomes (id, applied_at) and application_id is unique with applied_at,
+    #    which is the conflict target the DAO upserts on once APPLICATIONS_PARTITIONED is set
+    #  - applied_at becomes NOT NULL (missing values are taken from last_activity_at / created_at)
+    #  - foreign keys from scores and job_top_scores to applications.application_id are dropped
+    months_ahead = settings.APPLICATIONS_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    with (bind or get_engine()).begin() as connection:
+        if connection.dialect.name != "postgresql":
+            raise RuntimeError("Partitioning applications requires PostgreSQL")
+        if is_partitioned(connection):
+            logger.info("applications is already partitioned")
+            return False
+
+        connection.execute(text(
+            "UPDATE applications SET applied_at = COALESCE(last_activity_at, created_at, now()) "
+            "WHERE applied_at IS NULL"
+        ))
+        foreign_keys = connection.execute(text(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE contype = 'f' AND confrelid = 'applications'::regclass"
+        )).all()
+        for table_name, constraint in foreign_keys:
+            logger.info("Dropping foreign key %s on %s", constraint, table_name)
+            connection.execute(text(f'ALTER TABLE {table_name} DROP CONSTRAINT "{constraint}"'))
+
+        # Move the old table aside, freeing its index names for the partitioned table
+        connection.execute(text("ALTER TABLE applications RENAME TO applications_unpartitioned"))
+        old_indexes = connection.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'applications_unpartitioned'"
+        )).scalars().all()
+        for number, index_name in enumerate(old_indexes):
+            connection.execute(text(f'ALTER INDEX "{index_name}" RENAME TO applications_unpartitioned_{number}'))
+        sequence = connection.execute(text("SELECT pg_get_serial_sequence('applications_unpartitioned', 'id')")).scalar()
+
+        connection.execute(text(
+            "CREATE TABLE applications (LIKE applications_unpartitioned INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (applied_at)"
+        ))
+        connection.execute(text("ALTER TABLE applications ALTER COLUMN applied_at SET NOT NULL"))
+        connection.execute(text("ALTER TABLE applications ADD PRIMARY KEY (id, applied_at)"))
+        connection.execute(text(
+            "ALTER TABLE applications ADD CONSTRAINT uq_applications_application_id_applied_at "
+            "UNIQUE (application_id, applied_at)"
+        ))
+        connection.execute(text("ALTER TABLE applications ADD FOREIGN KEY (candidate_id) REFERENCES candidates (candidate_id)"))
+        connection.execute(text("ALTER TABLE applications ADD FOREIGN KEY (job_id) REFERENCES jobs (job_id)"))
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY applications.id"))
+
+        oldest = connection.execute(text("SELECT min(applied_at) FROM applications_unpartitioned")).scalar()
+        connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF applications DEFAULT"))
+        created = ensure_partitions(connection, months_ahead, first_month=oldest)
+
+        copied = connection.execute(text("INSERT INTO applications SELECT * FROM applications_unpartitioned")).rowcount
+        connection.execute(text("DROP TABLE applications_unpartitioned"))
+        # Declared on the partitioned table, so every partition (including future ones) gets them
+        for index in Application.__table__.indexes:
+            index.create(connection)
+        logger.info("Partitioned applications: %d rows into %d monthly partitions", copied, len(created))
+    return True
+
+
+def drop_empty_partitions(connection, before):
+    # Drop monthly partitions that end before the cutoff and no longer hold any rows
+    dropped = []
+    for month, name in sorted(monthly_partitions(connection).items()):
+        if add_months(month, 1) > before:
+            break
+        if connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+        logger.info("Dropped empty partition %s", name)
+    return dropped
+
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def archive_record(application):
+    record = {column.name: getattr(application, column.name) for column in Application.__table__.columns}
+    record["scores"] = [{"score": score.score, "created_at": score.created_at} for score in application.scores]
+    return record
+
+
+def archive_closed_applications(db, archive_dir, older_than_days, batch_size=1000):
+    # Write the applications (with their scores) of jobs closed more than older_than_days ago to a
+    # gzipped JSONL file, then delete them. Each batch is fsynced before its rows are deleted, so a
+    # crash in between can only archive a batch twice, never lose it. Returns (count, path).
+    closed_before = datetime.utcnow() - timedelta(days=older_than_days)
+    dao = DAO(db)
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"applications-{datetime.utcnow():%Y%m%dT%H%M%S}.jsonl.gz")
+
+    archived, after_id = 0, 0
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+        while True:
+            applications = dao.closed_job_applications(closed_before, after_id, batch_size)
+            if not applications:
+                break
+            for application in applications:
+                archive.write(json.dumps(archive_record(application), default=json_default).encode() + b"\n")
+            archive.flush()
+            os.fsync(raw.fileno())
+
+            after_id = applications[-1].id
+            dao.delete_applications([application.application_id for application in applications])
+            archived += len(applications)
+            db.expunge_all()
+
+    if not archived:
+        os.remove(path)
+        return 0, None
+
+    if is_partitioned(db.connection()):
+        drop_empty_partitions(db.connection(), closed_before)
+        db.commit()
+    logger.info("Archived %d applications of closed jobs to %s", archived, path)
+    return archived, path
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Applications partitioning and retention")
+    parser.add_argument("--convert", action="store_true", help="rebuild applications as a monthly partitioned table")
+    parser.add_argument("--ensure", action="store_true", help="create the upcoming monthly partitions")
+    parser.add_argument("--archive", action="store_true", help="archive and delete applications of closed jobs")
+    parser.add_argument("--months-ahead", type=int, default=settings.APPLICATIONS_PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_CLOSED_JOBS_AFTER_DAYS)
+    parser.add_argument("--archive-dir", default=settings.ARCHIVE_DIR)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.convert:
+        print("Converted applications" if convert_to_partitioned(months_ahead=args.months_ahead)
+              else "applications is already partitioned")
+    if args.ensure:
+        print(f"Created partitions: {ensure_upcoming_partitions(months_ahead=args.months_ahead)}")
+    if args.archive:
+        db = SessionLocal()
+        try:
+            count, path = archive_closed_applications(db, args.archive_dir, args.older_than_days)
+            print(f"Archived {count} applications" + (f" to {path}" if path else ""))
+        finally:
+            db.close()
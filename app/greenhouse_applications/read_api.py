@@ -0,0 +1,158 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, SessionLocal
+from app.greenhouse_applications.dao import AsyncDAO, DAO
+from datetime import datetime
+import base64
+import binascii
+import json
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(application):
+    # Opaque cursor holding the (applied_at, id) sort key of the last application on a page
+    applied_at = application.applied_at.isoformat() if application.applied_at else None
+    raw = json.dumps([applied_at, application.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        applied_at, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(applied_at) if applied_at else None, int(last_id))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def score_item(score):
+    return {"score": score.score, "created_at": isoformat(score.created_at)}
+
+
+def attachment_item(attachment):
+    return {"filename": attachment.filename, "url": attachment.url, "type": attachment.type}
+
+
+def application_item(application):
+    return {
+        "application_id": application.application_id,
+        "job_id": application.job_id,
+        "status": application.status,
+        "applied_at": isoformat(application.applied_at),
+        "last_activity_at": isoformat(application.last_activity_at),
+        "current_stage": application.current_stage,
+        "scores": [score_item(score) for score in application.scores],
+    }
+
+
+def candidate_summary(candidate):
+    return {
+        "candidate_id": candidate.candidate_id,
+        "first_name": candidate.first_name,
+        "last_name": candidate.last_name,
+        "title": candidate.title,
+        "company": candidate.company,
+        "attachments": [attachment_item(attachment) for attachment in candidate.attachments],
+    }
+
+
+@router.get("/jobs/{job_id}/applications")
+async def job_applications(job_id: int, limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE), cursor: str = None):
+    after = decode_cursor(cursor) if cursor else None
+
+    db = SessionLocal()
+    try:
+        exists = await run_in_threadpool(DAO(db).job_exists, job_id)
+    except Exception as e:
+        db.close()
+        logger.error("Error reading job %s: %s", job_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    if not exists:
+        db.close()
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(stream_job_applications(db, job_id, limit, after), media_type="application/json")
+
+
+def stream_job_applications(db, job_id, limit, after):
+    # Serialize the page one application at a time; one extra row tells whether there is a next page
+    try:
+        yield f'{{"job_id": {json.dumps(job_id)}, "items": ['
+        last, count = None, 0
+        for application in DAO(db).job_applications(job_id, limit + 1, after):
+            if count == limit:
+                break
+            item = application_item(application)
+            item["candidate"] = candidate_summary(application.candidate) if application.candidate else None
+            yield ("," if count else "") + json.dumps(item)
+            last, count = application, count + 1
+        else:
+            last = None  # Fewer than limit + 1 rows: this is the last page
+        yield f'], "next_cursor": {json.dumps(encode_cursor(last) if last is not None else None)}}}'
+    finally:
+        db.close()
+
+
+@router.get("/candidates/{candidate_id}")
+async def candidate_detail(candidate_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        candidate = await AsyncDAO(db).get_candidate_detail(candidate_id)
+    except Exception as e:
+        logger.error("Error reading candidate %s: %s", candidate_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Candidate not found")
+
+    content = candidate_summary(candidate)
+    content["applications"] = [application_item(application) for application in candidate.applications]
+    return JSONResponse(content=content, status_code=200)
+
+
+@router.get("/candidates/{candidate_id}/duplicates")
+async def candidate_duplicates(candidate_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Candidates sharing an email or phone with this one right now, and its cluster from the last clustering run
+    try:
+        dao = AsyncDAO(db)
+        shared = await dao.duplicate_candidates(candidate_id)
+        cluster = await dao.candidate_cluster(candidate_id)
+    except Exception as e:
+        logger.error("Error reading duplicates of candidate %s: %s", candidate_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    content = {
+        "candidate_id": candidate_id,
+        "shared_contact_keys": [{"candidate_id": other_id, "key_types": key_types} for other_id, key_types in shared.items()],
+        "cluster": cluster,
+    }
+    return JSONResponse(content=content, status_code=200)
+
+
+@router.get("/resumes/search")
+async def search_resumes(request: Request, q: str, limit: int = Query(10, ge=1, le=50)):
+    # Keyword search over the text of fetched resumes, best-matching candidates first
+    resume_index = getattr(request.app.state, "resume_index", None)
+    if resume_index is None:
+        raise HTTPException(status_code=404, detail="Resume index is disabled")
+    try:
+        matches = await run_in_threadpool(resume_index.search, q, limit)
+    except Exception as e:
+        logger.error("Error searching resumes for %r: %s", q, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    return JSONResponse(content={"query": q, "items": [match._asdict() for match in matches]}, status_code=200)
+
+
+@router.get("/resumes/index_stats")
+async def resume_index_stats(request: Request):
+    resume_index = getattr(request.app.state, "resume_index", None)
+    if resume_index is None:
+        raise HTTPException(status_code=404, detail="Resume index is disabled")
+    return JSONResponse(content=await run_in_threadpool(resume_index.stats), status_code=200)
@@ -0,0 +1,208 @@
+# Offline replay of captured Greenhouse webhook payloads straight through the bulk DAO path, e.g. to
+# rebuild a database. Inputs are JSONL/NDJSON files (one payload per line, optionally gzipped),
+# single-payload .json files, or directories of either.
+#
+#   python -m app.greenhouse_applications.replay dumps/ --checkpoint data/replay.checkpoint.json
+#
+# Payloads are parsed in a process pool and written in order by this process, so a later payload
+# for the same application still wins. The checkpoint records the last written line; rerunning
+# with the same inputs and checkpoint resumes after it.
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.webhook_pipeline import parse_webhook
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PAYLOAD_SUFFIXES = (".json", ".jsonl", ".ndjson", ".json.gz", ".jsonl.gz", ".ndjson.gz")
+
+
+def payload_sources(paths):
+    # Files to replay in a stable order (arguments as given, directories sorted), so a checkpoint
+    # position means the same thing when resuming
+    sources = []
+    for path in paths:
+        if not os.path.isdir(path):
+            sources.append(path)
+            continue
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories.sort()
+            sources.extend(os.path.join(directory, name) for name in sorted(filenames) if name.endswith(PAYLOAD_SUFFIXES))
+    return sources
+
+
+def read_payloads(source):
+    # (line number, raw body) of every payload in a file; .json files hold a single payload
+    opener = gzip.open if source.endswith(".gz") else open
+    with opener(source, "rb") as file:
+        if source.removesuffix(".gz").endswith(".json"):
+            yield 1, file.read()
+            return
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                yield line_number, line
+
+
+def replay_batches(sources, checkpoint, batch_size):
+    # Lists of (source, line number, body), skipping everything up to the checkpointed line
+    resume_source, resume_line = checkpoint.get("source"), checkpoint.get("line", 0)
+    skipping = resume_source in sources
+    batch = []
+    for source in sources:
+        if skipping and source != resume_source:
+            continue
+        for line_number, body in read_payloads(source):
+            if skipping and line_number <= resume_line:
+                continue
+            batch.append((source, line_number, body))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        skipping = False
+    if batch:
+        yield batch
+
+
+def parse_batch(batch):
+    # Runs in the worker processes: (source, line number, rows or None, error or None) per payload
+    parsed = []
+    for source, line_number, body in batch:
+        try:
+            parsed.append((source, line_number, webhook_rows(parse_webhook(body)), None))
+        except Exception as e:
+            parsed.append((source, line_number, None, f"Invalid payload: {e!r}"))
+    return parsed
+
+
+def load_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_checkpoint(path, checkpoint):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class Replayer:
+    def __init__(self, session_factory, checkpoint_path=None, workers=None, batch_size=500,
+                 errors_path=None, progress_interval=5.0, progress=None):
+        self.session_factory = session_factory
+        self.checkpoint_path = checkpoint_path
+        self.workers = os.cpu_count() if workers is None else workers
+        self.batch_size = batch_size
+        self.errors_path = errors_path
+        self.progress_interval = progress_interval
+        self.progress = progress or (lambda line: print(line, file=sys.stderr, flush=True))
+        self.replayed = 0
+        self.failed = 0
+
+    def run(self, paths):
+        # Returns (replayed, failed, seconds) for this run; the counts carry over across resumes
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        self.replayed, self.failed = checkpoint.get("replayed", 0), checkpoint.get("failed", 0)
+        if checkpoint:
+            self.progress(f"Resuming after {checkpoint['source']} line {checkpoint['line']}")
+        batches = replay_batches(payload_sources(paths), checkpoint, self.batch_size)
+
+        started = last_report = time.perf_counter()
+        replayed_at_start = self.replayed
+        db = self.session_factory()
+        errors = open(self.errors_path, "a") if self.errors_path else None
+        try:
+            dao = DAO(db)
+            for parsed in self._parsed(batches):
+                self._write(dao, parsed, errors)
+                source, line_number = parsed[-1][:2]
+                save_checkpoint(self.checkpoint_path, {
+                    "source": source, "line": line_number, "replayed": self.replayed, "failed": self.failed,
+                })
+                now = time.perf_counter()
+                if now - last_report >= self.progress_interval:
+                    self._report(self.replayed - replayed_at_start, now - started)
+                    last_report = now
+        finally:
+            db.close()
+            if errors:
+                errors.close()
+
+        elapsed = time.perf_counter() - started
+        self._report(self.replayed - replayed_at_start, elapsed)
+        return self.replayed - replayed_at_start, self.failed, elapsed
+
+    def _parsed(self, batches):
+        # Parsed batches in input order. At most two batches per worker are in flight, so the
+        # inputs are read only as fast as they are written.
+        if self.workers <= 1:
+            yield from map(parse_batch, batches)
+            return
+        with ProcessPoolExecutor(self.workers) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(parse_batch, batch))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _write(self, dao, parsed, errors):
+        valid = [item for item in parsed if item[2] is not None]
+        failures = [item for item in parsed if item[2] is None]
+        try:
+            dao.bulk_ingest_rows([rows for _, _, rows, _ in valid])
+            self.replayed += len(valid)
+        except Exception as e:
+            # Isolate the payloads that cannot be written so the rest of the batch still goes through
+            logger.warning("Bulk write of %d webhooks failed, retrying one by one: %s", len(valid), str(e))
+            for source, line_number, rows, _ in valid:
+                try:
+                    dao.bulk_ingest_rows([rows])
+                    self.replayed += 1
+                except Exception as e:
+                    failures.append((source, line_number, None, str(e)))
+
+        self.failed += len(failures)
+        for source, line_number, _, error in failures:
+            logger.warning("Could not replay %s line %d: %s", source, line_number, error)
+            if errors:
+                errors.write(json.dumps({"source": source, "line": line_number, "error": error}) + "\n")
+
+    def _report(self, replayed, elapsed):
+        rate = replayed / elapsed if elapsed else 0.0
+        self.progress(f"{self.replayed} webhooks replayed ({rate:.0f}/s), {self.failed} failed")
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Replay captured Greenhouse webhook payloads into the database")
+    parser.add_argument("paths", nargs="+", help="JSONL/NDJSON/JSON files (optionally .gz) or directories of them")
+    parser.add_argument("--checkpoint", help="file recording progress; rerun with it to resume")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="parser processes (1 parses inline)")
+    parser.add_argument("--batch-size", type=int, default=500, help="webhooks per bulk write")
+    parser.add_argument("--errors", help="append payloads that could not be replayed to this JSONL file")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="seconds between progress lines")
+    args = parser.parse_args()
+    # Warnings only: per-batch DAO logging would drown out the progress lines
+    logging.basicConfig(level=logging.WARNING)
+
+    replayer = Replayer(SessionLocal, args.checkpoint, args.workers, args.batch_size, args.errors, args.progress_interval)
+    replayed, failed, elapsed = replayer.run(args.paths)
+    print(f"Replayed {replayed} webhooks in {elapsed:.1f} s ({replayed / elapsed if elapsed else 0:.0f}/s), "
+          f"{failed} failed in total")
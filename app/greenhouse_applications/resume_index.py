@@ -0,0 +1,287 @@
+import asyncio
+import html
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from collections import namedtuple
+from datetime import datetime, timedelta
+from pypdf import PdfReader
+from app.greenhouse_applications.dao import DAO
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_CHARS = 200_000  # Text indexed per document; the rest of a very long file is dropped
+WATERMARK_OVERLAP = timedelta(minutes=5)  # Re-scan window for fetches committed out of fetched_at order
+
+ResumeMatch = namedtuple("ResumeMatch", ["candidate_id", "name", "title", "filename", "snippet", "rank"])
+
+
+def extract_text(path, filename=None, content_type=None):
+    # Plain text of a stored attachment, chosen by its leading bytes rather than the (often wrong) name
+    with open(path, "rb") as f:
+        head = f.read(8)
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+
+    if head.startswith(b"%PDF"):
+        reader = PdfReader(path)
+        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+    elif head.startswith(b"PK"):
+        text = extract_docx_text(path)
+    elif content_type.startswith("text/") or name.endswith((".txt", ".md", ".rtf")):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read(MAX_TEXT_CHARS)
+    else:
+        return ""
+    return text[:MAX_TEXT_CHARS]
+
+
+def extract_docx_text(path):
+    # A .docx is a zip; the body text lives in the <w:t> runs of the <w:p> paragraphs of word/document.xml
+    try:
+        with zipfile.ZipFile(path) as archive:
+            xml = archive.read("word/document.xml").decode("utf-8", errors="replace")
+    except (KeyError, zipfile.BadZipFile):
+        return ""
+    paragraphs = ("".join(re.findall(r"<w:t(?:\s[^>]*)?>([^<]*)</w:t>", paragraph)) for paragraph in xml.split("</w:p>"))
+    return html.unescape("\n".join(paragraph for paragraph in paragraphs if paragraph))
+
+
+def match_expression(query):
+    # Free-text keywords to an FTS5 query: every word quoted (no operator injection), any word may match
+    words = re.findall(r"\w+", query.lower())
+    return " OR ".join(f'"{word}"' for word in words)
+
+
+# On-disk full-text index of resume text (SQLite FTS5, porter-stemmed), one document per candidate
+# attachment. Writes are incremental; searches are ranked by BM25 and never touch the files again.
+class ResumeIndex:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS resume_fts USING fts5(
+                candidate_id UNINDEXED,
+                name UNINDEXED,
+                title UNINDEXED,
+                filename,
+                body,
+                tokenize = 'porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS indexed_attachments (
+                attachment_id INTEGER PRIMARY KEY,
+                candidate_id INTEGER NOT NULL,
+                content_sha256 TEXT,
+                document_rowid INTEGER  -- NULL while no text could be extracted; retried by ResumeIndexer
+            );
+            CREATE INDEX IF NOT EXISTS ix_indexed_attachments_candidate_sha
+                ON indexed_attachments (candidate_id, content_sha256);
+            CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    def watermark(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_meta WHERE key = 'fetched_at'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def indexed(self, attachment_ids):
+        ids = list(attachment_ids)
+        if not ids:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT attachment_id FROM indexed_attachments WHERE attachment_id IN ({','.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add_documents(self, documents, watermark=None):
+        # documents: dicts with attachment_id, candidate_id, content_sha256, name, title, filename, text.
+        # The same file attached twice to one candidate is indexed once. An attachment without text is
+        # recorded without a document, so the watermark can pass it and retry_without_text finds it again.
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for document in documents:
+                    duplicate = self._conn.execute(
+                        "SELECT document_rowid FROM indexed_attachments "
+                        "WHERE candidate_id = ? AND content_sha256 = ? AND document_rowid IS NOT NULL",
+                        (document["candidate_id"], document["content_sha256"]),
+                    ).fetchone()
+                    rowid = duplicate[0] if duplicate else None
+                    if rowid is None and document["text"].strip():
+                        rowid = self._conn.execute(
+                            "INSERT INTO resume_fts (candidate_id, name, title, filename, body) VALUES (?, ?, ?, ?, ?)",
+                            (document["candidate_id"], document["name"], document["title"],
+                             document["filename"], document["text"]),
+                        ).lastrowid
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO indexed_attachments VALUES (?, ?, ?, ?)",
+                        (document["attachment_id"], document["candidate_id"], document["content_sha256"], rowid),
+                    )
+                if watermark is not None:
+                    self._conn.execute("INSERT OR REPLACE INTO index_meta VALUES ('fetched_at', ?)",
+                                       (watermark.isoformat(),))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def without_text(self, after_id, limit):
+        # Attachment ids recorded without a document, in id order after the given id
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT attachment_id FROM indexed_attachments WHERE document_rowid IS NULL AND attachment_id > ? "
+                "ORDER BY attachment_id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, query, limit=10):
+        # Best-ranked candidates for the keywords, one entry per candidate (their best matching document)
+        expression = match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT candidate_id, name, title, filename, snippet(resume_fts, 4, '**', '**', '...', 12), rank "
+                "FROM resume_fts WHERE resume_fts MATCH ? ORDER BY rank LIMIT ?",
+                (expression, limit * 5),
+            ).fetchall()
+
+        matches, seen = [], set()
+        for row in rows:
+            if row[0] in seen:
+                continue
+            seen.add(row[0])
+            matches.append(ResumeMatch(*row))
+            if len(matches) == limit:
+                break
+        return matches
+
+    def documents_after(self, rowid, limit):
+        # (rowid, candidate_id, text) of indexed documents in insertion order, for consumers that follow the index
+        with self._lock:
+            return self._conn.execute(
+                "SELECT rowid, candidate_id, body FROM resume_fts WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (rowid, limit),
+            ).fetchall()
+
+    def stats(self):
+        with self._lock:
+            documents = self._conn.execute("SELECT count(*) FROM resume_fts").fetchone()[0]
+            attachments = self._conn.execute("SELECT count(*) FROM indexed_attachments").fetchone()[0]
+            without_text = self._conn.execute(
+                "SELECT count(*) FROM indexed_attachments WHERE document_rowid IS NULL").fetchone()[0]
+        watermark = self.watermark()
+        return {"documents": documents, "attachments_seen": attachments, "attachments_without_text": without_text,
+                "fetched_at_watermark": watermark.isoformat() if watermark else None}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Background task feeding newly fetched attachments into a ResumeIndex
+class ResumeIndexer:
+    def __init__(self, index: ResumeIndex, session_factory, batch_size=200, poll_interval=10.0):
+        self.index = index
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task = None
+        self._stopping = None
+        self._retry_pending = True  # Attachments without text are retried once per process
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Resume indexer started, index at %s", self.index.path)
+
+    async def stop(self):
+        if self._stopping is None:
+            return
+        self._stopping.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        logger.info("Resume indexer stopped.")
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.to_thread(self.index_pending)
+            except Exception as e:
+                logger.error("Resume indexer error: %s", str(e))
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def index_pending(self):
+        # Walk attachments fetched since the watermark (minus an overlap for late commits) in
+        # (fetched_at, id) order and index the ones not seen yet. Returns the number indexed.
+        if self._retry_pending:
+            self.retry_without_text()
+            self._retry_pending = False
+        watermark = self.index.watermark()
+        after = (watermark - WATERMARK_OVERLAP, 0) if watermark else None
+        indexed = 0
+        db = self.session_factory()
+        try:
+            dao = DAO(db)
+            while True:
+                rows = dao.fetched_attachments(after, self.batch_size)
+                if not rows:
+                    break
+                seen = self.index.indexed(row.id for row in rows)
+                documents = [self._document(row) for row in rows if row.id not in seen]
+                watermark = max(watermark or rows[-1].fetched_at, rows[-1].fetched_at)
+                self.index.add_documents(documents, watermark)
+                indexed += len(documents)
+                after = (rows[-1].fetched_at, rows[-1].id)
+        finally:
+            db.close()
+        if indexed:
+            logger.info("Indexed %d resumes", indexed)
+        return indexed
+
+    def retry_without_text(self):
+        # Extract again the attachments that gave no text before (e.g. a format the extractor has since
+        # learned to read). Returns the number that got a document this time.
+        after_id, recovered = 0, 0
+        db = self.session_factory()
+        try:
+            dao = DAO(db)
+            while True:
+                attachment_ids = self.index.without_text(after_id, self.batch_size)
+                if not attachment_ids:
+                    break
+                documents = [self._document(row) for row in dao.fetched_attachments_by_id(attachment_ids)]
+                self.index.add_documents(documents)
+                recovered += sum(1 for document in documents if document["text"].strip())
+                after_id = attachment_ids[-1]
+        finally:
+            db.close()
+        if recovered:
+            logger.info("Indexed %d resumes that had no text before", recovered)
+        return recovered
+
+    def _document(self, row):
+        try:
+            text = extract_text(row.storage_path, row.filename, row.content_type)
+        except Exception as e:
+            logger.warning("Could not extract text from attachment %d (%s): %s", row.id, row.filename, str(e))
+            text = ""
+        name = " ".join(part for part in (row.first_name, row.last_name) if part)
+        return dict(attachment_id=row.id, candidate_id=row.candidate_id, content_sha256=row.content_sha256,
+                    name=name, title=row.title, filename=row.filename, text=text)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timezone
+from pydantic import AfterValidator, BaseModel, Field
+from typing import Annotated, List, Optional, Dict, Any
 
 class CandidateBase(BaseModel):
     candidate_id: int
@@ -44,8 +45,78 @@ class ScoreBase(BaseModel):
     application_id: int
     score: float
 
+class JobScoringRequest(BaseModel):
+    job_description: str = Field(min_length=1)
+
 class CandidateAttachmentBase(BaseModel):
     candidate_id: int
     filename: str
     url: str
     type: str
+
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # TIMESTAMP columns hold naive UTC, like the datetime.utcnow() defaults in models.py
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+Timestamp = Annotated[Optional[datetime], AfterValidator(to_naive_utc)]
+
+
+# Incoming Greenhouse webhook payload. Only the fields we store are declared, everything else is ignored.
+class GreenhouseValue(BaseModel):
+    value: str
+    type: Optional[str] = None
+
+class GreenhouseAttachment(BaseModel):
+    filename: str
+    url: str
+    type: str
+
+class GreenhouseCandidate(BaseModel):
+    id: int
+    first_name: Optional[str]
+    last_name: Optional[str]
+    title: Optional[str] = None
+    company: Optional[str] = None
+    url: Optional[str] = None
+    phone_numbers: Optional[List[GreenhouseValue]] = []
+    email_addresses: Optional[List[GreenhouseValue]] = []
+    educations: Any = {}
+    addresses: Any = {}
+    tags: Optional[List[str]] = []
+    custom_fields: Optional[Dict[str, Any]] = {}
+    attachments: Optional[List[GreenhouseAttachment]] = []
+
+class GreenhouseJob(BaseModel):
+    id: int
+    name: Optional[str]
+    requisition_id: Optional[str] = None
+    status: Optional[str] = None
+    url: Optional[str] = None
+    departments: Any = {}
+    offices: Any = {}
+    created_by_id: Optional[int] = None
+    created_at: Timestamp = None
+    opened_at: Timestamp = None
+    closed_at: Timestamp = None
+
+class GreenhouseApplication(BaseModel):
+    id: int
+    status: Optional[str] = None
+    applied_at: Timestamp = None
+    last_activity_at: Timestamp = None
+    url: Optional[str]
+    source: Any = {}
+    current_stage: Any = None
+    candidate: GreenhouseCandidate
+    jobs: List[GreenhouseJob] = Field(min_length=1)
+
+class GreenhouseWebhookPayload(BaseModel):
+    application: GreenhouseApplication
+
+class GreenhouseWebhook(BaseModel):
+    action: Optional[str] = None
+    payload: GreenhouseWebhookPayload
@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.core.config import settings
+from app.database import get_async_db, SessionLocal
+from app.greenhouse_applications.dao import AsyncDAO
+from app.greenhouse_applications.schema import JobScoringRequest, ScoreBase
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+MAX_SCORES_PER_BATCH = 50000
+
+
+@router.post("/scores/batch")
+async def add_scores(scores: List[ScoreBase], db: AsyncSession = Depends(get_async_db)):
+    # Thousands of scores in one INSERT, with the per-job leaderboards updated in the same transaction
+    if len(scores) > MAX_SCORES_PER_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_SCORES_PER_BATCH} scores per batch")
+    try:
+        written = await AsyncDAO(db).add_scores([(score.application_id, score.score) for score in scores])
+    except Exception as e:
+        logger.error("Error adding scores: %s", str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    return JSONResponse(content={"message": "Scores added", "count": written}, status_code=200)
+
+
+@router.post("/jobs/{job_id}/score")
+async def score_job(job_id: int, scoring: JobScoringRequest, request: Request, limit: int = Query(10, ge=1, le=100)):
+    # Score every applicant of the job with an indexed resume against the job description (BM25)
+    # and store the scores; returns the best ones
+    scorer = getattr(request.app.state, "cv_scorer", None)
+    if scorer is None:
+        raise HTTPException(status_code=404, detail="Resume index is disabled")
+
+    def run():
+        db = SessionLocal()
+        try:
+            return scorer.score_job(db, job_id, scoring.job_description)
+        finally:
+            db.close()
+
+    try:
+        results = await run_in_threadpool(run)
+    except Exception as e:
+        logger.error("Error scoring job %s: %s", job_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    content = {
+        "job_id": job_id,
+        "scored": len(results),
+        "items": [{"application_id": application_id, "candidate_id": candidate_id, "score": score}
+                  for application_id, candidate_id, score in results[:limit]],
+    }
+    return JSONResponse(content=content, status_code=200)
+
+
+@router.get("/jobs/{job_id}/top_candidates")
+async def top_candidates(job_id: int, limit: int = Query(10, ge=1), db: AsyncSession = Depends(get_async_db)):
+    # Only the top SCORE_TOP_K applications of each job are kept, so that is as far as this can rank
+    limit = min(limit, settings.SCORE_TOP_K)
+    try:
+        rows = await AsyncDAO(db).top_scores(job_id, limit)
+    except Exception as e:
+        logger.error("Error reading top candidates for job %s: %s", job_id, str(e))
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+    content = {
+        "job_id": job_id,
+        "items": [{"application_id": row.application_id, "candidate_id": row.candidate_id, "score": row.score}
+                  for row in rows],
+    }
+    return JSONResponse(content=content, status_code=200)
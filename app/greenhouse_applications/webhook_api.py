@@ -1,52 +1,162 @@
 from fastapi import APIRouter, Depends, Request, HTTPException
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.greenhouse_applications.dao import DAO
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, SessionLocal
+from app.greenhouse_applications.dao import AsyncDAO, DAO, upsert_counters, webhook_rows
+from app.greenhouse_applications.ingest_cache import candidate_cache, job_cache
+from app.greenhouse_applications.webhook_pipeline import parse_webhook, webhook_verifier
+from pydantic import ValidationError
 import hmac
-import hashlib
+import json
 import logging
+import tempfile
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+BATCH_CHUNK_SIZE = 500  # Webhooks written per bulk statement on the batch endpoint
+BATCH_SPOOL_MAX_MEMORY = 1024 * 1024  # Batch bodies larger than this are spooled to disk
+
 @router.post("/simulate_webhook")
-async def simulate_webhook(request: Request, db: Session = Depends(get_db)):
-    secret_key = "your_secret_key_here"
+async def simulate_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
+    body = await request.body()  # Read once, used for the signature, parsing and the queue
     signature = request.headers.get("Signature")
 
     # Verify signature
-    if not signature or not verify_signature(secret_key, await request.body(), signature):
+    if not signature or not webhook_verifier.verify(body, signature):
         logger.warning("Invalid signature received.")
         raise HTTPException(status_code=403, detail="Invalid signature")
 
     try:
-        data = await request.json()
-        logger.info("Incoming Data: %s", data)  # Log the incoming data
-
-        application_data = data['payload']['application']
-        candidate = application_data['candidate']
-        job = application_data['jobs'][0]  # Assuming the first job in the array
+        webhook = parse_webhook(body)
+    except ValidationError as e:
+        logger.warning("Invalid webhook payload: %s", str(e))
+        raise HTTPException(status_code=422, detail="Invalid webhook payload")
 
-        # Create DAO instance
-        dao = DAO(db)
+    # Async mode: persist the raw body and let the ingest workers write it
+    ingest_queue = getattr(request.app.state, "ingest_queue", None)
+    if ingest_queue is not None:
+        try:
+            queue_id = await run_in_threadpool(ingest_queue.enqueue, body)
+        except Exception as e:
+            logger.error("Error queueing webhook: %s", str(e))
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+        logger.info("Webhook queued for ingestion: %d", queue_id)
+        return JSONResponse(content={"message": "Webhook accepted", "queue_id": queue_id}, status_code=202)
 
-        # Add candidate and job, then application
-        candidate_record = dao.add_candidate(candidate)
-        job_record = dao.add_job(job)
-        application_record = dao.add_application(application_data, candidate_record.candidate_id, job_record.job_id)
+    try:
+        logger.info("Incoming Data: %s", webhook, extra={"payload": True})  # Log a sample of the incoming data
 
-        # Process attachments
-        for attachment in candidate.get('attachments', []):
-            dao.add_candidate_attachment(candidate_record.candidate_id, attachment)
+        # Create DAO instance and store candidate, job, application and attachments in one transaction
+        dao = AsyncDAO(db)
+        application_record = await dao.ingest_application(webhook)
 
-        logger.info("Webhook processed successfully for candidate: %s", candidate['name'])  # Log success
+        logger.info("Webhook processed successfully for application: %s", application_record.application_id)  # Log success
         return JSONResponse(content={"message": "Webhook received and processed"}, status_code=200)
 
     except Exception as e:
         logger.error("Error processing webhook: %s", str(e))  # Log the error
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
-def verify_signature(secret_key: str, message_body: bytes, signature: str) -> bool:
-    hash = hmac.new(secret_key.encode(), message_body, hashlib.sha256).hexdigest()
-    return hmac.compare_digest(hash, signature)
+@router.post("/webhooks/batch")
+async def batch_webhooks(request: Request):
+    # NDJSON backfill: one Greenhouse webhook payload per line, signed as a whole
+    signature = request.headers.get("Signature")
+    if not signature:
+        logger.warning("Invalid signature received.")
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    # Hash the stream while spooling it, so memory stays flat whatever the body size
+    mac = webhook_verifier.new_mac()
+    spool = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        mac.update(chunk)
+        spool.write(chunk)
+
+    if not hmac.compare_digest(mac.hexdigest(), signature):
+        spool.close()
+        logger.warning("Invalid signature received.")
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    spool.seek(0)
+    return StreamingResponse(ingest_batch(spool), media_type="application/x-ndjson")
+
+def ingest_batch(spool):
+    # Parse the spooled NDJSON line by line and bulk write it in chunks, yielding one report line per
+    # input line in input order: a line that cannot be parsed is reported with the rest of its chunk
+    db = SessionLocal()
+    try:
+        dao = DAO(db)
+        chunk = []
+        for line_number, line in enumerate(spool, start=1):
+            if not line.strip():
+                continue
+            try:
+                chunk.append((line_number, webhook_rows(parse_webhook(line)), None))
+            except Exception as e:
+                chunk.append((line_number, None, f"Invalid payload: {e!r}"))
+
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                yield from write_batch_chunk(dao, chunk)
+                chunk = []
+
+        if chunk:
+            yield from write_batch_chunk(dao, chunk)
+    finally:
+        db.close()
+        spool.close()
+
+def write_batch_chunk(dao: DAO, chunk):
+    # chunk: (line_number, rows, parse error) in input order, rows None for lines that did not parse
+    writable = [(line_number, rows) for line_number, rows, _ in chunk if rows is not None]
+    reports = {}
+    try:
+        if writable:
+            dao.bulk_ingest_rows([rows for _, rows in writable])
+    except Exception as e:
+        logger.warning("Bulk write of %d webhooks failed, retrying one by one: %s", len(writable), str(e))
+
+        # Isolate the lines that cannot be written so the rest of the chunk still goes through
+        for line_number, rows in writable:
+            try:
+                dao.bulk_ingest_rows([rows])
+                reports[line_number] = batch_report_line(line_number, "ok", application_id=rows[2]['application_id'])
+            except Exception as e:
+                reports[line_number] = batch_report_line(line_number, "error", application_id=rows[2]['application_id'],
+                                                         error=str(e))
+    else:
+        for line_number, rows in writable:
+            reports[line_number] = batch_report_line(line_number, "ok", application_id=rows[2]['application_id'])
+
+    for line_number, rows, error in chunk:
+        yield reports[line_number] if rows is not None else batch_report_line(line_number, "error", error=error)
+
+def batch_report_line(line_number, status, **details):
+    return json.dumps({"line": line_number, "status": status, **details}) + "\n"
+
+@router.get("/upsert_stats")
+async def upsert_stats():
+    # Inserted / updated / unchanged counts for candidate, job and application upserts
+    return JSONResponse(content=upsert_counters.snapshot(), status_code=200)
+
+@router.get("/ingest_cache/stats")
+async def ingest_cache_stats():
+    # Hit/miss counters of the candidate and job payload caches in this process
+    return JSONResponse(content={cache.name: cache.stats() for cache in (candidate_cache(), job_cache())}, status_code=200)
+
+@router.get("/ingest_queue/stats")
+async def ingest_queue_stats(request: Request):
+    # Queue depth, in-flight count, lag of the oldest queued webhook and dead letters
+    ingest_queue = getattr(request.app.state, "ingest_queue", None)
+    if ingest_queue is None:
+        raise HTTPException(status_code=404, detail="Async ingestion is disabled")
+    return JSONResponse(content=await run_in_threadpool(ingest_queue.stats), status_code=200)
+
+@router.get("/attachments/fetch_stats")
+async def attachment_fetch_stats(request: Request):
+    # Downloaded, deduplicated, retried and failed attachment counts of this process's fetcher
+    fetcher = getattr(request.app.state, "attachment_fetcher", None)
+    if fetcher is None:
+        raise HTTPException(status_code=404, detail="Attachment fetching is disabled")
+    return JSONResponse(content=fetcher.counters.snapshot(), status_code=200)
@@ -0,0 +1,27 @@
+import hashlib
+import hmac
+from app.greenhouse_applications.schema import GreenhouseWebhook
+
+WEBHOOK_SECRET_KEY = "your_secret_key_here"
+
+
+class SignatureVerifier:
+    def __init__(self, secret_key: str):
+        # The HMAC key schedule is done once here; each request only copies the keyed state
+        self._mac = hmac.new(secret_key.encode(), digestmod=hashlib.sha256)
+
+    def new_mac(self):
+        return self._mac.copy()
+
+    def verify(self, message_body: bytes, signature: str) -> bool:
+        mac = self._mac.copy()
+        mac.update(message_body)
+        return hmac.compare_digest(mac.hexdigest(), signature)
+
+
+webhook_verifier = SignatureVerifier(WEBHOOK_SECRET_KEY)
+
+
+def parse_webhook(body) -> GreenhouseWebhook:
+    # Parse and validate the raw body in one pass (pydantic-core's JSON parser, no intermediate dicts)
+    return GreenhouseWebhook.model_validate_json(body)
@@ -1,25 +1,111 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.database import engine
-from app.greenhouse_applications import models
+from app.database import SessionLocal, dispose_async_engine
 from app.greenhouse_applications.webhook_api import router as webhook_router
+from app.greenhouse_applications.read_api import router as read_router
+from app.greenhouse_applications.scores_api import router as scores_router
+from app.greenhouse_applications.partitions import ensure_upcoming_partitions
+from app.schema_upgrade import check_schema
 from app.core.logger_setup import setup_logger
 from app.core.config import settings
+from app.core.pool_stats import pool_stats
 
-# Set up the logger
-logger = setup_logger()
+# Configured by setup_logger in the lifespan hook, so importing the app reads no settings
+logger = logging.getLogger("hr_automation")
+
+
+def check_database():
+    # Runs in a daemon thread, so a slow or unreachable database never holds up startup and the
+    # check cannot keep a stopping worker alive. Tables are created by python -m app.schema_upgrade.
+    if settings.SCHEMA_CHECK_ON_STARTUP:
+        try:
+            check_schema()
+        except Exception as e:
+            logger.error(f"Error checking the database schema: {e}")
+
+    if settings.APPLICATIONS_PARTITIONED:
+        # Keep APPLICATIONS_PARTITION_MONTHS_AHEAD months of partitions ready (also run it from cron)
+        try:
+            ensure_upcoming_partitions()
+        except Exception as e:
+            logger.error(f"Error creating application partitions: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logger(
+        level=settings.LOG_LEVEL,
+        use_queue=settings.LOG_USE_QUEUE,
+        json_lines=settings.LOG_JSON,
+        max_message_length=settings.LOG_MAX_MESSAGE_LENGTH,
+        payload_sample_rate=settings.LOG_PAYLOAD_SAMPLE_RATE,
+    )
+    threading.Thread(target=check_database, name="database-check", daemon=True).start()
+
+    # Optional features import their heavier dependencies (aiohttp, numpy) only when enabled
+    if settings.WEBHOOK_ASYNC_INGEST:
+        from app.greenhouse_applications.ingest_queue import IngestQueue, IngestWorkerPool
+
+        app.state.ingest_queue = IngestQueue(
+            settings.INGEST_QUEUE_PATH,
+            max_attempts=settings.INGEST_MAX_ATTEMPTS,
+            visibility_timeout=settings.INGEST_VISIBILITY_TIMEOUT,
+            max_backoff=settings.INGEST_RETRY_MAX_BACKOFF,
+        )
+        app.state.ingest_workers = IngestWorkerPool(
+            app.state.ingest_queue,
+            SessionLocal,
+            workers=settings.INGEST_WORKERS,
+            batch_size=settings.INGEST_BATCH_SIZE,
+        )
+        app.state.ingest_workers.start()
+        logger.info("Async webhook ingestion enabled, queue at %s", settings.INGEST_QUEUE_PATH)
+
+    if settings.ATTACHMENT_FETCH_ENABLED:
+        from app.greenhouse_applications.attachment_fetcher import AttachmentFetcher
+
+        app.state.attachment_fetcher = AttachmentFetcher(
+            SessionLocal,
+            settings.ATTACHMENT_STORAGE_DIR,
+            concurrency=settings.ATTACHMENT_FETCH_CONCURRENCY,
+            batch_size=settings.ATTACHMENT_FETCH_BATCH_SIZE,
+            max_attempts=settings.ATTACHMENT_FETCH_MAX_ATTEMPTS,
+            timeout=settings.ATTACHMENT_FETCH_TIMEOUT,
+            max_bytes=settings.ATTACHMENT_MAX_BYTES,
+        )
+        app.state.attachment_fetcher.start()
+
+    if settings.RESUME_INDEX_ENABLED:
+        from app.greenhouse_applications.resume_index import ResumeIndex, ResumeIndexer
+        from app.greenhouse_applications.cv_scoring import CVScorer
+
+        app.state.resume_index = ResumeIndex(settings.RESUME_INDEX_PATH)
+        app.state.resume_indexer = ResumeIndexer(app.state.resume_index, SessionLocal)
+        app.state.resume_indexer.start()
+        app.state.cv_scorer = CVScorer(app.state.resume_index, settings.CV_SCORING_CACHE_PATH)
+
+    yield
+
+    if getattr(app.state, "ingest_workers", None) is not None:
+        await app.state.ingest_workers.stop()
+        app.state.ingest_queue.close()
+    if getattr(app.state, "attachment_fetcher", None) is not None:
+        await app.state.attachment_fetcher.stop()
+    if getattr(app.state, "resume_indexer", None) is not None:
+        await app.state.resume_indexer.stop()
+        app.state.resume_index.close()
+    await dispose_async_engine()
 
-# Create the database tables
-try:
-    models.Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully.")
-except Exception as e:
-    logger.error(f"Error creating database tables: {e}")
 
 # Initialize the FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Include the webhook router
 app.include_router(webhook_router, prefix="/api")
+app.include_router(read_router, prefix="/api")
+app.include_router(scores_router, prefix="/api")
 
 
 @app.get("/")
@@ -32,3 +118,9 @@ async def read_root():
 async def health_check():
     logger.info("Health check endpoint accessed.")
     return {"status": "healthy"}
+
+
+@app.get("/diagnostics/pool")
+async def pool_diagnostics():
+    # Checked-out connections, checkout wait histogram, overflow and timeout counts per engine
+    return {name: stats.snapshot() for name, stats in pool_stats.items()}
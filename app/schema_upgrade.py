@@ -0,0 +1,275 @@
+# Creates or upgrades the database schema without dropping data. The app itself never runs DDL;
+# this command is run once per deploy. create_all only creates missing tables, so columns changed
+# and indexes added to the models after a table was first created are applied here, as numbered,
+# idempotent steps.
+#
+#   python -m app.schema_upgrade                 # create tables and apply pending steps
+#   python -m app.schema_upgrade --check-plans   # also verify the common lookups use an index
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from sqlalchemy import Column, Integer, MetaData, String, TIMESTAMP, Table, case, delete, func, inspect, select, text
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import get_engine
+from app.greenhouse_applications import models
+from app.greenhouse_applications.dao import DAO
+
+logger = logging.getLogger(__name__)
+
+version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255)),
+    Column("applied_at", TIMESTAMP, default=datetime.utcnow),
+)
+
+# JSON columns stored as JSONB on PostgreSQL
+JSONB_COLUMNS = {
+    "candidates": ("phone_numbers", "email_addresses", "education", "addresses", "tags", "custom_fields"),
+    "jobs": ("departments", "offices"),
+    "applications": ("source", "current_stage"),
+}
+
+
+def convert_json_to_jsonb(connection):
+    if connection.dialect.name != "postgresql":
+        return
+    for table, columns in JSONB_COLUMNS.items():
+        for column in columns:
+            data_type = connection.execute(
+                text("SELECT data_type FROM information_schema.columns "
+                     "WHERE table_name = :table AND column_name = :column"),
+                {"table": table, "column": column},
+            ).scalar()
+            if data_type == "json":
+                logger.info(f"Converting {table}.{column} to jsonb")
+                connection.execute(text(f'ALTER TABLE {table} ALTER COLUMN "{column}" TYPE jsonb USING "{column}"::jsonb'))
+
+
+def model_table(name):
+    return models.Base.metadata.tables[name]
+
+
+def create_indexes(connection, table_name, index_names):
+    # The named model indexes of one table, skipping those that already exist. Each step lists its
+    # own indexes: building every current model index would reach columns later steps add.
+    existing = {index["name"] for index in inspect(connection).get_indexes(table_name)}
+    for index in model_table(table_name).indexes:
+        if index.name not in index_names or index.name in existing:
+            continue
+        logger.info(f"Creating index {index.name}")
+        index.create(connection)
+
+
+def add_columns(connection, table_name, column_names):
+    # The named (nullable) model columns of one table, skipping those that already exist
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    for column in model_table(table_name).columns:
+        if column.name not in column_names or column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=connection.dialect)
+        logger.info(f"Adding column {table_name}.{column.name} {column_type}")
+        connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN "{column.name}" {column_type}'))
+
+
+def jsonb_and_indexes(connection):
+    convert_json_to_jsonb(connection)
+    create_indexes(connection, "candidates", ("ix_candidates_tags", "ix_candidates_email_addresses"))
+    create_indexes(connection, "applications", (
+        "ix_applications_applied_at", "ix_applications_candidate_id", "ix_applications_job_id_applied_at",
+    ))
+    create_indexes(connection, "candidate_attachments", ("ix_candidate_attachments_candidate_id",))
+    create_indexes(connection, "scores", ("ix_scores_application_id",))
+
+
+def attachment_fetch_columns(connection):
+    add_columns(connection, "candidate_attachments", (
+        "fetch_status", "fetch_attempts", "fetch_claimed_until", "fetch_error", "fetched_at", "content_sha256",
+        "content_type", "size_bytes", "storage_path",
+    ))
+    create_indexes(connection, "candidate_attachments", (
+        "ix_candidate_attachments_fetch_status", "ix_candidate_attachments_content_sha256",
+    ))
+
+
+def attachment_fetched_at_index(connection):
+    create_indexes(connection, "candidate_attachments", ("ix_candidate_attachments_fetched_at",))
+
+
+def backfill_top_scores(connection):
+    # job_top_scores is created empty by create_all; seed it from the scores already stored
+    DAO(Session(bind=connection)).rebuild_top_scores()
+
+
+def backfill_contact_keys(connection):
+    DAO(Session(bind=connection)).backfill_contact_keys()
+
+
+def unique_attachments(connection):
+    # Redelivered webhooks used to add every attachment again. Keep one row per (candidate_id,
+    # filename, type), preferring one already fetched, then the oldest, before adding the unique index.
+    table = model_table("candidate_attachments")
+    ranked = select(
+        table.c.id,
+        func.row_number().over(
+            partition_by=(table.c.candidate_id, table.c.filename, table.c.type),
+            order_by=(case((table.c.fetch_status == "fetched", 0), else_=1), table.c.id),
+        ).label("rank"),
+    ).subquery()
+    removed = connection.execute(delete(table).where(table.c.id.in_(select(ranked.c.id).where(ranked.c.rank > 1))))
+    logger.info(f"Removed {removed.rowcount} duplicate attachment rows")
+    create_indexes(connection, "candidate_attachments", ("uq_candidate_attachments_candidate_id_filename_type",))
+
+
+# (version, description, step); append new steps, never reorder or edit applied ones
+MIGRATIONS = [
+    (1, "jsonb columns, foreign key / applied_at b-tree indexes, gin indexes on tags and emails", jsonb_and_indexes),
+    (2, "per-job top score leaderboard", backfill_top_scores),
+    (3, "attachment fetch status and stored content columns", attachment_fetch_columns),
+    (4, "index on attachment fetched_at for the resume indexer", attachment_fetched_at_index),
+    (5, "hashed candidate contact keys", backfill_contact_keys),
+    (6, "one attachment row per candidate file", unique_attachments),
+]
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(connection):
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+
+def upgrade(bind=None):
+    # Creates missing tables, then applies every step newer than the recorded version
+    applied = []
+    with (bind or get_engine()).begin() as connection:
+        models.Base.metadata.create_all(bind=connection)
+        version_metadata.create_all(bind=connection)
+        version = current_version(connection)
+        for step_version, description, step in MIGRATIONS:
+            if step_version <= version:
+                continue
+            logger.info(f"Applying schema step {step_version}: {description}")
+            step(connection)
+            connection.execute(schema_version.insert().values(version=step_version, description=description))
+            applied.append(step_version)
+    return applied
+
+
+def database_fingerprint(bind):
+    return hashlib.sha256(bind.url.render_as_string(hide_password=False).encode()).hexdigest()[:16]
+
+
+def read_version_cache(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def check_schema(bind=None, cache_path=None):
+    # Startup check that the database is at LATEST_VERSION. Once a database has been seen up to date
+    # that is cached on disk (per database URL), so worker restarts skip the query until a deploy
+    # brings a newer migration. Returns the database version, or LATEST_VERSION on a cache hit.
+    bind = bind or get_engine()
+    cache_path = cache_path or settings.SCHEMA_VERSION_CACHE_PATH
+    fingerprint = database_fingerprint(bind)
+    cache = read_version_cache(cache_path)
+    if cache.get(fingerprint) == LATEST_VERSION:
+        return LATEST_VERSION
+
+    with bind.connect() as connection:
+        version = current_version(connection)
+    if version < LATEST_VERSION:
+        logger.error(f"Database schema is at version {version}, this code expects {LATEST_VERSION}: "
+                     f"run python -m app.schema_upgrade")
+        return version
+
+    cache[fingerprint] = version
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(cache, file)
+    os.replace(tmp_path, cache_path)
+    return version
+
+
+# Lookups the API and the ingest path run all the time; each must be served by an index.
+# (name, sql, dialects it applies to). Containment literals follow the JSON candidate_row stores.
+PLAN_CHECKS = [
+    ("applications by candidate", "SELECT id FROM applications WHERE candidate_id = 1", ("postgresql", "sqlite")),
+    ("applications by job, newest first",
+     "SELECT id FROM applications WHERE job_id = 1 ORDER BY applied_at DESC, id DESC LIMIT 50", ("postgresql", "sqlite")),
+    ("applications by applied_at range",
+     "SELECT id FROM applications WHERE applied_at >= '2024-01-01' AND applied_at < '2024-02-01'", ("postgresql", "sqlite")),
+    ("scores by application", "SELECT score FROM scores WHERE application_id = 1", ("postgresql", "sqlite")),
+    ("top scores of a job",
+     "SELECT application_id, score FROM job_top_scores WHERE job_id = 1 ORDER BY score DESC LIMIT 10",
+     ("postgresql", "sqlite")),
+    ("attachments waiting to be fetched",
+     "SELECT id FROM candidate_attachments WHERE fetch_status IS NULL", ("postgresql", "sqlite")),
+    ("candidates by contact key",
+     "SELECT candidate_id FROM candidate_contact_keys WHERE key_hash = 'abc'", ("postgresql", "sqlite")),
+    ("attachments by candidate", "SELECT id FROM candidate_attachments WHERE candidate_id = 1", ("postgresql", "sqlite")),
+    ("candidates by tag", """SELECT id FROM candidates WHERE tags @> '["Python"]'""", ("postgresql",)),
+    ("candidates by email",
+     """SELECT id FROM candidates WHERE email_addresses @> '["jane@example.com"]'""", ("postgresql",)),
+]
+
+
+def plan_uses_index(connection, sql):
+    if connection.dialect.name == "postgresql":
+        # Tiny tables are cheaper to scan, so take sequential scans off the table for the check
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rendered = json.dumps(plan)
+        return "Index" in rendered, rendered
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    details = [row[-1] for row in rows]
+    return any("USING INDEX" in detail or "USING COVERING INDEX" in detail for detail in details), "; ".join(details)
+
+
+def check_query_plans(bind=None):
+    # Returns a list of (name, plan) for every lookup that is not served by an index
+    failures = []
+    with (bind or get_engine()).connect() as connection:
+        for name, sql, dialects in PLAN_CHECKS:
+            if connection.dialect.name not in dialects:
+                continue
+            with connection.begin():
+                uses_index, plan = plan_uses_index(connection, sql)
+            if not uses_index:
+                failures.append((name, plan))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the database schema")
+    parser.add_argument("--check-plans", action="store_true", help="fail if a common lookup does not use an index")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    applied = upgrade()
+    print(f"Applied schema steps: {applied}" if applied else "Schema is up to date")
+
+    if args.check_plans:
+        failures = check_query_plans()
+        for name, plan in failures:
+            print(f"NO INDEX {name}: {plan}")
+        if failures:
+            sys.exit(1)
+        print("All common lookups use an index")
@@ -0,0 +1,85 @@
+# How many JD interview answers the local pre-validator and the verdict cache settle without a model
+# call. Interviews answer every question with a mix of common short answers (drawn with a skew, as
+# real ones are), free text unique to the interview, and junk (empty, one character, the question
+# echoed back). The model is scripted with a fixed latency; every interview runs its answers in order.
+#
+#   python -m benchmarks.answer_validation --interviews 200 --latency 0.8
+import argparse
+import asyncio
+import random
+import time
+
+COMMON_ANSWERS = {
+    "job title": ["software engineer", "senior software engineer", "data scientist", "product manager"],
+    "full-time": ["full-time", "Full-time", "full time", "contract", "part-time"],
+    "department": ["engineering", "Engineering", "data", "product"],
+    "report to": ["the cto", "CTO", "head of engineering", "engineering manager"],
+    "based at": ["london", "London", "remote", "manchester", "london, uk"],
+    "experience": ["5 years", "3+ years", "3-5 years", "5+", "2 years"],
+    "salary": ["£60,000", "60k - 70k per annum", "competitive", "no"],
+    "work mode": ["hybrid", "remote", "Hybrid", "on-site", "hybrid, 2 days in office"],
+}
+JUNK = ["", "x", "?", "..."]
+
+
+def interview_answers(rng, questions, number):
+    answers = []
+    for question in questions:
+        roll = rng.random()
+        common = next((pool for topic, pool in COMMON_ANSWERS.items() if topic in question.lower()), None)
+        if roll < 0.05:
+            answers.append(rng.choice(JUNK))
+        elif roll < 0.08:
+            answers.append(question)
+        elif common and roll < 0.9:
+            # Zipf-like: the first answers in each pool are the most frequent
+            answers.append(common[min(int(rng.expovariate(1.2)), len(common) - 1)])
+        else:
+            answers.append(f"free text answer {rng.randrange(10**6)} for interview {number}")
+    return answers
+
+
+async def main(args):
+    from hr_bot.bot.bot_modules.create_jd import JobDescriptionHandler
+
+    calls = []
+
+    async def scripted_model(messages, max_tokens, temperature, **options):
+        calls.append(1)
+        await asyncio.sleep(args.latency)
+        return "No" if "A: \n" in messages[-1]["content"] else "Yes"
+
+    handler = JobDescriptionHandler()
+    handler.chat_completion = scripted_model
+    questions = [question for section in handler.sections for question in handler.template[section]]
+    rng = random.Random(11)
+    interviews = [interview_answers(rng, questions, number) for number in range(args.interviews)]
+
+    waits = []
+
+    async def run_interview(answers):
+        started = time.perf_counter()
+        for question, answer in zip(questions, answers):
+            await handler.analyze_answer(question, answer.strip().lower())
+        waits.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[run_interview(answers) for answers in interviews])
+    elapsed = time.perf_counter() - started
+
+    stats = handler.answer_validator.stats()
+    answers = args.interviews * len(questions)
+    print(f"{args.interviews} interviews, {answers} answers: {len(calls)} model calls "
+          f"({stats['model_calls_avoided']:.0%} avoided) in {elapsed:.1f} s")
+    print(f"locally accepted {stats['local_accepted']}, rejected {stats['local_rejected']}; "
+          f"{stats['coalesced']} joined an identical call in flight; "
+          f"cache hits {stats['hits']}, misses {stats['misses']} (hit rate {stats['hit_rate']:.0%})")
+    print(f"validation wait per interview: {sum(waits) / len(waits):.1f} s on average "
+          f"(every answer through the model: {len(questions) * args.latency:.1f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer pre-validation and verdict cache hit rates")
+    parser.add_argument("--interviews", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.8, help="scripted model latency (seconds)")
+    asyncio.run(main(parser.parse_args()))
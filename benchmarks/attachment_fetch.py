@@ -0,0 +1,132 @@
+# Run the attachment fetcher against a local HTTP stand-in for Greenhouse's file URLs and check
+# what it stored: every file downloaded once per distinct content, hashes matching what was served,
+# expired links (404) given up on and flaky ones (500) retried.
+#
+#   python -m benchmarks.attachment_fetch --database-url sqlite:///bench_fetch.db --latency-ms 50
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from aiohttp import web
+from benchmarks.payloads import synthetic_webhook
+from benchmarks.scratch import require_scratch_database
+
+
+def build_files(count, size):
+    rng = random.Random(7)
+    return [rng.randbytes(size) for _ in range(count)]
+
+
+async def start_stand_in(files, latency, flaky_failures):
+    failures_left = dict(flaky_failures)
+
+    async def serve_file(request):
+        await asyncio.sleep(latency)
+        index = int(request.match_info["index"])
+        if failures_left.get(index, 0) > 0:
+            failures_left[index] -= 1
+            raise web.HTTPInternalServerError()
+        response = web.StreamResponse(headers={"Content-Type": "application/pdf"})
+        await response.prepare(request)
+        body = files[index]
+        for offset in range(0, len(body), 64 * 1024):
+            await response.write(body[offset:offset + 64 * 1024])
+        await response.write_eof()
+        return response
+
+    async def expired(request):
+        raise web.HTTPNotFound()
+
+    server = web.Application()
+    server.add_routes([web.get("/files/{index}", serve_file), web.get("/expired/{index}", expired)])
+    runner = web.AppRunner(server)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def main(args):
+    require_scratch_database(args.database_url, args.reset_database)
+    os.environ["DATABASE_URL"] = args.database_url
+    from sqlalchemy import func, select
+    from app.database import engine, SessionLocal
+    from app.greenhouse_applications import models
+    from app.greenhouse_applications.attachment_fetcher import AttachmentFetcher
+    from app.greenhouse_applications.dao import DAO, webhook_rows
+    from app.greenhouse_applications.webhook_pipeline import parse_webhook
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    files = build_files(args.distinct_files, args.file_kb * 1024)
+    flaky = {index: 1 for index in range(0, args.distinct_files, 10)}  # Every 10th file fails once
+    runner, base_url = await start_stand_in(files, args.latency_ms / 1000, flaky)
+
+    # Each candidate's attachments point at the stand-in; the same file shows up under several URLs
+    row_sets = []
+    for n in range(1, args.candidates + 1):
+        webhook = synthetic_webhook(n, args.attachments)
+        for i, attachment in enumerate(webhook["payload"]["application"]["candidate"]["attachments"]):
+            index = (n * args.attachments + i) % args.distinct_files
+            route = "expired" if (n + i) % 25 == 0 else "files"
+            attachment["url"] = f"{base_url}/{route}/{index}?candidate={n}"
+        row_sets.append(webhook_rows(parse_webhook(json.dumps(webhook))))
+    db = SessionLocal()
+    DAO(db).bulk_ingest_rows(row_sets)
+    db.close()
+
+    storage_dir = tempfile.mkdtemp(prefix="attachments_")
+    fetcher = AttachmentFetcher(SessionLocal, storage_dir, concurrency=args.concurrency, batch_size=args.batch_size,
+                                retry_backoff=0)
+    started = time.perf_counter()
+    try:
+        while await fetcher.fetch_pending():
+            pass
+        elapsed = time.perf_counter() - started
+    finally:
+        await fetcher.close()
+        await runner.cleanup()
+
+    db = SessionLocal()
+    try:
+        table = models.CandidateAttachment
+        statuses = dict(db.execute(select(table.fetch_status, func.count()).group_by(table.fetch_status)).all())
+        fetched = db.execute(select(table.storage_path, table.content_sha256).where(table.fetch_status == 'fetched')).all()
+    finally:
+        db.close()
+
+    expected = {hashlib.sha256(body).hexdigest() for body in files}
+    mismatched = sum(1 for path, sha in fetched if sha not in expected or not os.path.exists(path))
+    stored_files = sum(len(names) for root, _, names in os.walk(storage_dir) if not root.endswith("tmp"))
+    counters = fetcher.counters.snapshot()
+    shutil.rmtree(storage_dir)
+
+    total = args.candidates * args.attachments
+    print(f"{total} attachments, {args.distinct_files} distinct files of {args.file_kb} KB, "
+          f"{args.latency_ms} ms server latency, concurrency {args.concurrency}")
+    print(f"fetched in {elapsed:.2f} s ({counters['fetched'] / elapsed:.1f} files/s, "
+          f"{counters['bytes_downloaded'] / elapsed / 1024 / 1024:.1f} MB/s)")
+    print(f"statuses {statuses}")
+    print(f"counters {counters}")
+    print(f"files on disk {stored_files}, rows with a missing file or unexpected hash {mismatched}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attachment fetcher against a local HTTP stand-in")
+    parser.add_argument("--database-url", default="sqlite:///bench_fetch.db")
+    parser.add_argument("--reset-database", action="store_true", help="allow dropping the tables of a non-scratch database")
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--attachments", type=int, default=2)
+    parser.add_argument("--distinct-files", type=int, default=150)
+    parser.add_argument("--file-kb", type=int, default=256)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,152 @@
+# Load test of concurrent JD interviews in the HR bot: many conversations run the full
+# "Create a JD" interview at once, their turns interleaved across several CVBot instances
+# (standing in for bot replicas) that share one state storage.
+#
+#   python -m benchmarks.bot_conversations --conversations 300 --replicas 3
+#   python -m benchmarks.bot_conversations --storage-url sqlite:///bench_state.db --flush-interval 0
+#
+# With --storage-url every replica gets its own SqlStorage (own cache and connection) on the same
+# database, as separate bot processes would. Write-behind (--flush-interval > 0) only guarantees
+# read-your-writes within a process, so it is run with --sticky (each conversation stays on one
+# replica, as with session affinity on the load balancer).
+#
+# The chat model is replaced by a scripted one with random latency, so turns overlap the way
+# they do behind a real model. Every conversation answers with its own marker; the run fails if
+# any conversation was asked the questions out of order or got a JD containing another's answers.
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from benchmarks.stats import percentile
+
+MARKER = re.compile(r"conversation (\d+)\b")
+
+
+class ScriptedModel:
+    # Answers every validation with "Yes" and echoes the prompt as the generated text
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, messages, max_tokens, temperature, **options):
+        self.calls += 1
+        await asyncio.sleep(random.uniform(0, self.latency))
+        if max_tokens <= 10:
+            return "Yes"
+        return messages[-1]["content"]
+
+
+async def run_conversation(number, bots, questions, latencies, sticky):
+    from botbuilder.core.adapters import TestAdapter
+    from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+
+    # An Activity template: TestAdapter only takes the channel id from a ConversationReference
+    adapter = TestAdapter(template_or_conversation=Activity(
+        channel_id="test",
+        service_url="https://test.com",
+        from_property=ChannelAccount(id=f"user-{number}", name=f"User {number}"),
+        recipient=ChannelAccount(id="bot", name="Bot"),
+        conversation=ConversationAccount(id=f"conversation-{number}"),
+    ))
+
+    home = random.choice(bots)
+
+    async def turn(text):
+        bot = home if sticky else random.choice(bots)  # Otherwise any replica may serve any turn
+        started = time.perf_counter()
+        await adapter.process_activity(Activity(type="message", text=text), bot.on_turn)
+        latencies.append(time.perf_counter() - started)
+
+    await turn("create a jd")
+    for index in range(len(questions)):
+        await turn(f"answer {index} from conversation {number}")
+
+    texts = [activity.text or "" for activity in adapter.activity_buffer]
+    asked = [text for text in texts if text in questions]
+    generated = [text for text in texts if text.startswith("Generated Job Description:")]
+    problems = []
+    if asked != questions:
+        problems.append(f"asked {len(asked)} questions out of order or repeated")
+    if len(generated) != 1:
+        problems.append(f"{len(generated)} generated job descriptions")
+    elif set(MARKER.findall(generated[0])) != {str(number)}:
+        problems.append(f"JD mixes in answers of conversations {sorted(set(MARKER.findall(generated[0])) - {str(number)})}")
+    return problems
+
+
+async def main(args):
+    from botbuilder.core import ConversationState, MemoryStorage, UserState
+    from hr_bot.bot.cv_bot import CVBot
+    from hr_bot.bot.state_storage import create_storage, deserialize_state
+    from hr_bot.dialogs.main_dialog import MainDialog
+
+    memory = MemoryStorage()
+    storages = [
+        create_storage(args.storage_url, flush_interval=args.flush_interval) if args.storage_url else memory
+        for _ in range(args.replicas)
+    ]
+    model = ScriptedModel(args.latency)
+    bots = []
+    for storage in storages:
+        bot = CVBot(ConversationState(storage), UserState(storage), MainDialog("connection"))
+        bot.job_description_handler.chat_completion = model
+        bots.append(bot)
+
+    handler = bots[0].job_description_handler
+    questions = [question for section in handler.sections for question in handler.template[section]]
+
+    latencies = []
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_conversation(number, bots, questions, latencies, args.sticky) for number in range(args.conversations)
+    ])
+    elapsed = time.perf_counter() - started
+
+    stored = memory.memory
+    if args.storage_url:
+        for storage in storages:
+            await storage.close()
+        if args.storage_url.startswith("sqlite:///"):
+            import sqlite3
+
+            with sqlite3.connect(args.storage_url[len("sqlite:///"):]) as conn:
+                rows = conn.execute("SELECT key, e_tag, data FROM bot_state").fetchall()
+            stored = {key: deserialize_state(data, e_tag) for key, e_tag, data in rows}
+            print(f"Stored state: {len(rows)} keys, {sum(len(data) for _, _, data in rows) / max(len(rows), 1):.0f} "
+                  f"bytes per key after compaction")
+        totals = {name: sum(storage.stats[name] for storage in storages) for name in storages[0].stats}
+        print(f"Storage: {totals['reads']} key reads in {totals['read_queries']} queries "
+              f"({totals['cache_hits']} from cache), {totals['writes']} key writes in {totals['flushes']} flushes, "
+              f"{totals['conflicts']} ETag conflicts")
+
+    failures = {number: problems for number, problems in enumerate(results) if problems}
+    record_sizes = [len(json.dumps(item.get("JobDescriptionState"), default=str))
+                    for item in stored.values() if isinstance(item, dict) and "JobDescriptionState" in item]
+    print(f"{args.conversations} concurrent conversations over {args.replicas} bot replicas, "
+          f"{len(questions)} questions each")
+    print(f"{len(latencies)} turns in {elapsed:.2f} s ({len(latencies) / elapsed:.0f} turns/s), "
+          f"turn p50 {percentile(latencies, 50) * 1000:.1f} ms, p95 {percentile(latencies, 95) * 1000:.1f} ms, "
+          f"{model.calls} model calls")
+    if record_sizes:
+        print(f"JD state record: {sum(record_sizes) / len(record_sizes):.0f} bytes on average, "
+              f"{max(record_sizes)} max")
+    for number, problems in sorted(failures.items())[:10]:
+        print(f"conversation {number}: {'; '.join(problems)}")
+    if failures:
+        print(f"{len(failures)} conversations interfered with each other")
+        sys.exit(1)
+    print("No interference between conversations")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent JD interview load test for the HR bot")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--replicas", type=int, default=3, help="CVBot instances sharing one storage")
+    parser.add_argument("--latency", type=float, default=0.05, help="maximum scripted model latency (seconds)")
+    parser.add_argument("--storage-url", help="sqlite:///... or postgresql://... instead of one shared MemoryStorage")
+    parser.add_argument("--flush-interval", type=float, default=0.0, help="write-behind interval (0 writes through)")
+    parser.add_argument("--sticky", action="store_true", help="keep each conversation on one replica")
+    asyncio.run(main(parser.parse_args()))
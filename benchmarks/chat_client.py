@@ -0,0 +1,179 @@
+# Run the bot's chat client against a local HTTP stand-in for the Azure OpenAI chat completions API:
+# many concurrent calls with model-like latency, while a ticker measures how late the event loop
+# runs (every other turn in the bot waits that long).
+#
+#   python -m benchmarks.chat_client --calls 200 --latency 0.5 --max-concurrency 16
+#   python -m benchmarks.chat_client --compare-sync   # also the old blocking openai.ChatCompletion path
+#
+# The stand-in records the peak number of requests in flight and the client connections it saw,
+# so the run also checks the concurrency limit and connection reuse. --timeout-calls sends some
+# requests the stand-in answers only after ten times --latency, which must fail with ChatTimeout.
+import argparse
+import asyncio
+import random
+import sys
+import threading
+import time
+from aiohttp import web
+from benchmarks.stats import percentile
+
+
+def start_stand_in(latency, profiles=None):
+    # Served from its own thread and event loop, so it keeps answering even when the loop under test
+    # is blocked (as it is by the synchronous SDK). profiles optionally gives a model its own
+    # {"latency": (low, high), "hang": rate, "error": rate}, latency being that of a 1000-token answer
+    # (shorter answers take proportionally less, at least a tenth); a hanging request takes 100x as long.
+    profiles = profiles or {}
+    stats = {"requests": 0, "in_flight": 0, "peak": 0, "connections": set()}
+
+    async def chat(request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak"] = max(stats["peak"], stats["in_flight"])
+        stats["connections"].add(request.transport.get_extra_info("peername"))
+        profile = profiles.get(request.match_info["model"], {})
+        low, high = profile.get("latency", (latency / 2, latency))
+        if profile:
+            low, high = (value * max(body["max_tokens"], 100) / 1000 for value in (low, high))
+        roll = random.random()
+        try:
+            # "slow" asks for an answer well past any sensible timeout
+            if body["messages"][-1]["content"] == "slow":
+                await asyncio.sleep(latency * 10)
+            elif roll < profile.get("hang", 0):
+                await asyncio.sleep(high * 100)
+            else:
+                await asyncio.sleep(random.uniform(low, high))
+        finally:
+            stats["in_flight"] -= 1
+        if roll > 1 - profile.get("error", 0):
+            raise web.HTTPServiceUnavailable()
+        if request.headers.get("api-key") != "stand-in-key":
+            raise web.HTTPUnauthorized()
+        content = "Yes" if body["max_tokens"] <= 10 else f"  {request.match_info['model']}: {body['messages'][-1]['content']}  "
+        return web.json_response({"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]})
+
+    async def serve():
+        app = web.Application()
+        app.router.add_post("/openai/deployments/{model}/chat/completions", chat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        return runner, site._server.sockets[0].getsockname()[1]
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    runner, port = asyncio.run_coroutine_threadsafe(serve(), loop).result()
+
+    def stop():
+        # Requests still hanging are cancelled; aiohttp reports those as unhandled, which is expected here
+        loop.set_exception_handler(lambda loop, context: None)
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    return stop, f"http://127.0.0.1:{port}", stats
+
+
+async def loop_lag(samples, stop, interval=0.005):
+    # How much later than scheduled the event loop gets back to a periodic task
+    while not stop.is_set():
+        scheduled = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - scheduled, 0.0))
+
+
+async def measure(calls, call):
+    lags, stop = [], asyncio.Event()
+    ticker = asyncio.create_task(loop_lag(lags, stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*[call(number) for number in range(calls)], return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return results, elapsed, lags
+
+
+def report(name, calls, elapsed, lags):
+    print(f"{name}: {calls} calls in {elapsed:.2f} s ({calls / elapsed:.0f}/s), event loop lag "
+          f"p50 {percentile(lags, 50) * 1000:.1f} ms, p99 {percentile(lags, 99) * 1000:.1f} ms, "
+          f"max {max(lags) * 1000:.0f} ms")
+
+
+async def main(args):
+    from hr_bot.bot.bot_modules.chat_client import ChatClient, ChatTimeout
+
+    stop_stand_in, url, stats = start_stand_in(args.latency)
+    client = ChatClient(api_base=url, api_key="stand-in-key", timeout=args.latency * 4,
+                        max_concurrency=args.max_concurrency, pool_size=args.max_concurrency)
+    problems = []
+    try:
+        async def call(number):
+            return await client.chat("gpt-4", [{"role": "user", "content": f"call {number}"}], 100, 0.7)
+
+        results, elapsed, lags = await measure(args.calls, call)
+        report("async client", args.calls, elapsed, lags)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            problems.append(f"{len(errors)} calls failed, e.g. {errors[0]!r}")
+        if any(result != f"gpt-4: call {number}" for number, result in enumerate(results) if isinstance(result, str)):
+            problems.append("a call got another call's answer")
+        print(f"stand-in: {stats['requests']} requests, peak {stats['peak']} in flight "
+              f"(limit {args.max_concurrency}), {len(stats['connections'])} client connections")
+        if stats["peak"] > args.max_concurrency:
+            problems.append("the concurrency limit was exceeded")
+        if len(stats["connections"]) > args.max_concurrency:
+            problems.append("connections were not reused")
+
+        if args.timeout_calls:
+            async def timed_out(number):
+                started = time.perf_counter()
+                try:
+                    await client.chat("gpt-4", [{"role": "user", "content": "slow"}], 100, 0.7, timeout=args.latency)
+                except ChatTimeout:
+                    return time.perf_counter() - started
+                return None
+
+            waits = await asyncio.gather(*[timed_out(number) for number in range(args.timeout_calls)])
+            if any(wait is None for wait in waits):
+                problems.append("a call outlived its timeout without ChatTimeout")
+            else:
+                print(f"timeouts: {len(waits)} calls gave up after {max(waits):.2f} s at most "
+                      f"(timeout {args.latency:.2f} s, the stand-in answers after {args.latency * 10:.1f} s)")
+
+        if args.compare_sync:
+            import openai
+
+            openai.api_type, openai.api_key = "azure", "stand-in-key"
+            openai.api_base, openai.api_version = url, client.api_version
+
+            async def sync_call(number):
+                # What create_jd.py did before: the blocking SDK call inside an async handler
+                response = openai.ChatCompletion.create(
+                    engine="gpt-4", messages=[{"role": "user", "content": f"call {number}"}], max_tokens=100,
+                    temperature=0.7,
+                )
+                return response.choices[0].message["content"].strip()
+
+            calls = min(args.calls, 20)
+            _, elapsed, lags = await measure(calls, sync_call)
+            report("blocking SDK", calls, elapsed, lags)
+    finally:
+        await client.close()
+        stop_stand_in()
+
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Async chat client against a local chat API stand-in")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="maximum stand-in response time (seconds)")
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--timeout-calls", type=int, default=5, help="calls that must time out")
+    parser.add_argument("--compare-sync", action="store_true", help="also run the blocking openai SDK call")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,75 @@
+# Time the BM25 resume scoring engine on a synthetic corpus: building the document matrix,
+# adding one resume to it, saving/loading the cache, and scoring every resume against a job description.
+#
+#   python -m benchmarks.cv_scoring --documents 100000
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.stats import summarize
+
+
+def synthetic_texts(documents, words_per_document, vocabulary_size, seed=11):
+    # Zipf-distributed words, so a few terms are everywhere and most are rare, as in real resumes
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"skill{i}" for i in range(vocabulary_size)])
+    for _ in range(documents):
+        ids = np.minimum(rng.zipf(1.3, words_per_document), vocabulary_size) - 1
+        yield " ".join(vocabulary[ids])
+
+
+def main(args):
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from app.greenhouse_applications.cv_scoring import ResumeCorpus
+
+    corpus = ResumeCorpus()
+    started = time.perf_counter()
+    for candidate_id, text in enumerate(synthetic_texts(args.documents, args.words, args.vocabulary)):
+        corpus.add_document(candidate_id, text)
+    build = time.perf_counter() - started
+    print(f"{corpus.documents} resumes, {len(corpus.vocabulary)} terms, {corpus.entry_terms.size} non-zero entries")
+    print(f"build     {build:8.2f} s ({corpus.documents / build:.0f} resumes/s)")
+
+    extra = list(synthetic_texts(100, args.words, args.vocabulary, seed=12))
+    samples = []
+    for offset, text in enumerate(extra):
+        started = time.perf_counter()
+        corpus.add_document(args.documents + offset, text)
+        samples.append(time.perf_counter() - started)
+    print(f"add one   {summarize(samples, sum(samples))['p50_ms']:8.3f} ms p50")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "corpus.npz")
+        started = time.perf_counter()
+        corpus.save(path)
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        corpus = ResumeCorpus.load(path)
+        loaded = time.perf_counter() - started
+    print(f"save      {saved:8.2f} s, load {loaded:.2f} s")
+
+    job_description = next(synthetic_texts(1, args.jd_words, args.vocabulary, seed=13))
+    samples = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        candidates, scores = corpus.score(job_description)
+        samples.append(time.perf_counter() - started)
+    summary = summarize(samples, sum(samples))
+    print(f"score all {summary['p50_ms'] / 1000:8.3f} s p50, {summary['p95_ms'] / 1000:.3f} s p95 "
+          f"for {len(candidates)} candidates, best {scores.max():.2f}")
+
+    applicants = set(range(0, corpus.documents, 10))
+    started = time.perf_counter()
+    candidates, _ = corpus.score(job_description, applicants)
+    print(f"score job {time.perf_counter() - started:8.3f} s for {len(candidates)} applicants")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 resume scoring benchmark")
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=400, help="words per resume")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--jd-words", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,104 @@
+# Latency of the JD interview's model calls with the model router against always using the largest
+# model, both through the chat client and a local stand-in whose models answer with different
+# latencies and sometimes hang or fail. Every interview makes its 25 validations, then the company
+# overview, the full JD and one refinement, in order.
+#
+#   python -m benchmarks.model_router --interviews 40 --scale 0.02
+#
+# --scale shrinks every latency, budget and timeout alike, so a run takes seconds instead of minutes;
+# the figures are reported back at full scale.
+import argparse
+import asyncio
+import sys
+from benchmarks.chat_client import start_stand_in
+from benchmarks.stats import percentile
+
+# Full-scale behaviour of the stand-in's models (seconds for a 1000-token answer)
+PROFILES = {
+    "gpt-4-32k": {"latency": (8.0, 40.0), "hang": 0.03, "error": 0.02},
+    "gpt-4": {"latency": (4.0, 20.0), "hang": 0.01, "error": 0.01},
+    "gpt-35-turbo": {"latency": (0.5, 3.0), "error": 0.01},
+}
+CALLS = [("validation", 10)] * 25 + [("company_overview", 200), ("job_description", 1000), ("refinement", 1000)]
+
+
+def scaled_profiles(scale):
+    return {model: {**profile, "latency": tuple(value * scale for value in profile["latency"])}
+            for model, profile in PROFILES.items()}
+
+
+def scaled_routes(routes, scale):
+    from hr_bot.bot.bot_modules.model_router import Route
+
+    return {name: Route(route.tier, route.budget * scale, route.attempt_timeout * scale)
+            for name, route in routes.items()}
+
+
+async def run(router, interviews):
+    latencies = {call_type: [] for call_type, _ in CALLS}
+    failures = {call_type: 0 for call_type, _ in CALLS}
+
+    async def interview(number):
+        loop = asyncio.get_running_loop()
+        for call_type, max_tokens in CALLS:
+            started = loop.time()
+            try:
+                await router.chat(call_type, [{"role": "user", "content": f"interview {number}"}], max_tokens, 0.7)
+            except Exception:
+                failures[call_type] += 1
+            latencies[call_type].append(loop.time() - started)
+
+    await asyncio.gather(*[interview(number) for number in range(interviews)])
+    return latencies, failures
+
+
+def report(name, latencies, failures, scale):
+    print(name)
+    for call_type, samples in latencies.items():
+        print(f"  {call_type:17} p50 {percentile(samples, 50) / scale:6.1f} s   p95 {percentile(samples, 95) / scale:6.1f} s"
+              f"   failed {failures[call_type]}/{len(samples)}")
+
+
+async def main(args):
+    from hr_bot.bot.bot_modules.chat_client import ChatClient
+    from hr_bot.bot.bot_modules.create_jd import CONFIG, chat_models, model_routes, model_tiers
+    from hr_bot.bot.bot_modules.model_router import ModelRouter, Route
+
+    stop_stand_in, url, _ = start_stand_in(args.scale, scaled_profiles(args.scale))
+    client = ChatClient(api_base=url, api_key="stand-in-key", max_concurrency=args.interviews * 2,
+                        pool_size=args.interviews * 2)
+    try:
+        # What create_jd.py did before: every call on chat_models[0] with the client's default timeout
+        single = ModelRouter(client, {"single": [chat_models[0]]},
+                             scaled_routes({call_type: Route("single", CONFIG.LLM_TIMEOUT, CONFIG.LLM_TIMEOUT)
+                                            for call_type in model_routes}, args.scale))
+        latencies, failures = await run(single, args.interviews)
+        report(f"{chat_models[0]} for every call", latencies, failures, args.scale)
+        single_total = sum(sum(samples) for samples in latencies.values())
+
+        router = ModelRouter(client, model_tiers, scaled_routes(model_routes, args.scale), min_samples=10)
+        latencies, failures = await run(router, args.interviews)
+        report("model router", latencies, failures, args.scale)
+        routed_total = sum(sum(samples) for samples in latencies.values())
+
+        stats = router.stats()
+        print(f"fallbacks: {stats['fallbacks']}")
+        for model, latency in stats["models"].items():
+            p50, p90 = (latency[key] / 1000 / args.scale if latency[key] is not None else float("nan")
+                        for key in ("p50_ms", "p90_ms"))
+            print(f"  {model:13} {latency['calls']:5} calls, {latency['timeouts']} timeouts, {latency['errors']} errors, "
+                  f"p50 {p50:5.1f} s, p90 {p90:5.1f} s")
+        print(f"model time per interview: {single_total / args.interviews / args.scale:.0f} s on one model, "
+              f"{routed_total / args.interviews / args.scale:.0f} s routed")
+    finally:
+        await client.close()
+        stop_stand_in()
+    if routed_total >= single_total:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model router against always using the largest model")
+    parser.add_argument("--interviews", type=int, default=40)
+    parser.add_argument("--scale", type=float, default=0.02, help="factor applied to every latency and timeout")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,49 @@
+# Synthetic Greenhouse webhook payloads shared by the benchmarks
+
+
+def synthetic_webhook(n, attachments=2):
+    return {
+        "action": "new_candidate_application",
+        "payload": {
+            "application": {
+                "id": n,
+                "status": "active",
+                "applied_at": "2024-02-01T10:30:22Z",
+                "last_activity_at": "2024-02-15T09:23:18Z",
+                "url": f"http://app.greenhouse.io/people/{n}?application_id={n}",
+                "source": {"id": 24, "name": "Indeed"},
+                "current_stage": {"id": 3156789, "name": "Application Review"},
+                "candidate": {
+                    "id": n,
+                    "first_name": "Bench",
+                    "last_name": f"Candidate {n}",
+                    "title": "Software Engineer",
+                    "company": "Example Ltd",
+                    "url": f"http://app.greenhouse.io/people/{n}",
+                    "phone_numbers": [{"value": "444-333-2222", "type": "cell"}],
+                    "email_addresses": [{"value": f"candidate{n}@example.com", "type": "personal"}],
+                    "addresses": [],
+                    "educations": [],
+                    "tags": ["Python", "SQL"],
+                    "custom_fields": {},
+                    "attachments": [
+                        {"filename": f"resume_{n}_{i}.pdf", "url": f"https://example.com/{n}/{i}", "type": "resume"}
+                        for i in range(attachments)
+                    ],
+                },
+                "jobs": [{
+                    "id": n % 50,
+                    "name": f"Job {n % 50}",
+                    "requisition_id": f"REQ{n % 50}",
+                    "status": "open",
+                    "created_by_id": 1,
+                    "created_at": "2024-01-15T08:00:00Z",
+                    "opened_at": "2024-01-20T09:00:00Z",
+                    "closed_at": None,
+                    "url": f"http://app.greenhouse.io/sdash/{n % 50}",
+                    "departments": [{"id": 1, "name": "Engineering"}],
+                    "offices": [{"id": 1, "name": "London"}],
+                }],
+            }
+        },
+    }
@@ -0,0 +1,16 @@
+# Guard for the benchmarks that drop and recreate every table of the database they are pointed at
+import os
+import sys
+
+
+def is_scratch_database(database_url):
+    # Only a local SQLite file named bench_*.db (the benchmarks' defaults) is assumed to be disposable
+    if not database_url.startswith("sqlite:///"):
+        return False
+    return os.path.basename(database_url[len("sqlite:///"):]).startswith("bench")
+
+
+def require_scratch_database(database_url, reset_database):
+    if reset_database or is_scratch_database(database_url):
+        return
+    sys.exit(f"Refusing to drop every table of {database_url}: pass --reset-database if it is a scratch database")
@@ -0,0 +1,114 @@
+# Per-request CPU cost of turning a signed webhook body into rows, before and after the
+# parse-once pipeline (no database involved).
+#
+#   python -m benchmarks.webhook_parsing --iterations 20000
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import time
+from datetime import datetime
+from benchmarks.payloads import synthetic_webhook
+
+SECRET_KEY = "your_secret_key_here"
+
+
+def legacy_rows(body, signature):
+    # What simulate_webhook used to do: keyed HMAC per request, request.body() + request.json()
+    # parsing the body into dicts, then picking fields out of nested dicts by hand
+    digest = hmac.new(SECRET_KEY.encode(), body, hashlib.sha256).hexdigest()
+    assert hmac.compare_digest(digest, signature)
+    data = json.loads(body)
+
+    application_data = data['payload']['application']
+    candidate_data = application_data['candidate']
+    job_data = application_data['jobs'][0]
+    candidate = dict(
+        candidate_id=candidate_data['id'],
+        first_name=candidate_data['first_name'],
+        last_name=candidate_data['last_name'],
+        title=candidate_data.get('title'),
+        company=candidate_data.get('company'),
+        url=candidate_data.get('url'),
+        phone_numbers=[phone['value'] for phone in candidate_data.get('phone_numbers', [])],
+        email_addresses=[email['value'] for email in candidate_data.get('email_addresses', [])],
+        education=candidate_data.get('educations', {}),
+        addresses=candidate_data.get('addresses', {}),
+        tags=candidate_data.get('tags', []),
+        custom_fields=candidate_data.get('custom_fields', {})
+    )
+    job = dict(
+        job_id=job_data['id'],
+        name=job_data['name'],
+        requisition_id=job_data.get('requisition_id'),
+        status=job_data.get('status'),
+        url=job_data.get('url'),
+        departments=job_data.get('departments', {}),
+        offices=job_data.get('offices', {}),
+        created_by_id=job_data.get('created_by_id'),
+        created_at=job_data.get('created_at'),
+        opened_at=job_data.get('opened_at'),
+        closed_at=job_data.get('closed_at')
+    )
+    application = dict(
+        application_id=application_data['id'],
+        candidate_id=candidate['candidate_id'],
+        job_id=job['job_id'],
+        status=application_data.get('status'),
+        applied_at=application_data.get('applied_at'),
+        last_activity_at=application_data.get('last_activity_at'),
+        url=application_data['url'],
+        source=application_data.get('source', {}),
+        current_stage=application_data.get('current_stage'),
+    )
+    attachments = [dict(candidate_id=candidate['candidate_id'], filename=attachment['filename'],
+                        url=attachment['url'], type=attachment['type'], created_at=datetime.utcnow())
+                   for attachment in candidate_data.get('attachments', [])]
+    return candidate, job, application, attachments
+
+
+def pipeline_stages():
+    from app.greenhouse_applications.dao import webhook_rows
+    from app.greenhouse_applications.webhook_pipeline import parse_webhook, webhook_verifier
+
+    def verify(body, signature):
+        assert webhook_verifier.verify(body, signature)
+
+    def parse(body, signature):
+        return parse_webhook(body)
+
+    def rows(body, signature):
+        assert webhook_verifier.verify(body, signature)
+        return webhook_rows(parse_webhook(body))
+
+    return verify, parse, rows
+
+
+def cpu_per_call(fn, body, signature, iterations):
+    for _ in range(min(iterations, 500)):  # warm up
+        fn(body, signature)
+    started = time.process_time()
+    for _ in range(iterations):
+        fn(body, signature)
+    return (time.process_time() - started) / iterations
+
+
+def main(args):
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    verify, parse, pipeline_rows = pipeline_stages()
+    print("CPU per request in microseconds; 'after' = verify + parse/validate + row building")
+    print(f"{'attachments':>11} {'body':>8} {'before':>9} {'after':>9} {'verify':>9} {'parse':>9}")
+    for attachments in args.attachments:
+        body = json.dumps(synthetic_webhook(1, attachments)).encode()
+        signature = hmac.new(SECRET_KEY.encode(), body, hashlib.sha256).hexdigest()
+        timings = [cpu_per_call(fn, body, signature, args.iterations)
+                   for fn in (legacy_rows, pipeline_rows, verify, parse)]
+        print(f"{attachments:>11} {len(body):>7}B " + " ".join(f"{t * 1e6:>9.1f}" for t in timings))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Webhook body -> rows CPU microbenchmark")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--attachments", type=int, nargs="+", default=[0, 2, 10, 50])
+    main(parser.parse_args())
@@ -5,7 +5,6 @@ from botbuilder.core import (
     BotFrameworkAdapter,  # Changed import location
     BotFrameworkAdapterSettings,
     ConversationState,
-    MemoryStorage,
     UserState,
 )
 from botbuilder.core.integration import aiohttp_error_middleware
@@ -15,14 +14,19 @@ from botframework.connector.auth import AuthenticationConfiguration
 import config
 from config import DefaultConfig
 from bot.cv_bot import CVBot
+from bot.state_storage import create_storage
 from dialogs.main_dialog import MainDialog
 
 CONFIG = DefaultConfig()
 SETTINGS = BotFrameworkAdapterSettings(CONFIG.APP_ID, CONFIG.APP_PASSWORD)
 ADAPTER = BotFrameworkAdapter(SETTINGS)
 
-# Create MemoryStorage, UserState and ConversationState
-MEMORY = MemoryStorage()
+# Create the state storage (MemoryStorage unless BOT_STATE_STORAGE_URL is set), UserState and ConversationState
+MEMORY = create_storage(
+    CONFIG.BOT_STATE_STORAGE_URL,
+    flush_interval=CONFIG.BOT_STATE_FLUSH_INTERVAL,
+    cache_ttl=CONFIG.BOT_STATE_CACHE_TTL,
+)
 USER_STATE = UserState(MEMORY)
 CONVERSATION_STATE = ConversationState(MEMORY)
 
@@ -47,8 +51,36 @@ async def messages(req: Request) -> Response:
     return Response(status=201)
 
 
+# Hit rates of the local answer pre-validation and verdict cache
+async def answer_validation_stats(req: Request) -> Response:
+    return json_response(BOT.job_description_handler.answer_validator.stats())
+
+
+# Per-model latency percentiles, timeouts and fallbacks of the chat model router
+async def model_stats(req: Request) -> Response:
+    return json_response(BOT.job_description_handler.model_router.stats())
+
+
+# Bot state reads, cache hits, flushes and ETag conflicts (empty with the in-memory storage)
+async def state_stats(req: Request) -> Response:
+    return json_response(getattr(MEMORY, "stats", {}))
+
+
+# Flush state still waiting in the write-behind cache and close the chat API and resume search
+# connections before the process exits
+async def close_storage(app: web.Application):
+    if hasattr(MEMORY, "close"):
+        await MEMORY.close()
+    await BOT.job_description_handler.chat_client.close()
+    await BOT.resume_search_handler.close()
+
+
 APP = web.Application(middlewares=[aiohttp_error_middleware])
 APP.router.add_post("/api/messages", messages)
+APP.router.add_get("/api/stats/answer-validation", answer_validation_stats)
+APP.router.add_get("/api/stats/models", model_stats)
+APP.router.add_get("/api/stats/bot-state", state_stats)
+APP.on_cleanup.append(close_storage)
 
 if __name__ == "__main__":
     try:
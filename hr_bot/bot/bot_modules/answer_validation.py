@@ -0,0 +1,143 @@
+# bot/bot_modules/answer_validation.py
+
+import asyncio
+import re
+import unicodedata
+from collections import OrderedDict
+
+# Questions whose answer may simply be a number (years of experience, salary, hours...)
+NUMERIC_QUESTION = re.compile(
+    r"\b(experience|salary|salaries|pay|compensation|budget|headcount|team size|how many|how much|how long|years?|hours?)\b"
+)
+AMOUNT = r"[£$€]?\d[\d,.]*\s*(?:k|m)?\+?"
+NUMERIC_ANSWER = re.compile(
+    rf"^(?:about |around |approx\.? |approximately |at least |min(?:imum)?\.? |up to )?{AMOUNT}"
+    rf"(?:\s*(?:-|–|to)\s*{AMOUNT})?"
+    r"(?:\s*(?:years?|yrs?|months?|hours?|hrs?|per (?:year|annum|month|hour)|pa|p\.a\.|/(?:year|yr|month|hour|hr))"
+    r"(?: of experience)?)?$"
+)
+WORD = re.compile(r"[\w'’-]+")
+ECHO_MIN_WORDS = 3  # Shorter spans of the question ("full-time", "work mode") are often real answers
+
+
+def normalize_text(text):
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " ".join(text.split()).strip(" .,!?;:\"'`")
+
+
+def words(text):
+    return WORD.findall(text)
+
+
+def echoes_question(question_words, answer_words):
+    # The answer is the question itself, or a run of at least ECHO_MIN_WORDS of its words
+    if not answer_words:
+        return False
+    if answer_words == question_words:
+        return True
+    span = len(answer_words)
+    if span < ECHO_MIN_WORDS or span > len(question_words):
+        return False
+    return any(question_words[i:i + span] == answer_words for i in range(len(question_words) - span + 1))
+
+
+def prevalidate(question, answer):
+    # Decide the obvious cases without the model: True or False, or None to ask the model
+    normalized = normalize_text(answer)
+    question = normalize_text(question)
+    # Before the length check: "5" is a complete answer to a years-of-experience question
+    if NUMERIC_QUESTION.search(question) and NUMERIC_ANSWER.match(normalized):
+        return True
+    if len(normalized.replace(" ", "")) <= 1 or not any(ch.isalnum() for ch in normalized):
+        return False  # Empty, a single character, or only punctuation / emoji
+    if echoes_question(words(question), words(normalized)):
+        return False
+    return None
+
+
+# Local pre-validation plus a bounded LRU of the model's verdicts keyed by (question, normalized
+# answer): the same short answers ("full-time", "london", "5 years") come up in interview after interview.
+# Identical answers checked at the same time share one model call.
+class AnswerValidator:
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._verdicts = OrderedDict()
+        self._pending = {}
+        self.local_accepted = 0
+        self.local_rejected = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def key(self, question, answer):
+        return question, normalize_text(answer)
+
+    def check(self, question, answer):
+        # True / False when decided locally or remembered, None when the model has to be asked
+        verdict = prevalidate(question, answer)
+        if verdict is not None:
+            if verdict:
+                self.local_accepted += 1
+            else:
+                self.local_rejected += 1
+            return verdict
+        key = self.key(question, answer)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            self.misses += 1
+            return None
+        self._verdicts.move_to_end(key)
+        self.hits += 1
+        return verdict
+
+    async def validate(self, question, answer, ask_model):
+        # ask_model() returns the model's verdict, or None when the call failed (treated as a
+        # rejection for this turn but not remembered)
+        verdict = self.check(question, answer)
+        if verdict is not None:
+            return verdict
+        key = self.key(question, answer)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(ask_model())
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded, so one turn giving up does not cancel the call for the others waiting on it
+        verdict = await asyncio.shield(pending)
+        if verdict is None:
+            return False
+        self.remember(question, answer, verdict)
+        return verdict
+
+    def remember(self, question, answer, verdict):
+        if self.max_size <= 0:
+            return
+        key = self.key(question, answer)
+        self._verdicts[key] = verdict
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.max_size:
+            self._verdicts.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        local = self.local_accepted + self.local_rejected
+        checks = local + self.hits + self.misses
+        lookups = self.hits + self.misses
+        avoided = local + self.hits + self.coalesced
+        return {
+            "checks": checks,
+            "local_accepted": self.local_accepted,
+            "local_rejected": self.local_rejected,
+            "size": len(self._verdicts),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,  # Misses that joined an identical call already in flight
+            # Share of answers settled without a model call of their own
+            "model_calls_avoided": round(avoided / checks, 4) if checks else 0.0,
+        }
@@ -0,0 +1,83 @@
+# bot/bot_modules/chat_client.py
+
+import asyncio
+import aiohttp
+from hr_bot.config import DefaultConfig
+
+CONFIG = DefaultConfig()
+
+
+class ChatError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatTimeout(ChatError):
+    pass
+
+
+class ChatClient:
+    # Async client for the Azure OpenAI chat completions API. One instance is shared by all turns:
+    # requests go over a pool of kept-alive connections, at most max_concurrency are in flight and
+    # each call has its own timeout, so a slow model never holds up the event loop or other turns.
+    def __init__(self, api_base=CONFIG.OPENAI_API_BASE, api_key=CONFIG.BC_OPENAI_API_KEY,
+                 api_version=CONFIG.OPENAI_API_VERSION, timeout=CONFIG.LLM_TIMEOUT,
+                 max_concurrency=CONFIG.LLM_MAX_CONCURRENCY, pool_size=CONFIG.LLM_POOL_SIZE):
+        self.api_base = api_base.rstrip("/")
+        self.api_key = api_key
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self._session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)  # Kept across sessions: in-flight calls release it
+        self.waiting = 0  # Calls queued behind the concurrency limit
+
+    def session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+                headers={"api-key": self.api_key},
+            )
+        return self._session
+
+    async def chat(self, model, messages, max_tokens, temperature, timeout=None, **options):
+        # Returns the stripped content of the first choice. timeout (seconds) starts once the call
+        # has a slot under the concurrency limit: queueing behind other calls is load, not a failure.
+        session = self.session()
+        url = f"{self.api_base}/openai/deployments/{model}/chat/completions"
+        body = {"messages": messages, "max_tokens": max_tokens, "temperature": temperature, **options}
+        timeout = self.timeout if timeout is None else timeout
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            return await asyncio.wait_for(self._post(session, url, body), timeout)
+        except asyncio.TimeoutError:
+            raise ChatTimeout(f"{model} did not answer within {timeout:.1f} s")
+        except aiohttp.ClientError as e:
+            raise ChatError(f"{model} request failed: {e}")
+        finally:
+            self._semaphore.release()
+
+    async def _post(self, session, url, body):
+        async with session.post(url, params={"api-version": self.api_version}, json=body) as response:
+            if response.status != 200:
+                raise ChatError(f"Chat API returned {response.status}: {(await response.text())[:200]}",
+                                response.status)
+            try:
+                payload = await response.json(content_type=None)
+            except ValueError as e:
+                raise ChatError(f"Chat API returned invalid JSON: {e}")
+        # A filtered or truncated answer may have no choices or null content
+        try:
+            return payload["choices"][0]["message"]["content"].strip()
+        except (KeyError, IndexError, TypeError, AttributeError):
+            raise ChatError(f"Chat API returned no answer: {str(payload)[:200]}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
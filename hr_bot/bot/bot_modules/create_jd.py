@@ -2,7 +2,6 @@
 
 import os
 import json
-import openai
 import base64
 from datetime import datetime
 from email.mime.text import MIMEText
@@ -11,117 +10,174 @@ from email.mime.application import MIMEApplication
 from botbuilder.core import TurnContext, MessageFactory, CardFactory
 from botbuilder.schema import ActionTypes, CardAction, HeroCard, SuggestedActions, Attachment
 from hr_bot.config import DefaultConfig
+from hr_bot.bot.bot_modules.answer_validation import AnswerValidator
+from hr_bot.bot.bot_modules.chat_client import ChatClient
+from hr_bot.bot.bot_modules.model_router import ModelRouter, Route
 
-print(DefaultConfig.BC_OPENAI_API_KEY)
+file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ques_modified.json')
 
-file_path = r'bot/bot_modules/ques_modified.json'
-
-# Initialize OpenAI
 CONFIG = DefaultConfig()
-
-openai.log = False
-openai.api_type = "azure"
-openai.api_key = CONFIG.BC_OPENAI_API_KEY
-openai.api_base = "https://bc-api-management-uksouth.azure-api.net"
-openai.api_version = "2023-03-15-preview"
 chat_models = ["gpt-4-32k", "gpt-4", "gpt-35-turbo"]
+# Models of each tier in order of preference; the later ones are the fallbacks
+model_tiers = {
+    "large": [chat_models[0], chat_models[1]],
+    "standard": [chat_models[1], chat_models[2]],
+    "fast": [chat_models[2], chat_models[1]],
+}
+# Tier, total latency budget and per-model timeout (seconds) of each kind of call
+model_routes = {
+    "validation": Route("fast", budget=8, attempt_timeout=4),
+    "company_overview": Route("standard", budget=30, attempt_timeout=20),
+    "job_description": Route("large", budget=150, attempt_timeout=90),
+    "refinement": Route("large", budget=150, attempt_timeout=90),
+}
+
+print(f"OpenAI API Key configured: {'Yes' if CONFIG.BC_OPENAI_API_KEY else 'No'}")  # Debug print
+
+
+class JobDescriptionState:
+    # One conversation's progress through the JD interview. It lives in ConversationState as a small
+    # JSON-friendly record (see to_record), so concurrent conversations never share interview state
+    # and any bot process can pick up the next turn.
+    __slots__ = ("active", "section_index", "question_index", "section_header_shown", "answers",
+                 "generated_jd", "user_email")
+
+    def __init__(self, active=False, section_index=0, question_index=0, section_header_shown=False,
+                 answers=None, generated_jd=None, user_email=None):
+        self.active = active
+        self.section_index = section_index
+        self.question_index = question_index
+        self.section_header_shown = section_header_shown
+        self.answers = answers if answers is not None else {}  # "section.question" index -> answer, None if skipped
+        self.generated_jd = generated_jd
+        self.user_email = user_email
+
+    @classmethod
+    def from_record(cls, record):
+        if not record:
+            return cls()
+        return cls(
+            active=True,
+            section_index=record["s"],
+            question_index=record["q"],
+            section_header_shown=record.get("h", False),
+            answers=dict(record.get("a", {})),
+            generated_jd=record.get("jd"),
+            user_email=record.get("email"),
+        )
 
-try:
-    print(f"OpenAI API Key configured: {'Yes' if openai.api_key else 'No'}")  # Debug print
-except Exception as e:
-    print(f"Error initializing OpenAI: {str(e)}")
+    def to_record(self):
+        # None once no interview is running; optional fields are left out while unset
+        if not self.active:
+            return None
+        record = {"s": self.section_index, "q": self.question_index, "a": self.answers}
+        if self.section_header_shown:
+            record["h"] = True
+        if self.generated_jd is not None:
+            record["jd"] = self.generated_jd
+        if self.user_email:
+            record["email"] = self.user_email
+        return record
+
+    def answer_key(self):
+        return f"{self.section_index}.{self.question_index}"
 
 
 class JobDescriptionHandler:
-    def __init__(self):
-        self.job_description = self.load_template()
-        self.current_section = None
-        self.current_question = None
-        self.sections = list(self.job_description.keys())
-        self.section_index = 0
-        self.question_index = 0
-        self.generated_jd = None
-        self.user_email = None
-        self.section_header_shown = False  # New flag to track if section header has been shown
+    # Holds only the read-only question template; every method works on the JobDescriptionState
+    # of the conversation being served, so one handler serves all conversations
+    def __init__(self, chat_client=None):
+        self.template = self.load_template()
+        self.sections = list(self.template.keys())
+        self.chat_client = chat_client or ChatClient()
+        self.model_router = ModelRouter(self.chat_client, model_tiers, model_routes)
+        self.answer_validator = AnswerValidator(CONFIG.ANSWER_CACHE_SIZE)
 
     def load_template(self):
         with open(file_path, 'r') as file:
             return json.load(file)
 
-    def is_active(self):
-        return self.current_section is not None
-
-    async def handle_message(self, turn_context: TurnContext):
-        if not self.is_active() and turn_context.activity.text.lower() == "create a jd":
-            await self.start_job_description(turn_context)
-        elif self.is_active():
-            if self.generated_jd is not None:
-                await self.handle_accept_refine(turn_context)
-            elif self.current_question:
-                await self.handle_answer(turn_context)
+    def questions(self, section_index):
+        return list(self.template[self.sections[section_index]].keys())
+
+    def current_question(self, state: JobDescriptionState):
+        return self.questions(state.section_index)[state.question_index]
+
+    def next_position(self, state: JobDescriptionState):
+        # (section index, question index) of the question after the current one, None after the last
+        if state.question_index + 1 < len(self.questions(state.section_index)):
+            return state.section_index, state.question_index + 1
+        if state.section_index + 1 < len(self.sections):
+            return state.section_index + 1, 0
+        return None
+
+    def is_active(self, state: JobDescriptionState):
+        return state.active
+
+    async def handle_message(self, turn_context: TurnContext, state: JobDescriptionState):
+        if not state.active and turn_context.activity.text.lower() == "create a jd":
+            await self.start_job_description(turn_context, state)
+        elif state.active:
+            if state.generated_jd is not None:
+                await self.handle_accept_refine(turn_context, state)
             else:
-                await self.handle_refinement(turn_context)
+                await self.handle_answer(turn_context, state)
 
-    async def start_job_description(self, turn_context: TurnContext):
-        self.current_section = self.sections[self.section_index]
-        self.section_header_shown = False  # Reset section header flag
-        await self.ask_next_question(turn_context)
+    async def start_job_description(self, turn_context: TurnContext, state: JobDescriptionState):
+        state.active = True
+        state.section_index = 0
+        state.question_index = 0
+        state.section_header_shown = False  # Reset section header flag
+        await self.ask_current_question(turn_context, state)
 
-    async def ask_next_question(self, turn_context: TurnContext):
+    async def ask_current_question(self, turn_context: TurnContext, state: JobDescriptionState):
         # Show section header if not already shown for current section
-        if not self.section_header_shown:
-            formatted_section = f"\n{'-' * 40}\n{self.current_section}\n{'-' * 40}"
+        if not state.section_header_shown:
+            section = self.sections[state.section_index]
+            formatted_section = f"\n{'-' * 40}\n{section}\n{'-' * 40}"
             await turn_context.send_activity(MessageFactory.text(formatted_section))
-            self.section_header_shown = True
+            state.section_header_shown = True
 
-        questions = list(self.job_description[self.current_section].keys())
-        if self.question_index < len(questions):
-            self.current_question = questions[self.question_index]
-            await turn_context.send_activity(MessageFactory.text(self.current_question))
-        else:
-            self.section_index += 1
-            self.question_index = 0
-            if self.section_index < len(self.sections):
-                self.current_section = self.sections[self.section_index]
-                self.section_header_shown = False  # Reset section header flag for new section
-                await self.ask_next_question(turn_context)
-            else:
-                await self.generate_job_description(turn_context)
+        await turn_context.send_activity(MessageFactory.text(self.current_question(state)))
 
-    async def handle_answer(self, turn_context: TurnContext):
+    async def handle_answer(self, turn_context: TurnContext, state: JobDescriptionState):
         answer = turn_context.activity.text.strip().lower()
 
         if answer == "skip":
-            self.job_description[self.current_section][self.current_question] = None
-            await self.move_to_next_question(turn_context)
+            state.answers[state.answer_key()] = None
+            await self.move_to_next_question(turn_context, state)
             return
 
-        is_appropriate = await self.analyze_answer(self.current_question, answer)
+        is_appropriate = await self.analyze_answer(self.current_question(state), answer)
 
         if is_appropriate:
-            self.job_description[self.current_section][self.current_question] = answer
-            await self.move_to_next_question(turn_context)
+            state.answers[state.answer_key()] = answer
+            await self.move_to_next_question(turn_context, state)
         else:
             await turn_context.send_activity(MessageFactory.text(
                 "I didn't understand the answer. Please give me a relevant response or write 'skip' to move on."))
 
-    async def move_to_next_question(self, turn_context: TurnContext):
-        self.question_index += 1
-        questions = list(self.job_description[self.current_section].keys())
-        if self.question_index < len(questions):
-            self.current_question = questions[self.question_index]
-            await turn_context.send_activity(MessageFactory.text(self.current_question))
-        else:
-            self.section_index += 1
-            self.question_index = 0
-            if self.section_index < len(self.sections):
-                self.current_section = self.sections[self.section_index]
-                self.section_header_shown = False  # Reset section header flag for new section
-                await self.ask_next_question(turn_context)
-            else:
-                await self.generate_job_description(turn_context)
+    async def move_to_next_question(self, turn_context: TurnContext, state: JobDescriptionState):
+        # After the last question the position stays put, so a failed generation is retried
+        # by answering the last question again
+        position = self.next_position(state)
+        if position is None:
+            await self.generate_job_description(turn_context, state)
+            return
+
+        if position[0] != state.section_index:
+            state.section_header_shown = False  # Reset section header flag for new section
+        state.section_index, state.question_index = position
+        await self.ask_current_question(turn_context, state)
+
+    async def chat_completion(self, messages, max_tokens, temperature, call_type, **options):
+        return await self.model_router.chat(call_type, messages, max_tokens, temperature, **options)
 
     async def analyze_answer(self, question, answer):
+        # Obvious, already-seen and in-flight answers are settled without a model call of their own
+        return await self.answer_validator.validate(question, answer, lambda: self.ask_model(question, answer))
+
+    async def ask_model(self, question, answer):
         prompt = f"""
         Q: {question}
         A: {answer}
@@ -130,23 +186,21 @@ class JobDescriptionHandler:
         """
 
         try:
-            response = openai.ChatCompletion.create(
-                engine=chat_models[0],
+            analysis = await self.chat_completion(
                 messages=[
                     {"role": "system",
                      "content": "You're an HR assistant. Determine if answers are appropriate and relevant."},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=10,
+                temperature=0.3,
+                call_type="validation",
                 n=1,
                 stop=None,
-                temperature=0.3,
             )
-
-            analysis = response.choices[0].message['content'].strip().lower()
-            return analysis.startswith('yes')
+            return analysis.lower().startswith('yes')
         except Exception as e:
-            return False
+            return None  # A failed call says nothing about the answer
 
     # Records the user's answer to a question and moves on to the next question or section.
     # async def generate_job_description(self, turn_context: TurnContext):
@@ -178,11 +232,12 @@ class JobDescriptionHandler:
     #         await turn_context.send_activity(
     #             MessageFactory.text(f"An error occurred while generating the job description: {str(e)}"))
 
-    async def generate_job_description(self, turn_context: TurnContext):
-        # Extract all answers from the job_description dictionary
+    async def generate_job_description(self, turn_context: TurnContext, state: JobDescriptionState):
+        # Extract all answers given in this conversation, keyed by question
         answers = {}
-        for section, questions in self.job_description.items():
-            for question, answer in questions.items():
+        for section_index, section in enumerate(self.sections):
+            for question_index, question in enumerate(self.template[section]):
+                answer = state.answers.get(f"{section_index}.{question_index}")
                 if answer is not None and answer.strip() != "":
                     answers[question] = answer.strip()
 
@@ -358,8 +413,7 @@ class JobDescriptionHandler:
             Culture: {answers.get("And what's the work culture like on the team?", "[Company Culture]")}
             """
 
-            company_overview_response = openai.ChatCompletion.create(
-                engine=chat_models[0],
+            company_overview = await self.chat_completion(
                 messages=[
                     {"role": "system",
                      "content": "You are a professional HR writer creating company overviews for job descriptions. Ensure proper spacing between paragraphs using double line breaks."},
@@ -367,16 +421,14 @@ class JobDescriptionHandler:
                 ],
                 max_tokens=200,
                 temperature=0.7,
+                call_type="company_overview",
             )
 
-            company_overview = company_overview_response.choices[0].message['content'].strip()
-
             # Replace the placeholder in the template
             final_template = template.replace("{company_overview}", company_overview)
 
             # Generate the final job description
-            response = openai.ChatCompletion.create(
-                engine=chat_models[0],
+            generated_jd = await self.chat_completion(
                 messages=[
                     {"role": "system", "content": """You are a professional HR assistant tasked with creating job descriptions. 
                     Follow these formatting rules strictly:
@@ -390,19 +442,18 @@ class JobDescriptionHandler:
                 ],
                 max_tokens=1000,
                 temperature=0.7,
+                call_type="job_description",
             )
 
-            self.generated_jd = response.choices[0].message['content'].strip()
-
             # Post-process to ensure proper spacing in the title block
-            title_block_lines = self.generated_jd.split('\n')[:4]
-            rest_of_jd = self.generated_jd.split('\n')[4:]
+            title_block_lines = generated_jd.split('\n')[:4]
+            rest_of_jd = generated_jd.split('\n')[4:]
 
             formatted_title_block = '\n'.join(line + '\n' for line in title_block_lines if line.strip())
 
-            self.generated_jd = formatted_title_block + '\n' + '\n'.join(rest_of_jd)
+            state.generated_jd = formatted_title_block + '\n' + '\n'.join(rest_of_jd)
 
-            await turn_context.send_activity(MessageFactory.text(f"Generated Job Description:\n\n{self.generated_jd}"))
+            await turn_context.send_activity(MessageFactory.text(f"Generated Job Description:\n\n{state.generated_jd}"))
             await self.show_accept_refine_buttons(turn_context)
 
         except Exception as e:
@@ -428,7 +479,7 @@ class JobDescriptionHandler:
         await turn_context.send_activity(reply)
 
     # Processes the user's response (either accept or request a refinement)
-    async def handle_accept_refine(self, turn_context: TurnContext):
+    async def handle_accept_refine(self, turn_context: TurnContext, state: JobDescriptionState):
         user_choice = turn_context.activity.text.lower()
         if user_choice == "accept":
             await self.finalize_job_description(turn_context)
@@ -436,29 +487,28 @@ class JobDescriptionHandler:
             await turn_context.send_activity(
                 MessageFactory.text("Please specify what you'd like to change or add to the job description."))
         elif user_choice in ["download_pdf", "send_email"]:
-            await self.handle_final_option(turn_context)
+            await self.handle_final_option(turn_context, state)
         else:
-            await self.handle_refinement(turn_context)
+            await self.handle_refinement(turn_context, state)
 
-    async def handle_refinement(self, turn_context: TurnContext):
+    async def handle_refinement(self, turn_context: TurnContext, state: JobDescriptionState):
         refinement = turn_context.activity.text
-        prompt = f"Refine the following job description based on this feedback: '{refinement}'\n\nOriginal Job Description:\n{self.generated_jd}"
+        prompt = f"Refine the following job description based on this feedback: '{refinement}'\n\nOriginal Job Description:\n{state.generated_jd}"
 
         try:
-            response = openai.ChatCompletion.create(
-                engine=chat_models[0],
+            state.generated_jd = await self.chat_completion(
                 messages=[
                     {"role": "system",
                      "content": "You are a professional HR assistant tasked with refining job descriptions. Apply the requested changes accurately."},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=1000,
+                temperature=0.7,
+                call_type="refinement",
                 n=1,
                 stop=None,
-                temperature=0.7,
             )
-            self.generated_jd = response.choices[0].message['content'].strip()
-            await turn_context.send_activity(MessageFactory.text(f"Refined Job Description:\n\n{self.generated_jd}"))
+            await turn_context.send_activity(MessageFactory.text(f"Refined Job Description:\n\n{state.generated_jd}"))
             await self.show_accept_refine_buttons(turn_context)
         except Exception as e:
             await turn_context.send_activity(
@@ -515,16 +565,16 @@ class JobDescriptionHandler:
                                       "Here's your Job Description PDF. You can download it by clicking on the attachment.")
         )
 
-    async def handle_final_option(self, turn_context: TurnContext):
+    async def handle_final_option(self, turn_context: TurnContext, state: JobDescriptionState):
         option = turn_context.activity.text.lower()
 
         if option == "download_pdf":
             await self.download_as_pdf(turn_context)
         elif option == "send_email":
-            await self.send_over_email(turn_context)
+            await self.send_over_email(turn_context, state)
 
-    async def send_over_email(self, turn_context: TurnContext):
-        if not self.user_email:
+    async def send_over_email(self, turn_context: TurnContext, state: JobDescriptionState):
+        if not state.user_email:
             await turn_context.send_activity(
                 MessageFactory.text("Sorry, we couldn't find your email address. Please try logging in again."))
             return
@@ -532,10 +582,10 @@ class JobDescriptionHandler:
         try:
             msg = MIMEMultipart()
             msg['From'] = "your_bot@example.com"
-            msg['To'] = self.user_email
+            msg['To'] = state.user_email
             msg['Subject'] = "Your Finalized Job Description"
 
-            body = f"Here's your finalized job description:\n\n{self.generated_jd}"
+            body = f"Here's your finalized job description:\n\n{state.generated_jd}"
             msg.attach(MIMEText(body, 'plain'))
 
             # Attach PDF
@@ -552,7 +602,7 @@ class JobDescriptionHandler:
             # server.quit()
 
             await turn_context.send_activity(
-                MessageFactory.text(f"An email with the job description has been sent to {self.user_email}."))
+                MessageFactory.text(f"An email with the job description has been sent to {state.user_email}."))
         except Exception as e:
             await turn_context.send_activity(
                 MessageFactory.text(f"An error occurred while sending the email: {str(e)}"))
@@ -0,0 +1,62 @@
+# bot/bot_modules/fetch_resumes.py
+
+import logging
+import aiohttp
+from botbuilder.core import TurnContext
+from hr_bot.config import DefaultConfig
+
+CONFIG = DefaultConfig()
+logger = logging.getLogger(__name__)
+
+
+class ResumeSearchHandler:
+    # Keyword search over candidates' resumes through the HR automation API's full-text index
+    def __init__(self, api_url=CONFIG.HR_API_URL, limit=5, timeout=10):
+        self.api_url = api_url.rstrip("/")
+        self.limit = limit
+        self.timeout = timeout
+        self._session = None
+
+    def session(self):
+        # Reused across turns so requests go over a kept-alive connection
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def prompt_for_keywords(self, turn_context: TurnContext):
+        await turn_context.send_activity(
+            "Which skills or keywords should I look for? For example: \"python django aws\"."
+        )
+
+    async def search(self, keywords):
+        async with self.session().get(
+                f"{self.api_url}/api/resumes/search",
+                params={"q": keywords, "limit": self.limit},
+        ) as response:
+            response.raise_for_status()
+            return (await response.json())["items"]
+
+    async def handle_keywords(self, turn_context: TurnContext, keywords: str):
+        try:
+            matches = await self.search(keywords)
+        except Exception as e:
+            logger.error("Error searching resumes: %s", str(e))
+            await turn_context.send_activity("Sorry, I couldn't search the resumes right now. Please try again later.")
+            return
+
+        if not matches:
+            await turn_context.send_activity(f"No resumes matched \"{keywords}\". Try different keywords.")
+            return
+
+        lines = [f"Top candidates for \"{keywords}\":"]
+        for position, match in enumerate(matches, start=1):
+            title = f" - {match['title']}" if match.get("title") else ""
+            lines.append(f"{position}. {match['name'] or 'Candidate ' + str(match['candidate_id'])}{title} "
+                         f"(candidate {match['candidate_id']}, {match['filename']})")
+            if match.get("snippet"):
+                lines.append(f"   {match['snippet']}")
+        await turn_context.send_activity("\n\n".join(lines))
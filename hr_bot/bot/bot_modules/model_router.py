@@ -0,0 +1,109 @@
+# bot/bot_modules/model_router.py
+
+import logging
+import time
+from collections import deque
+from hr_bot.bot.bot_modules.chat_client import ChatError, ChatTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class Route:
+    # How one kind of call is served: a model tier, the time the whole call may take including
+    # fallbacks, and the most a single model gets before the next one is tried
+    def __init__(self, tier, budget, attempt_timeout):
+        self.tier = tier
+        self.budget = budget
+        self.attempt_timeout = attempt_timeout
+
+
+class ModelLatency:
+    # Recent call durations of one model. A timed-out call counts as taking its full timeout,
+    # so a model that stops answering shows up in the percentiles.
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def record(self, seconds, timed_out=False, failed=False):
+        self.calls += 1
+        if timed_out:
+            self.timeouts += 1
+        if failed:
+            self.errors += 1
+        else:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+    def stats(self):
+        def ms(pct):
+            value = self.percentile(pct)
+            return round(value * 1000, 1) if value is not None else None
+
+        return {"calls": self.calls, "errors": self.errors, "timeouts": self.timeouts,
+                "p50_ms": ms(50), "p90_ms": ms(90), "p99_ms": ms(99)}
+
+
+class ModelRouter:
+    # Sends each kind of call to the models of its tier in order, falling back to the next model
+    # on a timeout or error while the route's budget lasts. A model whose recent p90 would not fit
+    # in the route's attempt timeout is tried after the others.
+    def __init__(self, chat_client, tiers, routes, window=200, min_samples=20):
+        self.chat_client = chat_client
+        self.tiers = tiers
+        self.routes = routes
+        self.min_samples = min_samples
+        self.latency = {model: ModelLatency(window) for models in tiers.values() for model in models}
+        self.fallbacks = 0
+
+    def too_slow(self, model, seconds):
+        latency = self.latency[model]
+        return len(latency.samples) >= self.min_samples and latency.percentile(90) > seconds
+
+    def candidates(self, route):
+        models = self.tiers[route.tier]
+        fitting = [model for model in models if not self.too_slow(model, route.attempt_timeout)]
+        return fitting + [model for model in models if model not in fitting]
+
+    async def chat(self, call_type, messages, max_tokens, temperature, **options):
+        route = self.routes[call_type]
+        deadline = time.monotonic() + route.budget
+        error = None
+        for attempt, model in enumerate(self.candidates(route)):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if attempt:
+                self.fallbacks += 1
+                logger.warning("Falling back to %s for %s after: %s", model, call_type, error)
+            timeout = min(route.attempt_timeout, remaining)
+            started = time.monotonic()
+            try:
+                content = await self.chat_client.chat(model, messages, max_tokens, temperature, timeout=timeout,
+                                                      **options)
+            except ChatTimeout as e:
+                self.latency[model].record(timeout, timed_out=True)
+                error = e
+                continue
+            except ChatError as e:
+                self.latency[model].record(time.monotonic() - started, failed=True)
+                error = e
+                continue
+            self.latency[model].record(time.monotonic() - started)
+            return content
+        raise error or ChatTimeout(f"No model answered {call_type} within {route.budget:.0f} s")
+
+    def stats(self):
+        return {
+            "fallbacks": self.fallbacks,
+            "routes": {name: {"tier": route.tier, "models": self.candidates(route), "budget_seconds": route.budget,
+                              "attempt_timeout_seconds": route.attempt_timeout}
+                       for name, route in self.routes.items()},
+            "models": {model: latency.stats() for model, latency in self.latency.items()},
+        }
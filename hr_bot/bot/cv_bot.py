@@ -2,7 +2,8 @@
 from botbuilder.core import ActivityHandler, TurnContext, ConversationState, UserState, MessageFactory
 from botbuilder.dialogs import Dialog
 from hr_bot.dialogs.dialog_helper import DialogHelper
-from hr_bot.bot.bot_modules.create_jd import JobDescriptionHandler
+from hr_bot.bot.bot_modules.create_jd import JobDescriptionHandler, JobDescriptionState
+from hr_bot.bot.bot_modules.fetch_resumes import ResumeSearchHandler
 from botbuilder.schema import HeroCard, CardAction, ActionTypes, Attachment
 
 
@@ -16,7 +17,12 @@ class CVBot(ActivityHandler):
         self.conversation_state = conversation_state
         self.user_state = user_state
         self.dialog = dialog
-        self.job_description_handler = JobDescriptionHandler()  # Initialize the handler
+        self.job_description_handler = JobDescriptionHandler()  # Initialize the handler, shared by all conversations
+        # Per-conversation JD interview progress (a JobDescriptionState record)
+        self.job_description_state = conversation_state.create_property("JobDescriptionState")
+        self.resume_search_handler = ResumeSearchHandler()
+        # Per-conversation flag: the next message is the keywords for a resume search
+        self.resume_search_state = conversation_state.create_property("ResumeSearchState")
         self.user_display_name = None  # To store user's name after authentication
 
     async def on_turn(self, turn_context: TurnContext):
@@ -53,17 +59,26 @@ class CVBot(ActivityHandler):
 
     async def on_message_activity(self, turn_context: TurnContext):
         user_message = turn_context.activity.text.lower() if turn_context.activity.text else ""
+        jd_state = JobDescriptionState.from_record(await self.job_description_state.get(turn_context))
 
         if user_message == "create a jd":
             await turn_context.send_activity("Alright! I'll create a detailed and tailored job description. "
                                              "It won't take long, and I'll ask you some questions to better understand what you're looking for.")
-            await self.job_description_handler.start_job_description(turn_context)
+            jd_state = JobDescriptionState()
+            await self.job_description_handler.start_job_description(turn_context, jd_state)
+            await self.save_job_description_state(turn_context, jd_state)
 
-        elif self.job_description_handler.is_active():
-            await self.job_description_handler.handle_message(turn_context)
+        elif self.job_description_handler.is_active(jd_state):
+            await self.job_description_handler.handle_message(turn_context, jd_state)
+            await self.save_job_description_state(turn_context, jd_state)
 
         elif user_message == "fetch resumes":
-            await turn_context.send_activity("Fetching resumes using CV-Scorer...")
+            await self.resume_search_state.set(turn_context, {"awaiting_keywords": True})
+            await self.resume_search_handler.prompt_for_keywords(turn_context)
+
+        elif (await self.resume_search_state.get(turn_context, dict)).get("awaiting_keywords"):
+            await self.resume_search_state.set(turn_context, {"awaiting_keywords": False})
+            await self.resume_search_handler.handle_keywords(turn_context, turn_context.activity.text)
 
         else:
             # For other messages, run the dialog (handles authentication)
@@ -73,6 +88,13 @@ class CVBot(ActivityHandler):
                 self.conversation_state.create_property("DialogState"),
             )
 
+    async def save_job_description_state(self, turn_context: TurnContext, jd_state: JobDescriptionState):
+        record = jd_state.to_record()
+        if record is None:
+            await self.job_description_state.delete(turn_context)
+        else:
+            await self.job_description_state.set(turn_context, record)
+
     async def on_members_added_activity(self, members_added, turn_context: TurnContext):
         for member in members_added:
             if member.id != turn_context.activity.recipient.id:
@@ -10,4 +10,16 @@ class DefaultConfig:
     APP_ID = os.getenv("MicrosoftAppId", "")
     APP_PASSWORD = os.getenv("MicrosoftAppPassword", "")
     CONNECTION_NAME = os.getenv("ConnectionName", "")
-    BC_OPENAI_API_KEY = os.getenv("BC_OPENAI_API_KEY","")
\ No newline at end of file
+    BC_OPENAI_API_KEY = os.getenv("BC_OPENAI_API_KEY","")
+    HR_API_URL = os.getenv("HR_API_URL", "http://localhost:8000")  # FastAPI backend, for the resume search
+    # Where UserState / ConversationState live: sqlite:///path, postgresql://..., or empty for in-memory
+    BOT_STATE_STORAGE_URL = os.getenv("BOT_STATE_STORAGE_URL", "")
+    # Seconds between write-behind flushes; 0 (the default) writes through, so ETag conflicts fail the turn
+    BOT_STATE_FLUSH_INTERVAL = float(os.getenv("BOT_STATE_FLUSH_INTERVAL", "0"))
+    BOT_STATE_CACHE_TTL = float(os.getenv("BOT_STATE_CACHE_TTL", "0"))  # Seconds a clean cached state is reused
+    OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://bc-api-management-uksouth.azure-api.net")
+    OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2023-03-15-preview")
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # Seconds per chat call unless the caller sets one
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # Chat calls in flight per bot process
+    LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))  # Kept-alive connections to the chat API
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "10000"))  # Remembered answer verdicts; 0 disables
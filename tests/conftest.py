@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.greenhouse_applications.ingest_cache import candidate_cache, job_cache
+from app.schema_upgrade import upgrade
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'greenhouse.db'}")
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    # The payload caches are process-wide; a row one test stored must not be skipped in the next
+    candidate_cache().clear()
+    job_cache().clear()
+    with Session(bind=engine) as session:
+        yield session
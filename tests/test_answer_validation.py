@@ -0,0 +1,40 @@
+import asyncio
+import pytest
+from hr_bot.bot.bot_modules.answer_validation import AnswerValidator, prevalidate
+
+EXPERIENCE = "How many years of experience are required?"
+
+
+@pytest.mark.parametrize("answer", ["5", "5 years", "3+ years", "3-5 years", "£60,000", "60k - 70k per annum"])
+def test_numeric_answers_to_numeric_questions_are_accepted(answer):
+    assert prevalidate(EXPERIENCE, answer) is True
+
+
+@pytest.mark.parametrize("answer", ["", " ", "x", "?", "...", "years of experience"])
+def test_junk_and_echoed_answers_are_rejected(answer):
+    assert prevalidate(EXPERIENCE, answer) is False
+
+
+def test_single_digit_is_not_accepted_for_other_questions():
+    assert prevalidate("What is the job title?", "5") is False
+
+
+def test_free_text_goes_to_the_model():
+    assert prevalidate("What is the job title?", "senior software engineer") is None
+
+
+async def test_identical_answers_share_one_model_call():
+    validator = AnswerValidator()
+    calls = []
+
+    async def ask_model():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return True
+
+    verdicts = await asyncio.gather(*[validator.validate("What is the job title?", answer, ask_model)
+                                      for answer in ("Data scientist", "data scientist.", "DATA SCIENTIST")])
+    assert verdicts == [True, True, True]
+    assert len(calls) == 1
+    assert await validator.validate("What is the job title?", "data scientist", ask_model) is True
+    assert len(calls) == 1
@@ -0,0 +1,80 @@
+import hashlib
+import pytest
+from aiohttp import web
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from app.greenhouse_applications.attachment_fetcher import LEASE_MARGIN_SECONDS, AttachmentFetcher
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.models import CandidateAttachment
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+RESUME = b"%PDF-1.4 resume " * 1000
+
+
+@pytest.fixture
+async def stand_in():
+    # Greenhouse file host stand-in: /files/resume always works, /flaky/resume fails once with
+    # a 503, /expired/resume is a revoked link
+    requests = []
+
+    async def serve(request):
+        route = request.match_info["route"]
+        requests.append(route)
+        if route == "expired" or (route == "flaky" and requests.count("flaky") == 1):
+            raise web.HTTPNotFound() if route == "expired" else web.HTTPServiceUnavailable()
+        return web.Response(body=RESUME, content_type="application/pdf")
+
+    app = web.Application()
+    app.router.add_get("/{route}/resume", serve)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    yield f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}", requests
+    await runner.cleanup()
+
+
+def seed_attachments(db, base_url, routes):
+    # One candidate per route, each with a single resume
+    row_sets = []
+    for n, route in enumerate(routes, start=1):
+        data = synthetic_webhook(n, attachments=1)
+        data["payload"]["application"]["candidate"]["attachments"][0]["url"] = f"{base_url}/{route}/resume"
+        row_sets.append(webhook_rows(GreenhouseWebhook.model_validate(data)))
+    DAO(db).bulk_ingest_rows(row_sets)
+
+
+async def test_fetch_dedupes_retries_and_gives_up_on_4xx(db, engine, stand_in, tmp_path):
+    base_url, requests = stand_in
+    seed_attachments(db, base_url, ["files", "files", "flaky", "expired"])
+    fetcher = AttachmentFetcher(sessionmaker(bind=engine), str(tmp_path / "files"), concurrency=2, batch_size=10,
+                                retry_backoff=0)
+    try:
+        while await fetcher.fetch_pending():
+            pass
+    finally:
+        await fetcher.close()
+
+    rows = db.execute(select(CandidateAttachment.candidate_id, CandidateAttachment.fetch_status,
+                             CandidateAttachment.fetch_attempts, CandidateAttachment.content_sha256,
+                             CandidateAttachment.storage_path).order_by(CandidateAttachment.candidate_id)).all()
+    sha256 = hashlib.sha256(RESUME).hexdigest()
+    assert [(row.fetch_status, row.fetch_attempts) for row in rows] == [
+        ("fetched", 1), ("fetched", 1), ("fetched", 2), ("failed", 1),
+    ]
+    # The three copies of the same file share one stored file
+    assert {row.content_sha256 for row in rows[:3]} == {sha256}
+    assert len({row.storage_path for row in rows[:3]}) == 1
+    assert open(rows[0].storage_path, "rb").read() == RESUME
+    assert sorted(requests) == ["expired", "files", "files", "flaky", "flaky"]
+    assert fetcher.counters.snapshot() == {
+        "fetched": 3, "deduplicated": 2, "retried": 1, "failed": 1, "bytes_downloaded": 3 * len(RESUME),
+    }
+
+
+def test_lease_covers_the_whole_batch():
+    fetcher = AttachmentFetcher(None, "unused", concurrency=8, batch_size=50, timeout=60)
+
+    # 50 files, 8 at a time: 7 waves of up to 60 s each
+    assert fetcher.lease_seconds() == 7 * 60 + LEASE_MARGIN_SECONDS
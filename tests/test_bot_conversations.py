@@ -0,0 +1,31 @@
+import asyncio
+from botbuilder.core import ConversationState, MemoryStorage, UserState
+from benchmarks.bot_conversations import MARKER, ScriptedModel, run_conversation
+from hr_bot.bot.cv_bot import CVBot
+from hr_bot.dialogs.main_dialog import MainDialog
+
+
+async def test_concurrent_interviews_keep_their_own_state():
+    # Three interviews at once, every turn served by either of two bots sharing one storage, with
+    # model latency that interleaves their turns
+    storage = MemoryStorage()
+    model = ScriptedModel(0.01)
+    bots = []
+    for _ in range(2):
+        bot = CVBot(ConversationState(storage), UserState(storage), MainDialog("connection"))
+        bot.job_description_handler.chat_completion = model
+        bots.append(bot)
+    handler = bots[0].job_description_handler
+    questions = [question for section in handler.sections for question in handler.template[section]]
+
+    results = await asyncio.gather(*[run_conversation(number, bots, questions, [], False) for number in range(3)])
+
+    assert results == [[], [], []]
+    records = {key: item["JobDescriptionState"] for key, item in storage.memory.items()
+               if "JobDescriptionState" in item}
+    assert len(records) == 3
+    for key, record in records.items():
+        (number,) = {marker for answer in record["a"].values() for marker in MARKER.findall(answer)}
+        assert key.endswith(f"/conversation-{number}")
+        assert len(record["a"]) == len(questions)
+        assert set(MARKER.findall(record["jd"])) == {number}
@@ -0,0 +1,125 @@
+import socket
+import time
+import pytest
+from aiohttp import web
+from benchmarks.chat_client import start_stand_in
+from hr_bot.bot.bot_modules.chat_client import ChatClient, ChatError, ChatTimeout
+from hr_bot.bot.bot_modules.model_router import ModelRouter, Route
+
+LATENCY = 0.05
+
+
+@pytest.fixture
+def stand_in():
+    # "broken" always answers 503; "slow" messages take ten times LATENCY
+    stop, url, stats = start_stand_in(LATENCY, {"broken": {"latency": (0.0, 0.0), "error": 1.0}})
+    yield url, stats
+    stop()
+
+
+@pytest.fixture
+async def client(stand_in):
+    client = ChatClient(api_base=stand_in[0], api_key="stand-in-key", timeout=5, max_concurrency=1, pool_size=1)
+    yield client
+    await client.close()
+
+
+def message(content):
+    return [{"role": "user", "content": content}]
+
+
+async def test_chat_returns_the_stripped_answer(client):
+    assert await client.chat("gpt-4", message("hello"), 100, 0.7) == "gpt-4: hello"
+
+
+async def test_timeout_raises_and_frees_the_slot(client):
+    started = time.perf_counter()
+    with pytest.raises(ChatTimeout):
+        await client.chat("gpt-4", message("slow"), 100, 0.7, timeout=LATENCY)
+    assert time.perf_counter() - started < LATENCY * 5
+
+    # With max_concurrency=1 this call would wait forever if the timed-out one kept its slot
+    assert await client.chat("gpt-4", message("after"), 100, 0.7) == "gpt-4: after"
+    assert client.waiting == 0
+
+
+async def test_error_status_raises_chat_error(client):
+    with pytest.raises(ChatError) as error:
+        await client.chat("broken", message("hello"), 100, 0.7)
+    assert error.value.status == 503
+    assert not isinstance(error.value, ChatTimeout)
+
+
+async def test_rejected_api_key_raises_chat_error(stand_in):
+    client = ChatClient(api_base=stand_in[0], api_key="wrong-key", timeout=5)
+    try:
+        with pytest.raises(ChatError) as error:
+            await client.chat("gpt-4", message("hello"), 100, 0.7)
+        assert error.value.status == 401
+    finally:
+        await client.close()
+
+
+async def test_unreachable_api_raises_chat_error():
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    client = ChatClient(api_base=f"http://127.0.0.1:{port}", api_key="stand-in-key", timeout=5)
+    try:
+        with pytest.raises(ChatError) as error:
+            await client.chat("gpt-4", message("hello"), 100, 0.7)
+        assert error.value.status is None
+    finally:
+        await client.close()
+
+
+# Answers a filtered or broken API might send, by deployment name
+MALFORMED = {
+    "no-choices": lambda: web.json_response({"choices": []}),
+    "null-content": lambda: web.json_response({"choices": [{"message": {"role": "assistant", "content": None}}]}),
+    "no-message": lambda: web.json_response({"choices": [{"finish_reason": "content_filter"}]}),
+    "not-json": lambda: web.Response(text="<html>Bad gateway</html>", content_type="text/html"),
+}
+
+
+@pytest.fixture
+async def malformed_api():
+    async def chat(request):
+        model = request.match_info["model"]
+        if model in MALFORMED:
+            return MALFORMED[model]()
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": f" {model} "}}]})
+
+    app = web.Application()
+    app.router.add_post("/openai/deployments/{model}/chat/completions", chat)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    client = ChatClient(api_base=f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}",
+                        api_key="stand-in-key", timeout=5)
+    yield client
+    await client.close()
+    await runner.cleanup()
+
+
+@pytest.mark.parametrize("model", list(MALFORMED))
+async def test_malformed_answer_raises_chat_error(malformed_api, model):
+    with pytest.raises(ChatError):
+        await malformed_api.chat(model, message("hello"), 100, 0.7)
+
+
+async def test_router_falls_back_after_a_malformed_answer(malformed_api):
+    router = ModelRouter(malformed_api, {"tier": ["null-content", "gpt-4"]}, {"call": Route("tier", 5, 5)})
+
+    assert await router.chat("call", message("hello"), 100, 0.7) == "gpt-4"
+    assert router.fallbacks == 1
+
+
+async def test_reopened_session_keeps_the_concurrency_limit(client):
+    await client.chat("gpt-4", message("first"), 100, 0.7)
+    await client.close()
+
+    # A new session after close still shares the one limit, which every earlier call released
+    assert await client.chat("gpt-4", message("second"), 100, 0.7) == "gpt-4: second"
+    assert client.waiting == 0
@@ -0,0 +1,82 @@
+import pytest
+from app.core.config import settings
+from app.greenhouse_applications.contact_keys import (
+    UnionFind, cluster_candidates, contact_key_rows, normalize_email, normalize_phone,
+)
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+@pytest.fixture(autouse=True)
+def uk_default(monkeypatch):
+    monkeypatch.setattr(settings, "CONTACT_DEFAULT_COUNTRY_CODE", "44")
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("+44 20 7946 0018", "+442079460018"),
+    ("+44 (0)20 7946 0018", "+442079460018"),  # Trunk prefix written after the country code
+    ("0044 20 7946 0018", "+442079460018"),  # International 00 prefix
+    ("020 7946 0018", "+442079460018"),  # National number with its trunk 0
+    ("20 7946 0018", "+442079460018"),  # No country code: the default one
+    ("+44 20 7946 0018 ext. 123", "+442079460018"),
+    ("020 7946 0018 x12", "+442079460018"),
+    ("020-7946-0018 #9", "+442079460018"),
+    ("1 (415) 555-2671", "+14155552671"),  # Longer than a national number: already has its country code
+    ("12345", None),
+    ("+1234567890123456", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_phone(value, expected):
+    assert normalize_phone(value) == expected
+
+
+def test_normalize_phone_with_another_default_country_code():
+    assert normalize_phone("030 1234 5678", "49") == "+493012345678"
+    assert normalize_phone("+44 20 7946 0018", "49") == "+442079460018"
+
+
+def test_normalize_email():
+    assert normalize_email("  Jane.Doe@Example.COM ") == "jane.doe@example.com"
+    assert normalize_email("not an email") is None
+    assert normalize_email(None) is None
+
+
+def test_contact_key_rows_collapse_equivalent_values():
+    rows = contact_key_rows(7, ["jane@example.com", "JANE@example.com"], ["+44 (0)20 7946 0018", "020 7946 0018"])
+
+    assert [(row["candidate_id"], row["key_type"]) for row in rows] == [(7, "email"), (7, "phone")]
+
+
+def test_union_find_roots_on_the_smallest_id():
+    union_find = UnionFind()
+    union_find.union(5, 3)
+    union_find.union(9, 5)
+    union_find.union(1, 2)
+    union_find.find(4)
+
+    assert union_find.clusters() == {1: [1, 2], 3: [3, 5, 9]}
+
+
+def test_candidates_sharing_keys_cluster_transitively(db):
+    # 1 and 2 share an email, 2 and 3 a phone written differently; 1 and 3 share nothing, 4 is unrelated
+    contacts = {
+        1: ("jane@example.com", "+1 415 555 2671"),
+        2: ("Jane@Example.com", "020 7946 0018"),
+        3: ("j.doe@example.org", "+44 (0)20 7946 0018"),
+        4: ("someone@example.net", "0161 496 0000"),
+    }
+    row_sets = []
+    for n, (email, phone) in contacts.items():
+        data = synthetic_webhook(n)
+        candidate = data["payload"]["application"]["candidate"]
+        candidate["email_addresses"] = [{"value": email, "type": "personal"}]
+        candidate["phone_numbers"] = [{"value": phone, "type": "mobile"}]
+        row_sets.append(webhook_rows(GreenhouseWebhook.model_validate(data)))
+    dao = DAO(db)
+    dao.bulk_ingest_rows(row_sets)
+
+    assert cluster_candidates(dao) == {1: [1, 2, 3]}
+    assert dao.candidate_cluster(3) == [1, 2, 3]
+    assert dao.candidate_cluster(4) == []
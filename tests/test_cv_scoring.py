@@ -0,0 +1,82 @@
+from app.greenhouse_applications.cv_scoring import CVScorer, ResumeCorpus
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.resume_index import ResumeIndex
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+RESUMES = {
+    1: "Senior Python engineer, Python and PostgreSQL, built FastAPI services",
+    2: "Java developer with some Python scripting",
+    3: "Accountant, payroll and bookkeeping",
+}
+JOB_DESCRIPTION = "Python engineer with PostgreSQL and FastAPI experience"
+
+
+def corpus():
+    corpus = ResumeCorpus()
+    for candidate_id, text in RESUMES.items():
+        corpus.add_document(candidate_id, text)
+    return corpus
+
+
+def ranking(candidates, scores):
+    return [candidate for candidate, score in sorted(zip(candidates.tolist(), scores.tolist()), key=lambda c: -c[1])
+            if score > 0]
+
+
+def test_score_ranks_the_closest_resume_first():
+    assert ranking(*corpus().score(JOB_DESCRIPTION)) == [1, 2]
+
+
+def test_score_keeps_each_candidates_best_document():
+    resumes = corpus()
+    resumes.add_document(2, "Python engineer, PostgreSQL, FastAPI, Python")
+
+    candidates, scores = resumes.score(JOB_DESCRIPTION)
+    assert candidates.tolist() == [1, 2, 3]
+    assert scores[1] > scores[0]
+
+
+def test_score_restricted_to_candidate_ids():
+    candidates, scores = corpus().score(JOB_DESCRIPTION, {2: [102], 3: [103]})
+
+    assert candidates.tolist() == [2, 3]
+    assert ranking(candidates, scores) == [2]
+
+
+def test_saved_corpus_scores_the_same_and_keeps_growing(tmp_path):
+    resumes = corpus()
+    resumes.last_rowid = 3
+    resumes.save(str(tmp_path / "corpus.npz"))
+    loaded = ResumeCorpus.load(str(tmp_path / "corpus.npz"))
+
+    assert loaded.last_rowid == 3
+    assert loaded.vocabulary == resumes.vocabulary
+    for expected, actual in zip(resumes.score(JOB_DESCRIPTION), loaded.score(JOB_DESCRIPTION)):
+        assert expected.tolist() == actual.tolist()
+
+    loaded.add_document(4, "FastAPI engineer")
+    assert loaded.documents == 4
+    assert 4 in loaded.score(JOB_DESCRIPTION)[0].tolist()
+
+
+def test_score_job_scores_the_jobs_applicants(db, tmp_path):
+    # Applications 50, 100 and 150 belong to job 0, their candidates have the same ids
+    DAO(db).bulk_ingest_rows([webhook_rows(GreenhouseWebhook.model_validate(synthetic_webhook(n)))
+                              for n in (50, 100, 150, 51)])
+    index = ResumeIndex(str(tmp_path / "resumes.db"))
+    index.add_documents([
+        dict(attachment_id=candidate_id, candidate_id=candidate_id, content_sha256=str(candidate_id), name="",
+             title="", filename="cv.txt", text=text)
+        for candidate_id, text in zip((50, 100, 150, 51), (RESUMES[2], RESUMES[1], RESUMES[3], RESUMES[1]))
+    ])
+    scorer = CVScorer(index, str(tmp_path / "corpus.npz"))
+    try:
+        results = scorer.score_job(db, 0, JOB_DESCRIPTION)
+
+        assert [application_id for application_id, _, _ in results] == [100, 50, 150]
+        assert [application_id for application_id, _, _ in DAO(db).top_scores(0, 10)] == [100, 50, 150]
+        # Reloaded from its cache, the corpus is not rebuilt from the index
+        assert CVScorer(index, str(tmp_path / "corpus.npz")).refresh() == 0
+    finally:
+        index.close()
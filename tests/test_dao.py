@@ -0,0 +1,66 @@
+from sqlalchemy import func, select
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.models import CandidateAttachment
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+def webhook(n, attachments=2, url_suffix=""):
+    data = synthetic_webhook(n, attachments)
+    for attachment in data["payload"]["application"]["candidate"]["attachments"]:
+        attachment["url"] += url_suffix
+    return GreenhouseWebhook.model_validate(data)
+
+
+def attachment_urls(db):
+    return db.execute(select(CandidateAttachment.filename, CandidateAttachment.url)
+                      .order_by(CandidateAttachment.filename)).all()
+
+
+def test_redelivered_attachments_are_upserted(db):
+    dao = DAO(db)
+    for delivery in range(3):
+        dao.ingest_application(webhook(1, 3, url_suffix=f"?signature={delivery}"))
+
+    assert attachment_urls(db) == [(f"resume_1_{i}.pdf", f"https://example.com/1/{i}?signature=2") for i in range(3)]
+
+
+def test_bulk_redelivered_attachments_are_upserted(db):
+    dao = DAO(db)
+    for delivery in range(3):
+        # The same webhook twice in one batch as well as across batches
+        dao.bulk_ingest_rows([webhook_rows(webhook(n, 3, f"?signature={delivery}")) for n in (1, 2, 1)])
+
+    assert db.scalar(select(func.count()).select_from(CandidateAttachment)) == 6
+    assert {url for _, url in attachment_urls(db)} == {f"https://example.com/{n}/{i}?signature=2"
+                                                       for n in (1, 2) for i in range(3)}
+
+
+def test_new_url_retries_a_failed_fetch(db):
+    dao = DAO(db)
+    dao.ingest_application(webhook(1, 1))
+    db.execute(CandidateAttachment.__table__.update().values(fetch_status="failed", fetch_attempts=3))
+    db.commit()
+
+    dao.ingest_application(webhook(1, 1))
+    assert db.execute(select(CandidateAttachment.fetch_status, CandidateAttachment.fetch_attempts)).one() == ("failed", 3)
+
+    # The new url gets every attempt again, so one transient error on it is not final
+    dao.ingest_application(webhook(1, 1, url_suffix="?signature=new"))
+    assert db.execute(select(CandidateAttachment.fetch_status, CandidateAttachment.fetch_attempts)).one() == (None, 0)
+
+
+def test_result_of_an_expired_lease_is_dropped(db):
+    dao = DAO(db)
+    dao.ingest_application(webhook(1, 1))
+    (stale,) = dao.claim_attachments_to_fetch(10, lease_seconds=-1)
+    (current,) = dao.claim_attachments_to_fetch(10, lease_seconds=60)
+
+    def result(attachment, status):
+        return dict(attachment_id=attachment.id, leased_until=attachment.fetch_claimed_until, fetch_status=status,
+                    fetch_claimed_until=None, fetch_error=None)
+
+    dao.record_attachment_fetches([result(stale, "failed")])
+    assert db.scalar(select(CandidateAttachment.fetch_status)) == "fetching"
+    dao.record_attachment_fetches([result(current, "fetched")])
+    assert db.scalar(select(CandidateAttachment.fetch_status)) == "fetched"
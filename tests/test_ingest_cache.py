@@ -0,0 +1,26 @@
+import pytest
+from app.core.config import settings
+from app.greenhouse_applications.ingest_cache import candidate_cache, job_cache
+
+
+@pytest.fixture
+def fresh_caches():
+    candidate_cache.cache_clear()
+    job_cache.cache_clear()
+    yield
+    candidate_cache.cache_clear()
+    job_cache.cache_clear()
+
+
+def test_caches_read_their_settings_on_first_use(fresh_caches, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CACHE_SIZE", 1)
+    monkeypatch.setattr(settings, "INGEST_CACHE_TTL", 60)
+
+    assert candidate_cache() is candidate_cache()
+    assert (candidate_cache().max_size, candidate_cache().ttl) == (1, 60)
+    assert (job_cache().max_size, job_cache().ttl) == (1, 60)
+
+    candidate_cache().remember(1, b"one")
+    candidate_cache().remember(2, b"two")
+    assert not candidate_cache().is_unchanged(1, b"one")
+    assert candidate_cache().is_unchanged(2, b"two")
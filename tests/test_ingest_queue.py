@@ -0,0 +1,68 @@
+import json
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app.greenhouse_applications.ingest_queue import IngestQueue, IngestWorkerPool
+from app.greenhouse_applications.models import Application
+from benchmarks.payloads import synthetic_webhook
+
+
+@pytest.fixture
+def queue(tmp_path):
+    # No backoff, so a failed webhook can be claimed again straight away
+    queue = IngestQueue(str(tmp_path / "queue.sqlite3"), max_attempts=3, retry_backoff=0)
+    yield queue
+    queue.close()
+
+
+def webhook(n):
+    return json.dumps(synthetic_webhook(n)).encode()
+
+
+def test_outage_keeps_webhooks_queued_without_using_attempts(queue, db, engine, tmp_path):
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'greenhouse.db'}")
+    outage = IngestWorkerPool(queue, sessionmaker(bind=unreachable))
+    queue.enqueue(webhook(1))
+    queue.enqueue(webhook(2))
+
+    # Many more failed batches than max_attempts
+    for _ in range(10):
+        outage.process_batch(queue.claim(10))
+
+    batch = queue.claim(10)
+    assert [(item.attempts, item.retries) for item in batch] == [(0, 10), (0, 10)]
+    assert queue.stats()["dead_letters"] == 0
+
+    # Once the database is back the same webhooks go through
+    IngestWorkerPool(queue, sessionmaker(bind=engine)).process_batch(batch)
+    assert queue.stats()["depth"] == 0
+    assert db.execute(select(Application.application_id).order_by(Application.application_id)).scalars().all() == [1, 2]
+
+
+def test_invalid_payload_is_dead_lettered_and_the_rest_ingested(queue, db, engine):
+    queue.enqueue(webhook(1))
+    queue.enqueue(b'{"action": "new_candidate_application"}')
+
+    IngestWorkerPool(queue, sessionmaker(bind=engine)).process_batch(queue.claim(10))
+
+    stats = queue.stats()
+    assert (stats["depth"], stats["dead_letters"]) == (0, 1)
+    assert db.execute(select(Application.application_id)).scalars().all() == [1]
+
+
+def test_payload_failures_use_up_attempts(queue):
+    queue.enqueue(webhook(1))
+
+    assert [queue.fail(item, "payload error") for item in queue.claim(1)] == [False]
+    assert [queue.fail(item, "database down", transient=True) for item in queue.claim(1)] == [False]
+    assert [queue.fail(item, "payload error") for item in queue.claim(1)] == [False]
+    assert [queue.fail(item, "payload error") for item in queue.claim(1)] == [True]
+    assert queue.stats()["dead_letters"] == 1
+
+
+def test_backoff_doubles_up_to_the_cap(tmp_path):
+    queue = IngestQueue(str(tmp_path / "queue.sqlite3"), retry_backoff=5, max_backoff=300)
+    try:
+        assert [queue.backoff(retries) for retries in range(1, 9)] == [5, 10, 20, 40, 80, 160, 300, 300]
+    finally:
+        queue.close()
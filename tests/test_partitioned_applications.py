@@ -0,0 +1,47 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import select, text
+from app.core.config import settings
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.models import Application
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+@pytest.fixture
+def partitioned_db(db, monkeypatch):
+    # Stand-in for the partitioned PostgreSQL table: the upsert target becomes (application_id,
+    # applied_at), while the plain unique application_id still rejects a duplicate row
+    db.execute(text("CREATE UNIQUE INDEX uq_applications_application_id_applied_at "
+                    "ON applications (application_id, applied_at)"))
+    db.commit()
+    monkeypatch.setattr(settings, "APPLICATIONS_PARTITIONED", True)
+    return db
+
+
+def delivery(applied_at, last_activity_at):
+    data = synthetic_webhook(1)
+    data["payload"]["application"].update(applied_at=applied_at, last_activity_at=last_activity_at)
+    return GreenhouseWebhook.model_validate(data)
+
+
+def stored(db):
+    return db.execute(select(Application.application_id, Application.applied_at, Application.last_activity_at)).all()
+
+
+def test_redelivery_without_applied_at_keeps_the_partition_key(partitioned_db):
+    dao = DAO(partitioned_db)
+    dao.ingest_application(delivery(None, "2024-02-15T09:23:18Z"))
+    dao.ingest_application(delivery(None, "2024-03-01T12:00:00Z"))
+    dao.bulk_ingest_rows([webhook_rows(delivery(None, "2024-03-05T12:00:00Z"))])
+
+    assert stored(partitioned_db) == [(1, datetime(2024, 2, 15, 9, 23, 18), datetime(2024, 3, 5, 12))]
+
+
+def test_real_applied_at_moves_the_stored_row(partitioned_db):
+    dao = DAO(partitioned_db)
+    dao.ingest_application(delivery(None, "2024-02-15T09:23:18Z"))
+    dao.bulk_ingest_rows([webhook_rows(delivery("2024-02-01T10:30:22Z", "2024-03-01T12:00:00Z"))])
+    dao.ingest_application(delivery(None, "2024-03-05T12:00:00Z"))
+
+    assert stored(partitioned_db) == [(1, datetime(2024, 2, 1, 10, 30, 22), datetime(2024, 3, 5, 12))]
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import event
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.read_api import MAX_PAGE_SIZE
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+@pytest.fixture
+def job_with_applications(db):
+    # synthetic_webhook puts application n on job n % 50: every 50th one lands on job 0
+    numbers = range(50, 50 * (MAX_PAGE_SIZE + 10), 50)
+    DAO(db).bulk_ingest_rows([webhook_rows(GreenhouseWebhook.model_validate(synthetic_webhook(n))) for n in numbers])
+    DAO(db).add_scores([(n, 0.5) for n in numbers])
+    return 0
+
+
+@pytest.mark.parametrize("limit, queries", [(10, 4), (100, 4), (MAX_PAGE_SIZE - 1, 4), (MAX_PAGE_SIZE, 7)])
+def test_job_applications_query_count(db, engine, job_with_applications, limit, queries):
+    statements = []
+
+    def record(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        # The read API asks for one row more than the page to learn whether a next page exists
+        page = DAO(db).job_applications(job_with_applications, limit + 1)
+        for application in page:
+            application.candidate.attachments, application.scores
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert len(page) == limit + 1
+    assert len(statements) == queries
@@ -0,0 +1,37 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+from app.greenhouse_applications import resume_index
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.models import CandidateAttachment
+from app.greenhouse_applications.resume_index import ResumeIndex, ResumeIndexer
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+def test_attachment_without_text_is_retried(engine, db, tmp_path, monkeypatch):
+    DAO(db).bulk_ingest_rows([webhook_rows(GreenhouseWebhook.model_validate(synthetic_webhook(1, attachments=1)))])
+    path = tmp_path / "cv.txt"
+    path.write_text("Python engineer with PostgreSQL experience")
+    db.execute(update(CandidateAttachment).values(
+        fetch_status='fetched', fetched_at=datetime(2024, 3, 1), content_sha256="ab" * 32,
+        content_type="text/plain", storage_path=str(path)))
+    db.commit()
+    index = ResumeIndex(str(tmp_path / "resumes.db"))
+    try:
+        # As when the extractor could not read the format yet
+        with monkeypatch.context() as patch:
+            patch.setattr(resume_index, "extract_text", lambda *args: "")
+            indexer = ResumeIndexer(index, sessionmaker(bind=engine))
+            indexer.index_pending()
+            assert index.stats()["attachments_without_text"] == 1
+            assert index.search("python") == []
+            # Text-less attachments are retried once per process, not on every pass
+            indexer.index_pending()
+            assert index.stats()["attachments_without_text"] == 1
+
+        assert ResumeIndexer(index, sessionmaker(bind=engine)).index_pending() == 0
+        assert index.stats()["attachments_without_text"] == 0
+        assert [match.candidate_id for match in index.search("python")] == [1]
+    finally:
+        index.close()
@@ -0,0 +1,108 @@
+import json
+import re
+from sqlalchemy import create_engine, inspect, text
+from app.greenhouse_applications.dao import candidate_row
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from app.schema_upgrade import LATEST_VERSION, PLAN_CHECKS, check_query_plans, current_version, upgrade
+from benchmarks.payloads import synthetic_webhook
+
+# The tables as the first release created them (SQLite), before any schema step existed
+BASELINE_SCHEMA = """
+CREATE TABLE candidates (
+    id INTEGER NOT NULL, candidate_id INTEGER NOT NULL, first_name VARCHAR(100), last_name VARCHAR(100),
+    title VARCHAR(100), company VARCHAR(255), url VARCHAR(255), phone_numbers JSON, email_addresses JSON,
+    education JSON, addresses JSON, tags JSON, custom_fields JSON, applied_at TIMESTAMP, created_at TIMESTAMP,
+    updated_at TIMESTAMP, PRIMARY KEY (id), UNIQUE (candidate_id)
+);
+CREATE INDEX ix_candidates_id ON candidates (id);
+CREATE TABLE jobs (
+    id INTEGER NOT NULL, job_id INTEGER NOT NULL, name VARCHAR(255), requisition_id VARCHAR(100),
+    status VARCHAR(50), url VARCHAR(255), departments JSON, offices JSON, created_by_id INTEGER,
+    opened_at TIMESTAMP, closed_at TIMESTAMP, created_at TIMESTAMP, updated_at TIMESTAMP,
+    PRIMARY KEY (id), UNIQUE (job_id)
+);
+CREATE INDEX ix_jobs_id ON jobs (id);
+CREATE TABLE applications (
+    id INTEGER NOT NULL, application_id INTEGER NOT NULL, candidate_id INTEGER, job_id INTEGER,
+    status VARCHAR(50), applied_at TIMESTAMP, last_activity_at TIMESTAMP, url VARCHAR(255), source JSON,
+    current_stage JSON, created_at TIMESTAMP, updated_at TIMESTAMP, PRIMARY KEY (id), UNIQUE (application_id),
+    FOREIGN KEY(candidate_id) REFERENCES candidates (candidate_id), FOREIGN KEY(job_id) REFERENCES jobs (job_id)
+);
+CREATE INDEX ix_applications_id ON applications (id);
+CREATE TABLE candidate_attachments (
+    id INTEGER NOT NULL, candidate_id INTEGER NOT NULL, filename VARCHAR(255), url VARCHAR(255),
+    type VARCHAR(50), created_at TIMESTAMP, PRIMARY KEY (id),
+    FOREIGN KEY(candidate_id) REFERENCES candidates (candidate_id)
+);
+CREATE INDEX ix_candidate_attachments_id ON candidate_attachments (id);
+CREATE TABLE scores (
+    id INTEGER NOT NULL, application_id INTEGER, score FLOAT, created_at TIMESTAMP, PRIMARY KEY (id),
+    FOREIGN KEY(application_id) REFERENCES applications (application_id)
+);
+CREATE INDEX ix_scores_id ON scores (id);
+"""
+
+BASELINE_ROWS = """
+INSERT INTO candidates (id, candidate_id, first_name, last_name, email_addresses, tags)
+    VALUES (1, 100, 'Jane', 'Doe', '["jane@example.com"]', '["Python"]');
+INSERT INTO jobs (id, job_id, name, status) VALUES (1, 200, 'Engineer', 'open');
+INSERT INTO applications (id, application_id, candidate_id, job_id, status, applied_at)
+    VALUES (1, 300, 100, 200, 'active', '2024-01-15 00:00:00');
+INSERT INTO candidate_attachments (id, candidate_id, filename, url, type)
+    VALUES (1, 100, 'cv.pdf', 'https://example.com/cv.pdf', 'resume');
+INSERT INTO candidate_attachments (id, candidate_id, filename, url, type)
+    VALUES (2, 100, 'cv.pdf', 'https://example.com/cv.pdf?redelivered', 'resume');
+INSERT INTO scores (id, application_id, score) VALUES (1, 300, 0.75);
+"""
+
+
+def baseline_engine(path):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as connection:
+        for statement in (BASELINE_SCHEMA + BASELINE_ROWS).split(";"):
+            if statement.strip():
+                connection.execute(text(statement))
+    return engine
+
+
+def test_upgrade_baseline_database(tmp_path):
+    engine = baseline_engine(tmp_path / "baseline.db")
+
+    assert upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+
+    with engine.connect() as connection:
+        assert current_version(connection) == LATEST_VERSION
+        columns = {column["name"] for column in inspect(connection).get_columns("candidate_attachments")}
+        assert {"fetch_status", "fetched_at", "content_sha256", "storage_path"} <= columns
+        indexes = {index["name"] for index in inspect(connection).get_indexes("candidate_attachments")}
+        assert {"ix_candidate_attachments_candidate_id", "ix_candidate_attachments_fetch_status",
+                "ix_candidate_attachments_fetched_at"} <= indexes
+        # Existing rows survive and the backfill steps saw them
+        assert connection.execute(text("SELECT count(*) FROM applications")).scalar() == 1
+        assert connection.execute(text("SELECT score FROM job_top_scores WHERE job_id = 200")).scalar() == 0.75
+        assert connection.execute(text("SELECT count(*) FROM candidate_contact_keys")).scalar() > 0
+        # Attachments added again by a redelivery are collapsed onto the first row
+        assert connection.execute(text("SELECT id FROM candidate_attachments")).scalars().all() == [1]
+
+    assert upgrade(engine) == []
+    assert check_query_plans(engine) == []
+
+
+def test_upgrade_empty_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    assert upgrade(engine) == list(range(1, LATEST_VERSION + 1))
+    assert check_query_plans(engine) == []
+
+
+def test_containment_checks_match_the_stored_json():
+    # A plan check on a JSON shape the ingest path never writes would pass while real lookups miss
+    data = synthetic_webhook(1)
+    data["payload"]["application"]["candidate"]["email_addresses"] = [{"value": "jane@example.com", "type": "personal"}]
+    row = candidate_row(GreenhouseWebhook.model_validate(data).payload.application.candidate)
+
+    checks = [(name, re.search(r"(\w+) @> '(.*)'", sql)) for name, sql, _ in PLAN_CHECKS]
+    checks = [(name, match.group(1), json.loads(match.group(2))) for name, match in checks if match]
+    assert checks
+    for name, column, contained in checks:
+        assert all(value in row[column] for value in contained), name
@@ -0,0 +1,67 @@
+import pytest
+from hr_bot.bot.state_storage import SqlStorage, SqliteStateStore
+
+
+@pytest.fixture
+async def storages(tmp_path):
+    # Two bot processes sharing one state database
+    path = str(tmp_path / "state.db")
+    opened = []
+
+    def open_storage(**options):
+        storage = SqlStorage(SqliteStateStore(path), **options)
+        opened.append(storage)
+        return storage
+
+    yield open_storage
+    for storage in opened:
+        await storage.close()
+
+
+async def test_write_through_by_default(storages):
+    first, second = storages(), storages()
+    await first.write({"conversation": {"step": 1}})
+
+    assert (await second.read(["conversation"]))["conversation"]["step"] == 1
+
+
+async def test_stale_etag_in_the_same_process_is_rejected(storages):
+    storage = storages()
+    await storage.write({"conversation": {"step": 1}})
+    state = (await storage.read(["conversation"]))["conversation"]
+    await storage.write({"conversation": {**state, "step": 2}})
+
+    with pytest.raises(KeyError):
+        await storage.write({"conversation": {**state, "step": 3}})
+
+
+async def test_write_through_conflict_raises_and_keeps_the_winner(storages):
+    first, second = storages(), storages()
+    await first.write({"conversation": {"step": 1}})
+    mine = (await first.read(["conversation"]))["conversation"]
+    theirs = (await second.read(["conversation"]))["conversation"]
+
+    await second.write({"conversation": {**theirs, "step": "theirs"}})
+    with pytest.raises(KeyError):
+        await first.write({"conversation": {**mine, "step": "mine"}})
+
+    assert first.stats["conflicts"] == 1
+    # The losing version is dropped from the cache, so the next turn starts from the winner
+    assert (await first.read(["conversation"]))["conversation"]["step"] == "theirs"
+
+
+async def test_write_behind_conflict_is_reported(storages):
+    lost = []
+    first = storages(flush_interval=60, on_conflict=lost.append)
+    second = storages()
+    await second.write({"conversation": {"step": 1}})
+    mine = (await first.read(["conversation"]))["conversation"]
+    theirs = (await second.read(["conversation"]))["conversation"]
+
+    await first.write({"conversation": {**mine, "step": "mine"}})  # Only cached until the flush
+    await second.write({"conversation": {**theirs, "step": "theirs"}})
+
+    assert await first.flush() == {"conversation"}
+    assert lost == [{"conversation"}]
+    assert first.stats["conflicts"] == 1
+    assert (await first.read(["conversation"]))["conversation"]["step"] == "theirs"
@@ -0,0 +1,52 @@
+import pytest
+from app.core.config import settings
+from app.greenhouse_applications.dao import DAO, webhook_rows
+from app.greenhouse_applications.schema import GreenhouseWebhook
+from benchmarks.payloads import synthetic_webhook
+
+
+@pytest.fixture
+def dao(db, monkeypatch):
+    monkeypatch.setattr(settings, "SCORE_TOP_K", 2)
+    dao = DAO(db)
+    # Applications 50, 100 and 150 all belong to job 0
+    dao.bulk_ingest_rows([webhook_rows(GreenhouseWebhook.model_validate(synthetic_webhook(n))) for n in (50, 100, 150)])
+    return dao
+
+
+def leaderboard(dao):
+    return [(application_id, score) for application_id, _, score in dao.top_scores(0, 10)]
+
+
+def test_leaderboard_keeps_the_top_k(dao):
+    dao.add_scores([(50, 0.5), (100, 0.7), (150, 0.6)])
+
+    assert leaderboard(dao) == [(100, 0.7), (150, 0.6)]
+
+
+def test_latest_score_replaces_a_higher_one(dao):
+    dao.add_scores([(50, 0.5), (100, 0.9)])
+    dao.add_score(100, 0.3)
+
+    assert leaderboard(dao) == [(50, 0.5), (100, 0.3)]
+
+
+def test_lowered_score_lets_a_trimmed_application_back_in(dao):
+    dao.add_scores([(50, 0.5), (100, 0.7), (150, 0.6)])
+    dao.add_scores([(100, 0.1)])
+
+    assert leaderboard(dao) == [(150, 0.6), (50, 0.5)]
+
+
+def test_latest_score_in_a_batch_wins(dao):
+    dao.add_scores([(50, 0.9), (50, 0.2), (100, 0.4)])
+
+    assert leaderboard(dao) == [(100, 0.4), (50, 0.2)]
+
+
+def test_rebuild_uses_latest_scores(dao):
+    dao.add_scores([(50, 0.9), (100, 0.4), (150, 0.3)])
+    dao.add_scores([(50, 0.1)])
+    dao.rebuild_top_scores()
+
+    assert leaderboard(dao) == [(100, 0.4), (150, 0.3)]
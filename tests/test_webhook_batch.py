@@ -0,0 +1,19 @@
+import io
+import json
+from sqlalchemy.orm import sessionmaker
+from app.greenhouse_applications import webhook_api
+from benchmarks.payloads import synthetic_webhook
+
+
+def test_batch_report_follows_input_order(engine, db, monkeypatch):
+    monkeypatch.setattr(webhook_api, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(webhook_api, "BATCH_CHUNK_SIZE", 2)
+    lines = [json.dumps(synthetic_webhook(1)), "{not json", json.dumps(synthetic_webhook(2)),
+             json.dumps(synthetic_webhook(3)), "", '{"action": "new_candidate_application"}']
+    spool = io.BytesIO("\n".join(lines).encode())
+
+    report = [json.loads(line) for line in webhook_api.ingest_batch(spool)]
+
+    assert [(entry["line"], entry["status"]) for entry in report] == [
+        (1, "ok"), (2, "error"), (3, "ok"), (4, "ok"), (6, "error")]
+    assert [entry.get("application_id") for entry in report] == [1, None, 2, 3, None]